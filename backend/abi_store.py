@@ -0,0 +1,318 @@
+"""
+Versioned store of the last analyzed ABI per (chainId, address).
+
+Upgradeable proxies change implementation often, and an upgrade usually adds
+or changes a few functions. Every ABI analyzed for a contract is kept as a
+version, with the explanation it got. When a different ABI comes in for the
+same contract, the two are diffed entry by entry, keyed by the canonical
+signature behind each function or error selector and event topic (the entry
+kind for constructor/fallback/receive):
+
+- added / removed: ids on one side only
+- changed: same id, different declaration (mutability, outputs, names)
+
+When the previous explanation came from the LLM, only that change goes to
+the LLM and its answer is merged into the previous explanation
+(agents.arun_roma_for_upgrade). A merged explanation belongs to its contract
+and version and is never cached under the ABI's content key.
+
+Versions are told apart by abi_hash, a hash of the canonical ABI alone. It
+does not include cache.CACHE_VERSION, so a cache bump does not look like an
+upgrade. A different hash whose diff is empty (entries reordered, only
+internalType changed, a store written with older hashes) updates the hash
+of the current version instead of adding one.
+
+The diff runs only on upgrades; a contract seen with the same ABI costs a
+dict lookup. Feature extraction is not split per entry: one pass over the
+whole ABI (features.py) is cheaper than looking entries up in the previous
+version.
+
+ABIs are kept as compact JSON, not as dicts: many large ABIs as Python
+objects cost memory and slow down the garbage collector. In memory the
+latest version of each contract is kept, in an LRU bounded by
+ROMA_ABI_STORE_SIZE. With ROMA_ABI_STORE_DB set, every version is also
+written to SQLite, which survives restarts and is shared by the workers on
+one host. The service uses alatest/arecord, which do the SQLite I/O on a
+worker thread.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from cache import canonical_hash, canonical_json
+from contract_registry import is_known_contract
+from evm import canonical_signature
+from prompt import declaration
+
+# Lines per list kept in a diff; counts stay exact.
+MAX_DIFF_LINES = 100
+
+
+class AbiVersion(NamedTuple):
+    version: int
+    # abi_hash() of the ABI
+    abi_hash: str
+    # canonical JSON of the ABI
+    abi: bytes
+    # {"summary", "source"} of the explanation, once a final one exists
+    result: Optional[Dict[str, Any]]
+    # changes from the previous version, None for the first one
+    diff: Optional[Dict[str, Any]]
+    created: float
+
+
+def abi_hash(abi: List[dict]) -> str:
+    """Content hash of an ABI, independent of CACHE_VERSION."""
+    return canonical_hash(abi)
+
+
+def entry_id(entry: Dict[str, Any]) -> str:
+    """
+    The canonical signature the selector (or event topic) is hashed from,
+    prefixed by kind. Equal ids mean equal selectors, without hashing.
+    """
+    kind = entry.get("type", "function")
+    if kind in ("function", "event", "error"):
+        return f"{kind} {canonical_signature(entry)}"
+    return kind
+
+
+def _by_id(abi: List[dict]) -> Dict[str, dict]:
+    return {entry_id(e): e for e in abi if isinstance(e, dict)}
+
+
+def diff(old: Union[bytes, List[dict]], new: List[dict]) -> Dict[str, Any]:
+    """Selector-level changes from old (a stored version's ABI) to new, as declaration lines."""
+    if isinstance(old, bytes):
+        old = json.loads(old)
+    before, after = _by_id(old), _by_id(new)
+    lists: Dict[str, List[str]] = {"added": [], "removed": [], "changed": []}
+    counts = dict.fromkeys(lists, 0)
+    unchanged = 0
+
+    def note(kind: str, entry: Dict[str, Any], line: Optional[str] = None) -> None:
+        # Only the kept lines are rendered; an upgrade can add thousands.
+        counts[kind] += 1
+        if len(lists[kind]) < MAX_DIFF_LINES:
+            lists[kind].append(line or declaration(entry))
+
+    for key, entry in after.items():
+        prior = before.get(key)
+        if prior is None:
+            note("added", entry)
+        elif prior == entry:
+            unchanged += 1
+        else:
+            line = declaration(entry)
+            if line == declaration(prior):
+                unchanged += 1  # e.g. only internalType differed
+            else:
+                note("changed", entry, line)
+    for key, entry in before.items():
+        if key not in after:
+            note("removed", entry)
+    return {**lists, "counts": counts, "unchanged": unchanged,
+            "truncated": any(n > MAX_DIFF_LINES for n in counts.values())}
+
+
+def is_empty(changes: Dict[str, Any]) -> bool:
+    """No entry was added, removed or changed."""
+    return not any(changes["counts"].values())
+
+
+def is_small(changes: Dict[str, Any]) -> bool:
+    """Few enough changes that explaining only them beats starting over."""
+    total = sum(changes["counts"].values())
+    return 0 < total <= changes["unchanged"]
+
+
+class AbiStore:
+    """Latest ABI version per contract in memory, every version in SQLite."""
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # SQLite has its own lock so memory lookups never wait on disk I/O.
+        self._db_lock = threading.Lock()
+        self._mem: "OrderedDict[Tuple[str, str], AbiVersion]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {"versions": 0, "upgrades": 0}
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS abi_versions ("
+                "chain_id TEXT NOT NULL, address TEXT NOT NULL, version INTEGER NOT NULL, "
+                "abi_hash TEXT NOT NULL, abi BLOB NOT NULL, result TEXT, diff TEXT, "
+                "created REAL NOT NULL, PRIMARY KEY (chain_id, address, version))"
+            )
+
+    @classmethod
+    def from_env(cls) -> "AbiStore":
+        return cls(
+            max_entries=int(os.getenv("ROMA_ABI_STORE_SIZE", "4096")),
+            db_path=os.getenv("ROMA_ABI_STORE_DB") or None,
+        )
+
+    @staticmethod
+    def tracks(address: Optional[str], chain_id: Optional[str]) -> bool:
+        """Registry contracts are explained from the registry, not versioned."""
+        return bool(address and chain_id) and not is_known_contract(address, chain_id)
+
+    def latest(self, chain_id: str, address: str) -> Optional[AbiVersion]:
+        key = (chain_id, address.lower())
+        current = self._latest_memory(key)
+        return current if current is not None else self._latest_disk(key)
+
+    async def alatest(self, chain_id: str, address: str) -> Optional[AbiVersion]:
+        """latest, with the SQLite tier read on a worker thread."""
+        key = (chain_id, address.lower())
+        current = self._latest_memory(key)
+        if current is not None or self._db is None:
+            return current
+        return await asyncio.to_thread(self._latest_disk, key)
+
+    def _latest_memory(self, key: Tuple[str, str]) -> Optional[AbiVersion]:
+        with self._lock:
+            current = self._mem.get(key)
+            if current is not None:
+                self._mem.move_to_end(key)
+            return current
+
+    def _latest_disk(self, key: Tuple[str, str]) -> Optional[AbiVersion]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT version, abi_hash, abi, result, diff, created FROM abi_versions "
+                "WHERE chain_id = ? AND address = ? ORDER BY version DESC LIMIT 1",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        current = AbiVersion(
+            row[0], row[1], row[2],
+            json.loads(row[3]) if row[3] else None,
+            json.loads(row[4]) if row[4] else None,
+            row[5],
+        )
+        with self._lock:
+            if key in self._mem:  # recorded meanwhile
+                return self._mem[key]
+            self._remember(key, current)
+        return current
+
+    def record(
+        self,
+        chain_id: str,
+        address: str,
+        abi_hash: str,
+        abi: List[dict],
+        result: Optional[Dict[str, Any]],
+        previous: Optional[AbiVersion] = None,
+        changes: Optional[Dict[str, Any]] = None,
+    ) -> AbiVersion:
+        """
+        Store abi as the contract's latest version, or attach result to it if
+        it already is. previous is what latest() returned before the analysis
+        and changes its diff to abi, if computed. result is None for
+        provisional answers.
+        """
+        key = (chain_id, address.lower())
+        current, changed = self._update(key, abi_hash, abi, result, previous, changes)
+        if changed:
+            self._persist(key, current)
+        return current
+
+    async def arecord(
+        self,
+        chain_id: str,
+        address: str,
+        abi_hash: str,
+        abi: List[dict],
+        result: Optional[Dict[str, Any]],
+        previous: Optional[AbiVersion] = None,
+        changes: Optional[Dict[str, Any]] = None,
+    ) -> AbiVersion:
+        """record, with the SQLite write on a worker thread."""
+        key = (chain_id, address.lower())
+        current, changed = self._update(key, abi_hash, abi, result, previous, changes)
+        if changed and self._db is not None:
+            await asyncio.to_thread(self._persist, key, current)
+        return current
+
+    def _update(
+        self,
+        key: Tuple[str, str],
+        abi_hash: str,
+        abi: List[dict],
+        result: Optional[Dict[str, Any]],
+        previous: Optional[AbiVersion],
+        changes: Optional[Dict[str, Any]],
+    ) -> Tuple[AbiVersion, bool]:
+        """(the latest version after recording, whether it changed)."""
+        if result is not None:
+            result = {"summary": result.get("summary"), "source": result.get("source")}
+        with self._lock:
+            if previous is not None and previous.abi_hash != abi_hash and changes is None:
+                changes = diff(previous.abi, abi)
+            if previous is not None and (previous.abi_hash == abi_hash or is_empty(changes)):
+                if previous.abi_hash != abi_hash:
+                    # Same entries under another hash: keep the version.
+                    current = previous._replace(abi_hash=abi_hash, abi=canonical_json(abi),
+                                                result=result or previous.result)
+                elif result is None or result == previous.result:
+                    return previous, False
+                else:
+                    current = previous._replace(result=result)
+            else:
+                version = previous.version + 1 if previous is not None else 1
+                current = AbiVersion(version, abi_hash, canonical_json(abi), result, changes, time.time())
+                self.stats["versions"] += 1
+                self.stats["upgrades"] += previous is not None
+            self._remember(key, current)
+            return current, True
+
+    def _persist(self, key: Tuple[str, str], current: AbiVersion) -> None:
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO abi_versions "
+                "(chain_id, address, version, abi_hash, abi, result, diff, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, current.version, current.abi_hash, current.abi,
+                 json.dumps(current.result) if current.result else None,
+                 json.dumps(current.diff) if current.diff else None, current.created),
+            )
+
+    def _remember(self, key: Tuple[str, str], version: AbiVersion) -> None:
+        self._mem[key] = version
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM abi_versions")
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "contracts": len(self._mem),
+                "max_entries": self.max_entries,
+                "disk": self._db is not None,
+            }
+
+
+abi_store = AbiStore.from_env()
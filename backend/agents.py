@@ -1,161 +1,158 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+from abi_store import abi_hash, abi_store, diff as abi_diff, is_empty, is_small
+from cache import explain_cache_key, result_cache, upgrade_cache_key
 from contract_registry import get_contract_info, is_known_contract
+from features import (
+    APPROVE, BURN, MINT, OWNER, PAUSE, TRANSFER, UPGRADE, AbiFeatures,
+    extract_abi_features, extract_signature_features, feature_list, first_match,
+    unique_signatures,
+)
+from llm_gate import DeadlineExceeded, llm_gate
+from prompt import abi_prompt, changes_prompt, selector_prompt
+from rules import type_rules
+from similarity import abi_tokens, selector_tokens, similarity_index
+import asyncio
+import functools
+import llm
+import metrics
 import os
+import re
+import time
 
-try:
-    import dspy
-    from openai import OpenAI
-    
-    # Initialize DSPy with OpenAI
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if openai_api_key:
-        lm = dspy.LM('openai/gpt-4o-mini', api_key=openai_api_key)
-        dspy.configure(lm=lm)
-        ROMA_AVAILABLE = True
-        print("✅ ROMA (DSPy + OpenAI) initialized successfully")
-    else:
-        ROMA_AVAILABLE = False
-        print("⚠️  OPENAI_API_KEY not found, using fallback mode")
-except Exception as e:
-    ROMA_AVAILABLE = False
-    print(f"⚠️  ROMA not available: {e}, using fallback mode")
-
-def _abi_summary(abi: List[dict], address: Optional[str] = None) -> Dict[str, Any]:
-    fx = [x for x in abi if x.get("type") == "function"]
-    ev = [x for x in abi if x.get("type") == "event"]
-    write = [x for x in fx if x.get("stateMutability") not in ("view","pure")]
-    read = [x for x in fx if x.get("stateMutability") in ("view","pure")]
+# Contract-type rules (rules.py) as first_match tables, one per mode.
+ABI_TYPE_RULES = type_rules.for_mode("abi")
+ABI_DEFAULT_TYPE = type_rules.defaults["abi"]
+SELECTOR_TYPE_RULES = type_rules.for_mode("selectors")
+SELECTOR_DEFAULT_TYPE = type_rules.defaults["selectors"]
+
+_CONTRACT_TYPE = re.compile(r"\*\*Contract Type\*\*:[ \t]*([^\n*]+)")
+
+# ABIs with more entries than this are analyzed on a worker thread by the
+# async paths: the similarity lookup hashes every signature, which takes
+# tens of milliseconds for a large ABI even with pycryptodome.
+INLINE_ANALYSIS_MAX = int(os.getenv("ROMA_INLINE_ANALYSIS_MAX", "256"))
+# The analysis is CPU-bound Python; more threads only contend for the GIL
+# and finish every request late instead of the first ones early.
+_analysis_slots = asyncio.Semaphore(int(os.getenv("ROMA_ANALYSIS_THREADS", "1")))
+
+CAPABILITIES = (
+    (TRANSFER, "transfers", "**Transfers**: Users can send tokens or assets to other addresses, like sending money to a friend."),
+    (APPROVE, "approvals", "**Approvals**: Users can give permission to other contracts or addresses to spend their tokens on their behalf, like authorizing a subscription payment."),
+    (MINT, "minting", "**Minting**: New tokens can be created. This is like a central bank printing money, though typically only authorized users can do this."),
+    (BURN, "burning", "**Burning**: Tokens can be permanently destroyed, reducing the total supply. This is like shredding cash - it's gone forever."),
+    (OWNER, "ownership controls", "**Ownership**: Special administrative functions are restricted to the contract owner for security and governance."),
+    (PAUSE, "emergency pause", "**Emergency Pause**: The contract can be paused in case of security issues or emergencies, freezing all operations temporarily."),
+    (UPGRADE, "upgradeability", "**Upgradeability**: The contract logic can be updated or improved over time without changing the contract address."),
+)
+
+def _functions_breakdown(f: AbiFeatures) -> str:
+    function_explanation = f"\n\n**Functions Breakdown:**\n"
+    function_explanation += f"- **{f.reads} Read-Only Functions**: These let you check information without changing anything (like checking your bank balance).\n"
+    function_explanation += f"- **{f.writes} State-Changing Functions**: These actually modify the contract's data (like making a purchase or transfer).\n"
+    function_explanation += f"- **{f.events} Events**: These are notifications that the contract emits when important things happen (like transaction receipts)."
+    return function_explanation
+
+def _similar_type(tokens) -> Optional[tuple]:
+    """(type, explanation, similarTo) from the nearest known contract, if close enough."""
+    match = similarity_index.nearest(tokens)
+    if match is None:
+        return None
+    label = match.label
+    name = label.get("name") or "a contract we explained before"
+    contract_type = label.get("type") or "Variant of a Known Contract"
+    explanation = (
+        f"Its functions closely match **{name}** ({match.score:.0%} of function selectors in common), "
+        f"so it is most likely a fork or close variant of it. {label.get('description', '')}"
+    ).rstrip()
+    similar = {"name": label.get("name"), "type": label.get("type"), "address": label.get("address"),
+               "score": round(match.score, 3)}
+    return contract_type, explanation, similar
+
+def _classify(flags: int, rules, tokens, timer: metrics.StageTimer) -> tuple:
+    """
+    ((type, explanation) or None, similarTo) from the rule table, falling
+    back to the nearest known contract. tokens is called only if needed.
+    """
+    matched = first_match(flags, rules)
+    similar = None
+    if matched is None:
+        neighbor = _similar_type(tokens())
+        if neighbor:
+            matched, similar = neighbor[:2], neighbor[2]
+        timer.mark("similarity")
+    return matched, similar
+
+def _explained_type(explanation: str) -> Optional[str]:
+    """The "Contract Type" an LLM explanation states, if it states one."""
+    match = _CONTRACT_TYPE.search(explanation)
+    return match.group(1).strip()[:60] if match else None
+
+def _remember(tokens, explanation: str, address: Optional[str] = None) -> None:
+    """
+    Index an LLM-explained contract so near-identical ones are classified
+    like it. Only a short label is kept: the explanation describes that one
+    contract and is not repeated in other contracts' summaries.
+    """
+    try:
+        similarity_index.remember(tokens, {"name": None, "type": _explained_type(explanation),
+                                           "address": address, "origin": "roma"})
+    except Exception as e:
+        print(f"⚠️  Could not index explanation: {e!r}")
+
+def _with_similar(report: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"summary": report["summary"]}
+    if report.get("similarTo"):
+        result["similarTo"] = report["similarTo"]
+    return result
+
+def _abi_summary(abi: List[dict], address: Optional[str] = None, chain_id: Optional[str] = None) -> Dict[str, Any]:
+    return _with_similar(_abi_report(abi, address, chain_id))
+
+def _abi_report(abi: List[dict], address: Optional[str] = None, chain_id: Optional[str] = None) -> Dict[str, Any]:
+    timer = metrics.StageTimer("abi")
+    f = extract_abi_features(abi)
+    timer.mark("features")
     
     # Check if this is a known contract first
     if address:
-        contract_info = get_contract_info(address)
+        contract_info = get_contract_info(address, chain_id)
+        timer.mark("registry")
         if contract_info:
             # Build summary using known contract info
-            function_explanation = f"\n\n**Functions Breakdown:**\n"
-            function_explanation += f"- **{len(read)} Read-Only Functions**: These let you check information without changing anything (like checking your bank balance).\n"
-            function_explanation += f"- **{len(write)} State-Changing Functions**: These actually modify the contract's data (like making a purchase or transfer).\n"
-            function_explanation += f"- **{len(ev)} Events**: These are notifications that the contract emits when important things happen (like transaction receipts)."
-            
             summary = f"**Contract Name**: {contract_info['name']}\n\n"
             summary += f"**Contract Type**: {contract_info['type']}\n\n"
             summary += contract_info['description']
-            summary += function_explanation
+            summary += _functions_breakdown(f)
             summary += "\n\n**Verification**: ✅ This is a verified, well-known contract used by millions."
+            timer.mark("render")
             
-            return {"summary": summary}
-    
-    # Detect common patterns for unknown contracts
-    has_owner = any("owner" in (x.get("name","").lower()) for x in fx)
-    has_pause = any("pause" in (x.get("name","").lower()) for x in fx)
-    has_transfer = any("transfer" in (x.get("name","").lower()) for x in fx)
-    has_approve = any("approve" in (x.get("name","").lower()) for x in fx)
-    has_mint = any("mint" in (x.get("name","").lower()) for x in fx)
-    has_burn = any("burn" in (x.get("name","").lower()) for x in fx)
-    has_balance = any("balance" in (x.get("name","").lower()) for x in fx)
-    has_upgrade = any("upgrade" in (x.get("name","").lower()) for x in fx)
-    has_fallback = any(x.get("type") == "fallback" for x in abi)
-    has_receive = any(x.get("type") == "receive" for x in abi)
-    
-    # Advanced pattern detection
-    has_swap = any("swap" in (x.get("name","").lower()) for x in fx)
-    has_liquidity = any("liquidity" in (x.get("name","").lower()) for x in fx)
-    has_fulfill = any("fulfill" in (x.get("name","").lower()) for x in fx)
-    has_match = any("match" in (x.get("name","").lower()) for x in fx)
-    has_deposit = any("deposit" in (x.get("name","").lower()) for x in fx)
-    has_borrow = any("borrow" in (x.get("name","").lower()) for x in fx)
-    has_repay = any("repay" in (x.get("name","").lower()) for x in fx)
-    has_stake = any("stake" in (x.get("name","").lower()) for x in fx)
-    has_token_uri = any("tokenuri" in (x.get("name","").lower()) for x in fx)
-    has_owner_of = any("ownerof" in (x.get("name","").lower()) for x in fx)
-    
-    # Enhanced contract type detection with priority order
-    contract_type = "Smart Contract"
-    type_explanation = ""
+            return {"summary": summary, "contractType": contract_info['type']}
     
-    # Check for specific DeFi/Web3 patterns first (more specific)
-    if has_fulfill or has_match:
-        contract_type = "NFT Marketplace or Trading Protocol"
-        type_explanation = "This appears to be a marketplace contract that facilitates trading between buyers and sellers. It matches orders and handles the exchange of NFTs or tokens, similar to how eBay matches buyers with sellers but in a decentralized way."
-    elif has_swap and has_liquidity:
-        contract_type = "DEX (Decentralized Exchange)"
-        type_explanation = "This is a decentralized exchange contract that allows users to swap tokens and provide liquidity. Think of it as an automated currency exchange where users can trade one cryptocurrency for another without a middleman."
-    elif has_swap:
-        contract_type = "DEX Router or Trading Contract"
-        type_explanation = "This contract facilitates token swaps - trading one cryptocurrency for another. It's like a currency exchange service but fully automated and decentralized."
-    elif has_borrow and has_repay and has_deposit:
-        contract_type = "Lending/Borrowing Protocol"
-        type_explanation = "This is a lending protocol where users can deposit crypto to earn interest or borrow against their deposits. Think of it as a decentralized bank where you can be both the lender and borrower."
-    elif has_stake:
-        contract_type = "Staking Contract"
-        type_explanation = "This contract allows users to stake (lock up) their tokens to earn rewards over time. It's similar to a savings account where you earn interest for keeping your money deposited."
-    elif has_token_uri and has_owner_of:
-        contract_type = "NFT Contract (ERC-721)"
-        type_explanation = "This is an NFT contract that manages unique digital items - each token is one-of-a-kind. Think of it like a certificate of authenticity for digital collectibles, art, or game items."
-    elif has_transfer and has_approve and has_balance:
-        contract_type = "Token Contract (ERC-20)"
-        type_explanation = "This is a digital token contract, similar to a digital currency or asset. It allows users to own, send, and receive tokens. Think of it like a bank ledger that tracks who owns what."
-    elif has_upgrade:
-        contract_type = "Proxy or Upgradeable Contract"
-        type_explanation = "This is a proxy contract that can be upgraded. Think of it as a forwarding address - it points to another contract that contains the actual logic, allowing the developers to fix bugs or add features without changing the address."
-    elif has_fallback or has_receive:
-        contract_type = "Wallet or Payment Contract"
-        type_explanation = "This contract can receive cryptocurrency payments directly. It acts like a smart wallet that can hold and manage funds."
-    elif has_owner and has_pause:
-        contract_type = "Managed Contract"
-        type_explanation = "This contract has an administrator who can control certain functions and even pause operations if needed. Think of it like a business with a manager who has special permissions."
-    elif has_owner:
-        contract_type = "Owned Contract"
-        type_explanation = "This contract has an owner with special privileges. The owner can perform administrative actions that regular users cannot."
+    # Detect common patterns for unknown contracts, driven by the feature
+    # bitset; when nothing fits, a near-clone of a known contract still tells
+    # the user more than "Smart Contract".
+    flags = f.flags
+    matched, similar = _classify(flags, ABI_TYPE_RULES, lambda: abi_tokens(abi), timer)
+    contract_type, type_explanation = matched or ABI_DEFAULT_TYPE
     
     # Build detailed capabilities description
-    capabilities = []
-    capability_explanations = []
-    
-    if has_transfer:
-        capabilities.append("transfers")
-        capability_explanations.append("**Transfers**: Users can send tokens or assets to other addresses, like sending money to a friend.")
-    
-    if has_approve:
-        capabilities.append("approvals")
-        capability_explanations.append("**Approvals**: Users can give permission to other contracts or addresses to spend their tokens on their behalf, like authorizing a subscription payment.")
-    
-    if has_mint:
-        capabilities.append("minting")
-        capability_explanations.append("**Minting**: New tokens can be created. This is like a central bank printing money, though typically only authorized users can do this.")
-    
-    if has_burn:
-        capabilities.append("burning")
-        capability_explanations.append("**Burning**: Tokens can be permanently destroyed, reducing the total supply. This is like shredding cash - it's gone forever.")
-    
-    if has_owner:
-        capabilities.append("ownership controls")
-        capability_explanations.append("**Ownership**: Special administrative functions are restricted to the contract owner for security and governance.")
+    capability_explanations = [text for bit, _, text in CAPABILITIES if flags & bit]
     
-    if has_pause:
-        capabilities.append("emergency pause")
-        capability_explanations.append("**Emergency Pause**: The contract can be paused in case of security issues or emergencies, freezing all operations temporarily.")
-    
-    if has_upgrade:
-        capabilities.append("upgradeability")
-        capability_explanations.append("**Upgradeability**: The contract logic can be updated or improved over time without changing the contract address.")
-    
-    # Function breakdown explanation
-    function_explanation = f"\n\n**Functions Breakdown:**\n"
-    function_explanation += f"- **{len(read)} Read-Only Functions**: These let you check information without changing anything (like checking your bank balance).\n"
-    function_explanation += f"- **{len(write)} State-Changing Functions**: These actually modify the contract's data (like making a purchase or transfer).\n"
-    function_explanation += f"- **{len(ev)} Events**: These are notifications that the contract emits when important things happen (like transaction receipts)."
+    has_owner = flags & OWNER
+    has_mint = flags & MINT
+    has_upgrade = flags & UPGRADE
     
     # Security considerations
     security_notes = "\n\n**What to Watch For:**\n"
-    if has_owner and not has_pause:
+    if has_owner and not flags & PAUSE:
         security_notes += "• This contract has an owner with special powers. Make sure you trust who controls it.\n"
     if has_mint and not has_owner:
         security_notes += "• Anyone might be able to create new tokens - verify the minting restrictions.\n"
     if has_upgrade:
         security_notes += "• This contract can be upgraded. The owner could potentially change how it works in the future.\n"
-    if len(write) > len(read) * 2:
+    if f.writes > f.reads * 2:
         security_notes += "• This contract has many state-changing functions. Review what each one does before interacting.\n"
-    if not ev:
+    if not f.events:
         security_notes += "• This contract doesn't emit events, making it harder to track what happens on-chain.\n"
     if not security_notes.strip().endswith(":"):
         security_notes += "\n"
@@ -165,7 +162,7 @@ def _abi_summary(abi: List[dict], address: Optional[str] = None) -> Dict[str, An
     summary_parts = [
         f"**Contract Type**: {contract_type}",
         f"\n{type_explanation}",
-        function_explanation
+        _functions_breakdown(f)
     ]
     
     if capability_explanations:
@@ -174,55 +171,32 @@ def _abi_summary(abi: List[dict], address: Optional[str] = None) -> Dict[str, An
             summary_parts.append(f"\n{cap_exp}")
     
     summary_parts.append(security_notes)
+    summary = "".join(summary_parts)
+    timer.mark("render")
     
-    return {"summary": "".join(summary_parts)}
+    return {"summary": summary, "contractType": contract_type, "similarTo": similar}
 
 def _selector_summary(candidates: Dict[str, List[str]]) -> Dict[str, Any]:
-    flat = []
-    for sig, cands in candidates.items():
-        for c in cands:
-            flat.append(c)
-    uniq = list(dict.fromkeys(flat))[:12]
-    
-    if not uniq:
+    return _with_similar(_selector_report(candidates))
+
+def _selector_report(candidates: Dict[str, List[str]]) -> Dict[str, Any]:
+    timer = metrics.StageTimer("selectors")
+    uniq = unique_signatures(candidates)
+    flags = extract_signature_features(uniq)
+    timer.mark("features")
+    # Selectors match known contracts even when no names are known for them.
+    matched, similar = _classify(flags, SELECTOR_TYPE_RULES, lambda: selector_tokens(candidates), timer)
+    
+    if not uniq and similar is None:
         summary = "**⚠️ Unverified Contract**\n\n"
         summary += "This contract's source code hasn't been verified on block explorers, so we can only analyze its bytecode. "
         summary += "We couldn't find matching function signatures in our database.\n\n"
         summary += "**What this means**: This could be a custom contract, a very new contract, or potentially an obfuscated contract. "
         summary += "**Recommendation**: Exercise extreme caution. Only interact with this contract if you completely trust its source."
-        return {"summary": summary}
+        timer.mark("render")
+        return {"summary": summary, "contractType": None}
     
-    # Enhanced pattern detection
-    has_erc20 = any(s in ["transfer(address,uint256)", "approve(address,uint256)", "balanceOf(address)"] for s in uniq)
-    has_erc721 = any(s in ["safeTransferFrom(address,address,uint256)", "ownerOf(uint256)"] for s in uniq)
-    has_owner = any("owner" in s.lower() for s in uniq)
-    has_pause = any("pause" in s.lower() for s in uniq)
-    has_mint = any("mint" in s.lower() for s in uniq)
-    has_swap = any("swap" in s.lower() for s in uniq)
-    has_stake = any("stake" in s.lower() for s in uniq)
-    
-    # Determine likely contract type
-    contract_hint = ""
-    explanation = ""
-    
-    if has_erc721:
-        contract_hint = "NFT Contract (ERC-721)"
-        explanation = "This appears to be an NFT contract - it manages unique digital items like art, collectibles, or game items. Each token has a unique ID."
-    elif has_erc20:
-        contract_hint = "Token Contract (ERC-20)"
-        explanation = "This looks like a fungible token contract - it creates a digital currency or token where each unit is identical, like dollars or points."
-    elif has_swap:
-        contract_hint = "Exchange or DEX Contract"
-        explanation = "This appears to be a decentralized exchange contract that allows users to swap between different tokens, like a currency exchange."
-    elif has_stake:
-        contract_hint = "Staking Contract"
-        explanation = "This looks like a staking contract where users can lock up their tokens to earn rewards, similar to a savings account with interest."
-    elif has_owner and has_pause:
-        contract_hint = "Managed Contract"
-        explanation = "This is a contract with administrative controls, allowing an owner to manage operations and pause functionality if needed."
-    else:
-        contract_hint = "Custom Contract"
-        explanation = "This is a custom smart contract with specialized functionality."
+    contract_hint, explanation = matched or SELECTOR_DEFAULT_TYPE
     
     # Build comprehensive summary
     summary_parts = [
@@ -238,87 +212,427 @@ def _selector_summary(candidates: Dict[str, List[str]]) -> Dict[str, Any]:
     
     if len(uniq) > 8:
         summary_parts.append(f"\n...and {len(uniq) - 8} more functions\n")
+    elif not uniq:
+        summary_parts.append(f"{len(candidates)} function selectors found, none with a known name.\n")
     
     summary_parts.append("\n**Important Notes:**\n")
     summary_parts.append("• These function names are **best guesses** based on bytecode signatures - they may not be 100% accurate.\n")
     summary_parts.append("• Without verified source code, we can't see the actual implementation or security measures.\n")
     summary_parts.append("• **Recommendation**: Be extremely cautious. Only interact with unverified contracts if you completely trust the source.\n")
     summary_parts.append("• Consider asking the contract developers to verify the source code on a block explorer like Etherscan.")
+    summary = "".join(summary_parts)
+    timer.mark("render")
     
-    return {"summary": "".join(summary_parts)}
+    return {"summary": summary, "contractType": contract_hint, "similarTo": similar}
+
+def _flag_fields(flags: int) -> Dict[str, Any]:
+    return {
+        "flags": flags,
+        "features": feature_list(flags),
+        "capabilities": [name for bit, name, _ in CAPABILITIES if flags & bit],
+    }
+
+def _abi_structured(abi: List[dict], address: Optional[str] = None, chain_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    What _abi_report detects, as compact fields for clients that render their
+    own text. No summary string is built and the LLM is never called.
+    """
+    timer = metrics.StageTimer("abi")
+    f = extract_abi_features(abi)
+    timer.mark("features")
+    result: Dict[str, Any] = {
+        **_flag_fields(f.flags),
+        "counts": {"functions": f.functions, "reads": f.reads, "writes": f.writes, "events": f.events},
+        "source": "fallback",
+    }
+    contract_info = None
+    if address:
+        contract_info = get_contract_info(address, chain_id)
+        timer.mark("registry")
+    if contract_info:
+        result["contractType"] = contract_info["type"]
+        result["contractName"] = contract_info["name"]
+        return result
+    matched, similar = _classify(f.flags, ABI_TYPE_RULES, lambda: abi_tokens(abi), timer)
+    result["contractType"] = (matched or ABI_DEFAULT_TYPE)[0]
+    if similar:
+        result["similarTo"] = similar
+    return result
+
+def _selector_structured(candidates: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Compact counterpart of _selector_report; see _abi_structured."""
+    timer = metrics.StageTimer("selectors")
+    uniq = unique_signatures(candidates)
+    flags = extract_signature_features(uniq)
+    timer.mark("features")
+    matched, similar = _classify(flags, SELECTOR_TYPE_RULES, lambda: selector_tokens(candidates), timer)
+    result: Dict[str, Any] = {
+        "contractType": (matched or SELECTOR_DEFAULT_TYPE)[0] if uniq or similar else None,
+        **_flag_fields(flags),
+        "counts": {"selectors": len(candidates), "resolved": sum(1 for c in candidates.values() if c)},
+        "functions": uniq,
+        "source": "fallback",
+    }
+    if similar:
+        result["similarTo"] = similar
+    return result
+
+def _structured(
+    mode: str,
+    abi: Optional[List[dict]] = None,
+    candidates: Optional[Dict[str, List[str]]] = None,
+    address: Optional[str] = None,
+    chain_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """The output=structured response for a payload's fields."""
+    if mode == "abi" and abi:
+        return _abi_structured(abi, address, chain_id)
+    if mode == "selectors" and candidates:
+        return _selector_structured(candidates)
+    return {"contractType": None, "source": "fallback"}
+
+async def _analyze(fn, abi: Optional[List[dict]], *args: Any) -> Dict[str, Any]:
+    """fn(abi, *args), off the event loop when the ABI is large."""
+    if abi is None or len(abi) <= INLINE_ANALYSIS_MAX:
+        return fn(abi, *args)
+    async with _analysis_slots:
+        return await asyncio.to_thread(fn, abi, *args)
+
+async def astructured(
+    mode: str,
+    abi: Optional[List[dict]] = None,
+    candidates: Optional[Dict[str, List[str]]] = None,
+    address: Optional[str] = None,
+    chain_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """_structured for async handlers."""
+    return await _analyze(
+        lambda abi: _structured(mode, abi, candidates, address, chain_id), abi if mode == "abi" else None)
+
+async def aabi_report(abi: List[dict], address: Optional[str] = None, chain_id: Optional[str] = None) -> Dict[str, Any]:
+    """_abi_report for async handlers."""
+    return await _analyze(_abi_report, abi, address, chain_id)
+
+def _proxy_note(proxy: Dict[str, Any]) -> str:
+    """Lead-in for summaries of bytecode that evm.detect_proxy flagged."""
+    if proxy["kind"] == "eip1167":
+        return (
+            "**🔀 Minimal Proxy (EIP-1167)**\n"
+            f"This contract is a clone: every call is forwarded to the implementation at `{proxy['implementation']}`, "
+            "which holds the real logic. Look up that address to see what this contract actually does."
+        )
+    note = "**🔀 Upgradeable Proxy (EIP-1967)**\n"
+    if "beacon" in proxy["slots"]:
+        note += "Calls are forwarded to an implementation whose address comes from a separate beacon contract. "
+    else:
+        note += "Calls are forwarded to an implementation contract whose address is stored in the standard EIP-1967 slot. "
+    note += "The real logic lives there and can be replaced by an upgrade, so any functions detected here belong to the proxy itself."
+    return note
+
+def _is_generic_abi_summary(summary_text: str) -> bool:
+    return metrics.record_generic("abi", (
+        "Smart Contract" in summary_text and 
+        len(summary_text) < 500  # Short generic response
+    ))
 
-def run_roma_for_abi(abi: List[dict], address: Optional[str] = None) -> Dict[str, Any]:
+def _is_generic_selector_summary(summary_text: str) -> bool:
+    return metrics.record_generic("selectors", (
+        "custom smart contract" in summary_text.lower() and
+        len(summary_text) < 600  # Short generic response
+    ))
+
+def _abi_context(abi: List[dict]) -> str:
+    return abi_prompt(abi)
+
+def _selector_context(candidates: Dict[str, List[str]]) -> str:
+    return selector_prompt(candidates)
+
+def _llm_explain(name: str, **inputs: str) -> str:
+    """One blocking LLM call, recorded in /metrics with its token usage."""
+    started = time.perf_counter()
+    outcome, usage = "error", None
+    try:
+        predictor = llm.predictor(name)
+        with llm.call_settings():
+            result = predictor(**inputs)
+        outcome, usage = "ok", llm.usage(result)
+        return result.explanation
+    finally:
+        metrics.record_llm_call(name, time.perf_counter() - started, outcome, usage)
+
+def _llm_explain_abi(abi: List[dict]) -> str:
+    return _llm_explain("abi", context=_abi_context(abi))
+
+def _llm_explain_selectors(candidates: Dict[str, List[str]]) -> str:
+    return _llm_explain("selectors", functions=_selector_context(candidates))
+
+UPGRADE_HEADING = "\n\n**What Changed in the Latest Upgrade:**\n"
+
+def _merge_upgrade(previous: str, explanation: str) -> str:
+    """The previous explanation, with its own upgrade section replaced by this one."""
+    return previous.split(UPGRADE_HEADING, 1)[0] + UPGRADE_HEADING + explanation
+
+def _llm_explain_upgrade(previous: str, changes: Dict[str, Any], abi: List[dict]) -> str:
+    # abi is what llm_gate passes every LLM stage; the changes say it all.
+    explanation = _llm_explain("changes", previous=previous, changes=changes_prompt(changes))
+    return _merge_upgrade(previous, explanation)
+
+async def _astream_explanation(name: str, **inputs: str) -> AsyncIterator[str]:
+    """
+    Yield the explanation field incrementally as the LM generates it.
+    Falls back to one chunk per call on DSPy versions without streamify.
+    """
+    started = time.perf_counter()
+    outcome, usage = "error", None
+    try:
+        # First use may import the LLM stack; keep that off the event loop.
+        await asyncio.to_thread(llm.ensure_loaded)
+        dspy = llm.dspy_module()
+        predictor = llm.predictor(name)
+        streamify = getattr(dspy, "streamify", None)
+        # The stream is driven from one task (streaming._pump), so the
+        # settings are entered and left in the same context.
+        with llm.call_settings():
+            if streamify is None:
+                result = await asyncio.to_thread(predictor, **inputs)
+                usage = llm.usage(result)
+                yield result.explanation
+            else:
+                program = streamify(
+                    predictor,
+                    stream_listeners=[dspy.streaming.StreamListener(signature_field_name="explanation")],
+                )
+                streamed = False
+                async for item in program(**inputs):
+                    if isinstance(item, dspy.streaming.StreamResponse):
+                        streamed = True
+                        yield item.chunk
+                    elif isinstance(item, dspy.Prediction):
+                        usage = llm.usage(item)
+                        if not streamed:
+                            yield item.explanation
+        outcome = "ok"
+    except (GeneratorExit, asyncio.CancelledError):
+        # Abandoned by the caller, e.g. on timeout.
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.record_llm_call(name, time.perf_counter() - started, outcome, usage)
+
+def astream_llm_abi(abi: List[dict]) -> AsyncIterator[str]:
+    return _astream_explanation("abi", context=_abi_context(abi))
+
+def astream_llm_selectors(candidates: Dict[str, List[str]]) -> AsyncIterator[str]:
+    return _astream_explanation("selectors", functions=_selector_context(candidates))
+
+# The blocking variants below are for the bulk indexer. Like the async ones
+# they wait for the LLM only until llm_gate's deadline, skip it while the
+# circuit breaker is open, and mark any fallback after an LLM attempt
+# "provisional" so callers do not cache it. A late result still reaches the
+# result cache.
+
+def _llm_result(fn, body: Any, tokens, address: Optional[str] = None) -> Dict[str, Any]:
+    explanation = fn(body)
+    _remember(tokens(body), explanation, address)
+    return {"summary": explanation, "source": "roma"}
+
+def _run_llm(
+    key: str, fn, body: Any, tokens, fallback_result: Dict[str, Any], address: Optional[str] = None,
+) -> Dict[str, Any]:
+    if not llm_gate.breaker.allow():
+        print("ℹ️  LLM circuit breaker open, using fallback")
+        return {**fallback_result, "source": "fallback", "provisional": True}
+    try:
+        return llm_gate.call(_llm_result, fn, body, tokens, address,
+                             on_late=lambda result: result_cache.set(key, result))
+    except DeadlineExceeded:
+        print("⏱️  AI past the deadline, using fallback; the result will be cached when it arrives")
+    except Exception as e:
+        print(f"⚠️  AI failed: {e!r}, using fallback anyway")
+    return {**fallback_result, "source": "fallback", "provisional": True}
+
+def run_roma_for_abi(abi: List[dict], address: Optional[str] = None, chain_id: Optional[str] = None) -> Dict[str, Any]:
     # PRIORITY ORDER:
     # 1. Contract Registry (famous contracts) - handled before this function
     # 2. Fallback Pattern Detection (FREE) - always try first
     # 3. ROMA AI (COSTS $) - ONLY if fallback gives generic/unhelpful result
     
     # Always try free fallback first
-    fallback_result = _abi_summary(abi, address)
-    
-    # Check if fallback gave us a good result or just generic info
-    summary_text = fallback_result.get("summary", "")
-    is_generic = (
-        "Smart Contract" in summary_text and 
-        len(summary_text) < 500  # Short generic response
-    )
+    fallback_result = _abi_summary(abi, address, chain_id)
     
     # Only use AI as LAST RESORT if fallback is too generic AND AI is available
-    if is_generic and ROMA_AVAILABLE:
-        try:
-            print("ℹ️  Fallback too generic, using AI as last resort...")
-            class ContractExplainer(dspy.Signature):
-                """Explain a smart contract in simple, non-technical language."""
-                context = dspy.InputField(desc="Smart contract ABI information")
-                explanation = dspy.OutputField(desc="Simple, friendly explanation with formatting")
-            
-            predictor = dspy.ChainOfThought(ContractExplainer)
-            context = f"Analyze this contract with {len(abi)} ABI entries. ABI: {str(abi[:15])}"
-            result = predictor(context=context)
-            return {"summary": result.explanation, "source": "roma"}
-        except Exception as e:
-            print(f"⚠️  AI failed: {e}, using fallback anyway")
+    if _is_generic_abi_summary(fallback_result.get("summary", "")) and llm.available():
+        print("ℹ️  Fallback too generic, using AI as last resort...")
+        key = explain_cache_key("abi", abi=abi, address=address, chain_id=chain_id)
+        return _run_llm(key, _llm_explain_abi, abi, abi_tokens, fallback_result, address)
     
     # Use free fallback (either it's good, or AI isn't available/failed)
     return {**fallback_result, "source": "fallback"}
 
 def run_roma_for_selectors(candidates: Dict[str, List[str]]) -> Dict[str, Any]:
-    # PRIORITY ORDER:
-    # 1. Contract Registry (famous contracts) - handled before this function
-    # 2. Fallback Pattern Detection (FREE) - always try first
-    # 3. ROMA AI (COSTS $) - ONLY if fallback gives generic/unhelpful result
-    
-    # Always try free fallback first
+    # Same priority order as run_roma_for_abi
     fallback_result = _selector_summary(candidates)
     
-    # Check if fallback gave us useful pattern detection or just generic warning
-    summary_text = fallback_result.get("summary", "")
-    is_generic = (
-        "custom smart contract" in summary_text.lower() and
-        len(summary_text) < 600  # Short generic response
-    )
-    
     # Only use AI as LAST RESORT if fallback is too generic AND AI is available
-    if is_generic and ROMA_AVAILABLE:
-        try:
-            print("ℹ️  Fallback too generic for unverified contract, using AI as last resort...")
-            flat = []
-            for sig, cands in candidates.items():
-                for c in cands:
-                    flat.append(c)
-            uniq = list(dict.fromkeys(flat))[:12]
-            
-            class UnverifiedContractExplainer(dspy.Signature):
-                """Explain an unverified smart contract based on function signatures."""
-                functions = dspy.InputField(desc="List of detected function signatures")
-                explanation = dspy.OutputField(desc="Simple explanation with security warnings")
-            
-            predictor = dspy.ChainOfThought(UnverifiedContractExplainer)
-            context = f"Functions detected: {', '.join(uniq)}"
-            result = predictor(functions=context)
-            return {"summary": result.explanation, "source": "roma"}
-        except Exception as e:
-            print(f"⚠️  AI failed: {e}, using fallback anyway")
+    if _is_generic_selector_summary(fallback_result.get("summary", "")) and llm.available():
+        print("ℹ️  Fallback too generic for unverified contract, using AI as last resort...")
+        key = explain_cache_key("selectors", candidates=candidates)
+        return _run_llm(key, _llm_explain_selectors, candidates, selector_tokens, fallback_result)
     
     # Use free fallback (either it's good, or AI isn't available/failed)
     return {**fallback_result, "source": "fallback"}
+
+# Async variants for the HTTP service. The fallback runs inline (it takes
+# microseconds) unless the caller already computed it; only the LLM stage goes
+# through llm_gate, so fallback-only requests never queue behind slow LLM
+# calls. Identical concurrent requests share one in-flight LLM call, keyed by
+# the cache key.
+#
+# The request waits for the LLM only until llm_gate's deadline. Past it, the
+# fallback is returned marked "provisional" (callers neither cache nor ETag
+# it) and the LLM call finishes in the background, storing its result in the
+# result cache for the next request. While the circuit breaker is open the
+# LLM is skipped, and when the call fails or times out the fallback is
+# provisional too: one upstream error must not pin a fallback in the cache.
+
+async def _llm_stage(key: str, fn, body: Any, tokens, address: Optional[str] = None) -> Dict[str, Any]:
+    explanation = await llm_gate.run(key, fn, body)
+    if tokens is not None:
+        await asyncio.to_thread(lambda: _remember(tokens(body), explanation, address))
+    return {"summary": explanation, "source": "roma"}
+
+async def _arun_llm(
+    key: str, fn, body: Any, tokens, fallback_result: Dict[str, Any], address: Optional[str] = None,
+) -> Dict[str, Any]:
+    if not llm_gate.breaker.allow():
+        print("ℹ️  LLM circuit breaker open, using fallback")
+        return {**fallback_result, "source": "fallback", "provisional": True}
+    try:
+        return await llm_gate.within(
+            _llm_stage(key, fn, body, tokens, address),
+            on_late=lambda result: result_cache.aset(key, result),
+        )
+    except DeadlineExceeded:
+        print("⏱️  AI past the request deadline, using fallback; the result will be cached when it arrives")
+        return {**fallback_result, "source": "fallback", "provisional": True}
+    except asyncio.TimeoutError:
+        print("⚠️  AI timed out, using fallback anyway")
+    except Exception as e:
+        print(f"⚠️  AI failed: {e!r}, using fallback anyway")
+    return {**fallback_result, "source": "fallback", "provisional": True}
+
+async def arun_roma_for_abi(
+    abi: List[dict],
+    address: Optional[str] = None,
+    key: Optional[str] = None,
+    fallback_result: Optional[Dict[str, Any]] = None,
+    chain_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    if fallback_result is None:
+        fallback_result = await _analyze(_abi_summary, abi, address, chain_id)
+    
+    if _is_generic_abi_summary(fallback_result.get("summary", "")) and llm.available():
+        print("ℹ️  Fallback too generic, using AI as last resort...")
+        key = key or explain_cache_key("abi", abi=abi, address=address, chain_id=chain_id)
+        return await _arun_llm(key, _llm_explain_abi, abi, abi_tokens, fallback_result, address)
+    
+    return {**fallback_result, "source": "fallback"}
+
+async def arun_roma_for_upgrade(
+    abi: List[dict],
+    previous: Dict[str, Any],
+    changes: Dict[str, Any],
+    address: str,
+    key: Optional[str] = None,
+    fallback_result: Optional[Dict[str, Any]] = None,
+    chain_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    arun_roma_for_abi for a new version of a contract. previous is the
+    {"summary", "source"} of the version before; if that came from the LLM,
+    only the changes go to the LLM and its answer is merged into it. The
+    merged text is about this contract: its in-flight call and late result
+    use upgrade_cache_key, and it is not added to the similarity index.
+    """
+    if fallback_result is None:
+        fallback_result = await _analyze(_abi_summary, abi, address, chain_id)
+    
+    if _is_generic_abi_summary(fallback_result.get("summary", "")) and llm.available():
+        if previous.get("source") == "roma":
+            print("ℹ️  Contract upgraded, explaining only what changed...")
+            explain = functools.partial(_llm_explain_upgrade, previous["summary"], changes)
+            own_key = upgrade_cache_key(chain_id, address, abi_hash(abi))
+            return await _arun_llm(own_key, explain, abi, None, fallback_result, address)
+        print("ℹ️  Fallback too generic, using AI as last resort...")
+        key = key or explain_cache_key("abi", abi=abi, address=address, chain_id=chain_id)
+        return await _arun_llm(key, _llm_explain_abi, abi, abi_tokens, fallback_result, address)
+    
+    return {**fallback_result, "source": "fallback"}
+
+async def arun_roma_versioned(
+    abi: List[dict],
+    address: str,
+    chain_id: str,
+    key: Optional[str] = None,
+    cached: Optional[Dict[str, Any]] = None,
+    fallback_result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    arun_roma_for_abi for a contract tracked in abi_store, given its result
+    cache entry if there is one. After an upgrade with few changes, only
+    those are explained. The result carries "changes" once the contract has
+    more than one version.
+    """
+    # Registry contracts are not tracked, so this is a pure content hash.
+    key = key or explain_cache_key("abi", abi=abi, address=address, chain_id=chain_id)
+    content_hash = abi_hash(abi)
+    previous = await abi_store.alatest(chain_id, address)
+    changes = None
+    if previous is not None and previous.abi_hash != content_hash:
+        with metrics.stage("abi_diff", "abi"):
+            changes = await asyncio.to_thread(abi_diff, previous.abi, abi)
+    # A new hash with an empty diff is the same version (abi_store._update).
+    upgraded = changes is not None and not is_empty(changes)
+    own_key = upgrade_cache_key(chain_id, address, content_hash)
+    result = None
+    if not upgraded and previous is not None:
+        if previous.result and previous.result["source"] == "roma":
+            # This contract's own LLM explanation, merged after an upgrade
+            # or not; it outlives the result cache.
+            result = dict(previous.result)
+        elif previous.diff is not None:
+            # An upgrade explanation that finished after its request.
+            result = await result_cache.aget(own_key)
+    if result is None:
+        result = cached
+    if result is None:
+        merge = upgraded and previous.result and is_small(changes)
+        if merge:
+            result = await arun_roma_for_upgrade(
+                abi, previous.result, changes, address, key, fallback_result, chain_id)
+        else:
+            result = await arun_roma_for_abi(abi, address, key, fallback_result, chain_id)
+        if not result.get("provisional"):
+            merged = merge and previous.result["source"] == "roma" and result["source"] == "roma"
+            with metrics.stage("cache_store", "abi"):
+                await result_cache.aset(own_key if merged else key, result)
+    current = await abi_store.arecord(
+        chain_id, address, content_hash, abi, None if result.get("provisional") else result, previous, changes)
+    if current.diff is not None:
+        result = {**result, "changes": {"version": current.version, **current.diff}}
+    return result
+
+async def arun_roma_for_selectors(
+    candidates: Dict[str, List[str]],
+    key: Optional[str] = None,
+    fallback_result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    if fallback_result is None:
+        fallback_result = _selector_summary(candidates)
+    
+    if _is_generic_selector_summary(fallback_result.get("summary", "")) and llm.available():
+        print("ℹ️  Fallback too generic for unverified contract, using AI as last resort...")
+        key = key or explain_cache_key("selectors", candidates=candidates)
+        return await _arun_llm(key, _llm_explain_selectors, candidates, selector_tokens, fallback_result)
+    
+    return {**fallback_result, "source": "fallback"}
@@ -0,0 +1,168 @@
+"""
+Batch analysis behind /explain/batch.
+
+A batch is processed in three steps:
+1. Items are keyed by content hash; identical ABIs or selector sets inside the
+   batch are analyzed once, and keys already in the result cache are skipped.
+2. The rule-based fallback for the remaining keys is fanned out over a thread
+   or process pool in chunks (ROMA_BATCH_EXECUTOR, ROMA_BATCH_WORKERS).
+3. Keys whose fallback is too generic go to the LLM together; llm_gate bounds
+   how many of those calls run at once.
+
+Results come back in input order. A bad item yields {"error": ...} in its
+slot instead of failing the batch. Items get what /explain would return:
+output=structured is honored, and ABI items for contracts tracked in
+abi_store are versioned like on /explain (after the shared fallback step).
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from abi_store import abi_store
+from agents import (
+    _abi_summary, _selector_summary, arun_roma_for_abi, arun_roma_for_selectors,
+    arun_roma_versioned, astructured,
+)
+from cache import explain_cache_key, result_cache
+
+# (mode, abi or candidates, address, chainId)
+Job = Tuple[str, Any, Optional[str], Optional[str]]
+
+_executor: Optional[Executor] = None
+_workers = 1
+
+
+def _get_executor() -> Executor:
+    global _executor, _workers
+    if _executor is None:
+        _workers = int(os.getenv("ROMA_BATCH_WORKERS", str(os.cpu_count() or 2)))
+        if os.getenv("ROMA_BATCH_EXECUTOR", "thread") == "process":
+            _executor = ProcessPoolExecutor(max_workers=_workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="batch")
+    return _executor
+
+
+def _fallback_chunk(jobs: List[Job]) -> List[Dict[str, Any]]:
+    """Run the rule-based analyzers for a chunk of jobs (picklable, top level)."""
+    out = []
+    for mode, body, address, chain_id in jobs:
+        try:
+            if mode == "abi":
+                out.append(_abi_summary(body, address, chain_id))
+            else:
+                out.append(_selector_summary(body))
+        except Exception as e:
+            out.append({"error": f"analysis failed: {e}"})
+    return out
+
+
+def _job_for(p: Any) -> Optional[Tuple[str, Job]]:
+    if p.mode == "abi" and p.abi:
+        key = explain_cache_key("abi", abi=p.abi, address=p.address, chain_id=p.chainId)
+        return key, ("abi", p.abi, p.address, p.chainId)
+    if p.mode == "selectors" and p.candidates:
+        return explain_cache_key("selectors", candidates=p.candidates), ("selectors", p.candidates, None, None)
+    return None
+
+
+async def _fallbacks(jobs: Dict[str, Job]) -> Dict[str, Dict[str, Any]]:
+    keys = list(jobs)
+    if not keys:
+        return {}
+    executor = _get_executor()
+    size = max(1, -(-len(keys) // (_workers * 4)))
+    chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+    loop = asyncio.get_running_loop()
+    outputs = await asyncio.gather(*(
+        loop.run_in_executor(executor, _fallback_chunk, [jobs[k] for k in chunk])
+        for chunk in chunks
+    ), return_exceptions=True)
+    merged: Dict[str, Dict[str, Any]] = {}
+    for chunk, out in zip(chunks, outputs):
+        if isinstance(out, BaseException):
+            out = [{"error": f"analysis failed: {out}"}] * len(chunk)
+        merged.update(zip(chunk, out))
+    return merged
+
+
+async def _finish(key: str, job: Job, fallback_result: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in fallback_result:
+        return fallback_result
+    mode, body, address, chain_id = job
+    if mode == "abi":
+        result = await arun_roma_for_abi(body, address, key, fallback_result=fallback_result, chain_id=chain_id)
+    else:
+        result = await arun_roma_for_selectors(body, key, fallback_result=fallback_result)
+    if not result.get("provisional"):
+        await result_cache.aset(key, result)
+    return result
+
+
+async def explain_batch(payloads: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Explain validated payloads (or the exceptions that rejected them), in
+    order, as /explain would answer each one.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    groups: Dict[str, List[int]] = {}
+    # Items for contracts tracked in abi_store, per contract in input order.
+    versioned: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+    jobs: Dict[str, Job] = {}
+
+    for i, p in enumerate(payloads):
+        if isinstance(p, Exception):
+            results[i] = {"error": str(p)}
+            continue
+        if p.output == "structured":
+            results[i] = await astructured(p.mode, p.abi, p.candidates, p.address, p.chainId)
+            continue
+        keyed = _job_for(p)
+        if keyed is None:
+            results[i] = {"summary": "No content to analyze"}
+            continue
+        key, job = keyed
+        jobs.setdefault(key, job)
+        if job[0] == "abi" and abi_store.tracks(p.address, p.chainId):
+            versioned.setdefault((p.chainId, p.address.lower()), []).append((i, key))
+        else:
+            groups.setdefault(key, []).append(i)
+
+    resolved: Dict[str, Dict[str, Any]] = {}
+    pending: Dict[str, Job] = {}
+    for key, job in jobs.items():
+        cached = await result_cache.aget(key)
+        if cached is not None:
+            resolved[key] = cached
+        else:
+            pending[key] = job
+
+    fallbacks = await _fallbacks(pending)
+    shared = [key for key in groups if key in pending]
+    finished = await asyncio.gather(*(_finish(k, pending[k], fallbacks[k]) for k in shared))
+    resolved.update(zip(shared, finished))
+    for key, indices in groups.items():
+        for i in indices:
+            results[i] = dict(resolved[key])
+
+    final = {k: v for k, v in resolved.items() if not v.get("provisional") and "error" not in v}
+
+    async def explain_versions(items: List[Tuple[int, str]]) -> None:
+        # One at a time, so each item sees the version recorded before it.
+        for i, key in items:
+            p, fallback_result = payloads[i], fallbacks.get(key)
+            if fallback_result is not None and "error" in fallback_result:
+                results[i] = fallback_result
+                continue
+            result = await arun_roma_versioned(p.abi, p.address, p.chainId, key, final.get(key), fallback_result)
+            if key not in final:
+                # Merged upgrade text is kept per contract, never under key.
+                shared_result = await result_cache.aget(key)
+                if shared_result is not None:
+                    final[key] = shared_result
+            results[i] = result
+
+    await asyncio.gather(*(explain_versions(items) for items in versioned.values()))
+    return results
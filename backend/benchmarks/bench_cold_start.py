@@ -0,0 +1,65 @@
+"""
+Benchmark: worker cold start.
+
+Each run is a fresh interpreter, like a new uvicorn worker or serverless
+instance. It reports how long `import main` takes and the latency of the
+first /explain request that only needs the rule-based fallback. A dummy
+OPENAI_API_KEY is set so the LLM stack counts as configured; no LLM call is
+made.
+
+Run from the backend directory:
+
+    python benchmarks/bench_cold_start.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+import httpx
+
+abi = [{"type": "function", "name": n, "stateMutability": "nonpayable"}
+       for n in ("transfer", "approve", "balanceOf")]
+
+async def first_request():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        r = await client.post("/explain", json={"mode": "abi", "address": "0x0", "chainId": "1", "abi": abi})
+        r.raise_for_status()
+        return time.perf_counter() - start
+
+t2 = asyncio.run(first_request())
+print(json.dumps({"import_s": t1 - t0, "first_request_s": t2}))
+"""
+
+
+def run_once():
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-bench-dummy")}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [run_once() for _ in range(runs)]
+    for field in ("import_s", "first_request_s"):
+        values = [s[field] for s in samples]
+        print(f"{field:<16} median {statistics.median(values) * 1000:8.1f} ms   "
+              f"min {min(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
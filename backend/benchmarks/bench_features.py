@@ -0,0 +1,79 @@
+"""
+Benchmark: single-pass feature extraction vs. the original per-keyword scans.
+
+Run from the backend directory:
+
+    python benchmarks/bench_features.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import extract_abi_features  # noqa: E402
+
+_KEYWORDS = (
+    "owner", "pause", "transfer", "approve", "mint", "burn", "balance",
+    "upgrade", "swap", "liquidity", "fulfill", "match", "deposit", "borrow",
+    "repay", "stake", "tokenuri", "ownerof",
+)
+
+_STEMS = (
+    "get", "set", "update", "claim", "execute", "facet", "route", "quote",
+    "harvest", "rebalance", "withdraw", "Reward", "Fee", "Pool", "Vault",
+    "Order", "Position", "Config", "Oracle", "Price", "Allowance", "Nonce",
+    "transfer", "approve", "swap", "deposit", "stake", "Owner", "mint",
+)
+
+
+def legacy_flags(abi):
+    """The detection loop _abi_summary used before features.py."""
+    fx = [x for x in abi if x.get("type") == "function"]
+    ev = [x for x in abi if x.get("type") == "event"]
+    write = [x for x in fx if x.get("stateMutability") not in ("view", "pure")]
+    read = [x for x in fx if x.get("stateMutability") in ("view", "pure")]
+    found = [any(k in (x.get("name", "").lower()) for x in fx) for k in _KEYWORDS]
+    found.append(any(x.get("type") == "fallback" for x in abi))
+    found.append(any(x.get("type") == "receive" for x in abi))
+    return found, len(read), len(write), len(ev)
+
+
+def synthetic_abi(n, seed=0):
+    rng = random.Random(seed)
+    abi = []
+    for i in range(n):
+        name = "".join(rng.sample(_STEMS, 2)) + str(i % 97)
+        if rng.random() < 0.85:
+            abi.append({
+                "type": "function",
+                "name": name,
+                "stateMutability": rng.choice(("view", "pure", "nonpayable", "payable")),
+                "inputs": [{"type": "uint256", "name": "x"}],
+                "outputs": [],
+            })
+        else:
+            abi.append({"type": "event", "name": name[:1].upper() + name[1:], "inputs": []})
+    return abi
+
+
+def bench(label, fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<28} {best * 1e6:10.1f} us")
+    return best
+
+
+def main():
+    for size in (20, 1000, 3000):
+        abi = synthetic_abi(size, seed=size)
+        number = max(10, 20000 // size)
+        print(f"ABI with {size} entries")
+        legacy = bench("legacy (per-keyword scans)", lambda: legacy_flags(abi), number)
+        single = bench("single pass + matcher", lambda: extract_abi_features(abi), number)
+        print(f"  speedup: {legacy / single:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
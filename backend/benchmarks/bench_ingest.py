@@ -0,0 +1,94 @@
+"""
+Benchmark: request ingestion (ingest.py) vs. FastAPI's default body handling
+(json.loads of the whole body, then pydantic validation of every field).
+
+The body is shaped like what the frontend sends: a solc-style ABI plus the
+Sourcify metadata.json with embedded sources and a copy of the ABI. Run from
+the backend directory:
+
+    python benchmarks/bench_ingest.py
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ingest  # noqa: E402
+from corpus import synthetic_abi  # noqa: E402
+from main import AbiPayload  # noqa: E402
+
+_WORDS = ("uint256", "address", "require", "emit", "mapping", "function", "return", "msg.sender", "external", "view")
+
+
+def fake_source(size, rng):
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append("    " + " ".join(rng.choice(_WORDS) for _ in range(8)) + ' "quoted" {};')
+    return "\n".join(lines)
+
+
+def body(abi_size, source_bytes, seed=0):
+    rng = random.Random(seed)
+    abi = synthetic_abi(abi_size, seed)
+    files = max(1, source_bytes // 40_000)
+    metadata = {
+        "compiler": {"version": "0.8.24+commit.e11b9ed9"},
+        "language": "Solidity",
+        "output": {"abi": abi, "devdoc": {"kind": "dev", "methods": {}}, "userdoc": {}},
+        "settings": {"metadata": {"bytecodeHash": "ipfs"}, "optimizer": {"enabled": True, "runs": 200}},
+        "sources": {
+            f"contracts/File{i}.sol": {"content": fake_source(source_bytes // files, rng), "keccak256": "0x" + "ab" * 32}
+            for i in range(files)
+        },
+    }
+    return json.dumps({"mode": "abi", "address": "0x" + "ab" * 20, "chainId": "1", "abi": abi, "metadata": metadata}).encode()
+
+
+def default_path(raw):
+    return AbiPayload.model_validate(json.loads(raw))
+
+
+def ingest_path(raw):
+    return AbiPayload.model_validate(ingest.decode(raw))
+
+
+def ingest_fallback(raw):
+    """ingest without msgspec: orjson/json, then drop metadata and slim."""
+    return AbiPayload.model_validate(ingest._slim_body(ingest.loads(raw)))
+
+
+def peak_kb(fn, raw):
+    tracemalloc.start()
+    fn(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench(label, fn, raw, number):
+    best = min(timeit.repeat(lambda: fn(raw), number=number, repeat=5)) / number
+    print(f"  {label:<18} {best * 1e3:9.2f} ms  peak {peak_kb(fn, raw):9.0f} KB")
+    return best
+
+
+def main():
+    for abi_size, source_bytes in ((50, 200_000), (200, 2_000_000), (3000, 8_000_000)):
+        raw = body(abi_size, source_bytes)
+        print(f"{abi_size}-entry ABI, {len(raw) / 1e6:.1f} MB body")
+        old = bench("json + pydantic", default_path, raw, 5)
+        fallback = bench("ingest, no msgspec", ingest_fallback, raw, 5)
+        if ingest.msgspec is None:
+            print(f"  speedup: {old / fallback:.1f}x (pip install msgspec for the schema decoder)\n")
+            continue
+        new = bench("ingest", ingest_path, raw, 5)
+        print(f"  speedup: {old / new:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: LLM prompt size with the compact interface encoder (prompt.py)
+vs. the previous prompts (the repr of the first 15 ABI entries; the first 12
+selector signatures joined with commas).
+
+Token counts use prompt.estimate_tokens for both sides. The coverage column
+is the share of the contract's functions, events and errors that appear in
+the prompt. Run from the backend directory:
+
+    python benchmarks/bench_prompt.py
+    ROMA_PROMPT_TOKENS=600 python benchmarks/bench_prompt.py
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import selector_candidates, synthetic_abi  # noqa: E402
+from features import unique_signatures  # noqa: E402
+from prompt import TOKEN_BUDGET, abi_prompt, estimate_tokens, selector_prompt  # noqa: E402
+
+
+def old_abi_context(abi):
+    return f"Analyze this contract with {len(abi)} ABI entries. ABI: {str(abi[:15])}"
+
+
+def old_selector_context(candidates):
+    return f"Functions detected: {', '.join(unique_signatures(candidates))}"
+
+
+def coverage(names, text):
+    return sum(1 for n in names if re.search(rf"\b{re.escape(n)}\b", text)) / len(names) if names else 1.0
+
+
+def row(label, old, new, names, fn):
+    us = min(timeit.repeat(fn, number=20, repeat=3)) / 20 * 1e6
+    o, n = estimate_tokens(old), estimate_tokens(new)
+    print(f"  {label:<16} {o:7d} {n:7d} {(n - o) / o:+7.0%}   {coverage(names, old):6.0%} {coverage(names, new):6.0%}  {us:8.0f} us")
+
+
+def main():
+    print(f"prompt tokens (budget {TOKEN_BUDGET}), before -> after, and coverage")
+    print(f"  {'':<16} {'before':>7} {'after':>7} {'change':>7}   {'before':>6} {'after':>6}  encode")
+    for size in (10, 50, 200, 1000, 3000):
+        abi = synthetic_abi(size, seed=1)
+        names = [e["name"] for e in abi if e.get("name")]
+        row(f"abi[{size}]", old_abi_context(abi), abi_prompt(abi), names, lambda: abi_prompt(abi))
+    for size in (10, 100, 1000):
+        candidates = selector_candidates(size, seed=1)
+        names = [s.split("(")[0] for s in unique_signatures(candidates, limit=None)]
+        row(f"selectors[{size}]", old_selector_context(candidates), selector_prompt(candidates), names,
+            lambda: selector_prompt(candidates))
+
+
+if __name__ == "__main__":
+    main()
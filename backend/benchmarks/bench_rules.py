@@ -0,0 +1,52 @@
+"""
+Benchmark: contract-type classification of many contracts, the NumPy
+classifier (rules.py) vs. first_match one contract at a time, and the
+single-contract first_match path /explain uses.
+
+Feature bitsets are random with every feature set 12% of the time, so all
+rules fire. Run from the backend directory:
+
+    python benchmarks/bench_rules.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_NAMES, first_match  # noqa: E402
+from rules import MODES, feature_matrix, type_rules  # noqa: E402
+
+
+def random_flags(n, seed=0):
+    rng = np.random.default_rng(seed)
+    bits = rng.random((n, len(FEATURE_NAMES))) < 0.12
+    return bits @ (1 << np.arange(len(FEATURE_NAMES), dtype=np.int64))
+
+
+def main():
+    print(f"{'contracts':>10} {'first_match':>12} {'flags':>9} {'matrix':>9} {'speedup':>8}")
+    for n in (1_000, 10_000, 100_000, 1_000_000):
+        flags = random_flags(n)
+        modes = np.random.default_rng(1).choice(MODES, n)
+        as_ints = flags.tolist()
+        matrix = feature_matrix(as_ints, modes)
+        rules = {mode: type_rules.for_mode(mode) for mode in MODES}
+        one = lambda: [first_match(f, rules[m]) for f, m in zip(as_ints, modes.tolist())]  # noqa: E731
+        repeat = 3 if n < 1_000_000 else 1
+        loop = min(timeit.repeat(one, number=1, repeat=repeat))
+        vec = min(timeit.repeat(lambda: type_rules.classify_flags(flags, modes), number=1, repeat=repeat))
+        mat = min(timeit.repeat(lambda: type_rules.classify_matrix(matrix), number=1, repeat=repeat))
+        print(f"{n:>10,} {loop * 1e3:>9.1f} ms {vec * 1e3:>6.1f} ms {mat * 1e3:>6.1f} ms {loop / vec:>7.0f}x")
+
+    flags = random_flags(1000, seed=2).tolist()
+    abi_rules = type_rules.for_mode("abi")
+    per = min(timeit.repeat(lambda: [first_match(f, abi_rules) for f in flags], number=100, repeat=3)) / 100_000
+    print(f"single contract (first_match, /explain path): {per * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
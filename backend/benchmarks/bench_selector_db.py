@@ -0,0 +1,63 @@
+"""
+Benchmark: one vectorized lookup_many() call vs. resolving the same
+selectors one at a time against the memory-mapped database.
+
+Builds a synthetic database (1M selectors by default) in a temp directory.
+Run from the backend directory:
+
+    python benchmarks/bench_selector_db.py [n_selectors]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selector_db import SelectorDB, build_db  # noqa: E402
+
+
+def synthetic_pairs(n, seed=0):
+    rng = random.Random(seed)
+    for value in rng.sample(range(1 << 32), n):
+        for j in range(1 + (value % 3 == 0)):
+            yield value, f"fn{value:08x}_{j}(address,uint256)"
+
+
+def bench(label, fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<28} {best * 1e6:10.1f} us")
+    return best
+
+
+def main(n=1_000_000):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "selectors.db")
+        pairs = list(synthetic_pairs(n))
+        build_db(pairs, path)
+        db = SelectorDB(path)
+        print(f"{db.count} selectors, {os.path.getsize(path) / 1e6:.1f} MB\n")
+        known = sorted({value for value, _ in pairs})
+
+        def one_by_one(selectors):
+            return {s: db.lookup(s) for s in selectors}
+
+        for size in (32, 300, 3000):
+            # Half known, half random (mostly unknown), like a real dispatcher.
+            hits = [f"0x{v:08x}" for v in rng.sample(known, size // 2)]
+            misses = [f"0x{rng.getrandbits(32):08x}" for _ in range(size - size // 2)]
+            selectors = hits + misses
+            assert db.lookup_many(selectors) == one_by_one(selectors)
+            number = max(5, 3000 // size)
+            print(f"{size} selectors")
+            loop = bench("one lookup per selector", lambda: one_by_one(selectors), number)
+            bulk = bench("lookup_many (searchsorted)", lambda: db.lookup_many(selectors), number)
+            print(f"  speedup: {loop / bulk:.1f}x\n")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
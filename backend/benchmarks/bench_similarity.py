@@ -0,0 +1,71 @@
+"""
+Benchmark: nearest-neighbor lookup in the selector-set similarity index vs. a
+linear Jaccard scan, with the index grown to many labelled contracts.
+
+Synthetic contracts are drawn from a shared pool of "library" selectors
+(ERC-20, Ownable, ...) plus a few unique ones, so sets overlap like real
+deployments do. Queries are mutated copies of indexed sets. Run from the
+backend directory:
+
+    python benchmarks/bench_similarity.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity import SimilarityIndex  # noqa: E402
+
+POOL = [random.Random(1).getrandbits(32) for _ in range(2000)]
+
+
+def synthetic_set(rng):
+    size = rng.randrange(8, 60)
+    shared = rng.sample(POOL, size // 2)
+    unique = [rng.getrandbits(32) for _ in range(size - len(shared))]
+    return frozenset(shared + unique)
+
+
+def mutate(rng, tokens, changes=2):
+    tokens = set(tokens)
+    for t in rng.sample(sorted(tokens), changes):
+        tokens.discard(t)
+    tokens.update(rng.getrandbits(32) for _ in range(changes))
+    return frozenset(tokens)
+
+
+def main():
+    rng = random.Random(0)
+    n = int(os.getenv("BENCH_ENTRIES", "50000"))
+    sets = [synthetic_set(rng) for _ in range(n)]
+
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    for i, s in enumerate(sets):
+        index.add(s, {"name": f"contract-{i}"})
+    elapsed = time.perf_counter() - started
+    print(f"inserted {len(index)} sets in {elapsed:.2f} s ({elapsed / n * 1e6:.0f} us/insert)")
+
+    picks = rng.sample(range(n), 500)
+    queries = [mutate(rng, sets[i]) for i in picks]
+
+    started = time.perf_counter()
+    results = [index.query(q, k=1) for q in queries]
+    lsh = (time.perf_counter() - started) / len(queries)
+    hits = sum(bool(r) and r[0].label["name"] == f"contract-{i}" for r, i in zip(results, picks))
+
+    started = time.perf_counter()
+    for q in queries[:20]:
+        max(sets, key=lambda s: len(q & s) / len(q | s))
+    scan = (time.perf_counter() - started) / 20
+
+    print(f"  {'linear Jaccard scan':<28} {scan * 1e6:10.1f} us/query")
+    print(f"  {'MinHash/LSH query':<28} {lsh * 1e6:10.1f} us/query")
+    print(f"  speedup: {scan / lsh:.0f}x, recall@1 on mutated copies: {hits / len(queries):.1%}")
+
+
+if __name__ == "__main__":
+    main()
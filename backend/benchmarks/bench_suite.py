@@ -0,0 +1,247 @@
+"""
+Regression benchmark suite: summary micro-benchmarks plus an end-to-end load
+test of the FastAPI app through an in-process ASGI client. Runs offline; the
+LLM scenarios use benchmarks/stub_lm.py with a configurable latency.
+
+Run from the backend directory:
+
+    python benchmarks/bench_suite.py                         # full run
+    python benchmarks/bench_suite.py --quick                 # smaller corpus, fewer requests
+    python benchmarks/bench_suite.py --save baseline.json    # record a baseline
+    python benchmarks/bench_suite.py --compare baseline.json # fail on regressions
+
+Every scenario reports p50/p95/p99 latency, throughput and the process's
+peak RSS after it ran. --compare exits with status 1 when a latency gets
+worse, or throughput drops, by more than --tolerance (default 15%).
+Baselines are machine-specific; compare runs from the same host.
+
+LLM scenarios treat every fallback as generic, so each request reaches the
+stub. That isolates the LLM stage's queuing and concurrency from the
+heuristics deciding when it runs.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+from typing import Any, Callable, Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Offline unless a scenario installs the stub; no background LLM warmup.
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ.pop("ROMA_CACHE_DB", None)
+os.environ["ROMA_LLM_WARM"] = "0"
+
+import httpx  # noqa: E402
+
+import agents  # noqa: E402
+import main  # noqa: E402
+import streaming  # noqa: E402
+from cache import result_cache  # noqa: E402
+from corpus import selector_candidates, synthetic_abi  # noqa: E402
+
+ADDRESS = "0x" + "ab" * 20
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput", "peak_rss_mb")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "throughput": round(len(latencies) / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "n": len(latencies),
+    }
+
+
+def micro(fn: Callable[[], Any], budget: float) -> Dict[str, float]:
+    """Time single calls for about `budget` seconds (at least 20 calls)."""
+    fn()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < 20 or time.perf_counter() - started < budget:
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, sum(latencies))
+
+
+@contextmanager
+def stub_llm(latency: float, jitter: float) -> Iterator[None]:
+    """Route the LLM stage to the stub and send every request there."""
+    import stub_lm
+
+    patched = {
+        (agents, "_is_generic_abi_summary"), (agents, "_is_generic_selector_summary"),
+        (streaming, "_is_generic_abi_summary"), (streaming, "_is_generic_selector_summary"),
+    }
+    saved = {(m, n): getattr(m, n) for m, n in patched}
+    stub_lm.install(latency, jitter)
+    for m, n in patched:
+        setattr(m, n, lambda summary: True)
+    try:
+        yield
+    finally:
+        for (m, n), fn in saved.items():
+            setattr(m, n, fn)
+        os.environ.pop("OPENAI_API_KEY", None)
+
+
+async def load(path: str, bodies: List[dict], concurrency: int) -> Dict[str, float]:
+    """POST every body with `concurrency` requests in flight; returns latency stats."""
+    latencies: List[float] = []
+    queue = list(reversed(bodies))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker() -> None:
+            while queue:
+                body = queue.pop()
+                t = time.perf_counter()
+                r = await client.post(path, json=body)
+                if path.endswith("/stream"):
+                    await r.aread()
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t)
+
+        started = time.perf_counter()
+        # The service logs LLM decisions with print(); keep the report readable.
+        with redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return summarize(latencies, wall)
+
+
+def abi_body(size: int, seed: int) -> dict:
+    # One address per contract: the same address with another ABI is an
+    # upgrade to abi_store.
+    return {"mode": "abi", "address": f"0x{size:08x}{seed:032x}", "chainId": "1", "abi": synthetic_abi(size, seed)}
+
+
+def selectors_body(size: int, seed: int) -> dict:
+    return {"mode": "selectors", "address": ADDRESS, "chainId": "1", "candidates": selector_candidates(size, seed)}
+
+
+async def end_to_end(args: argparse.Namespace, report: Callable[[str, Dict[str, float]], None]) -> None:
+    n, c = args.requests, args.concurrency
+    print(f"\nend to end, {n} requests at concurrency {c}")
+    result_cache.clear()
+    report("explain_abi_cold[200]", await load("/explain", [abi_body(200, i) for i in range(n)], c))
+    report("explain_abi_warm[200]", await load("/explain", [abi_body(200, 0)] * n, c))
+    report("explain_abi_cold[3000]", await load("/explain", [abi_body(3000, i) for i in range(max(c, n // 10))], c))
+    report("explain_selectors_cold[100]", await load("/explain", [selectors_body(100, i) for i in range(n)], c))
+    report("explain_batch[50x50]", await load(
+        "/explain/batch", [{"items": [abi_body(50, i * 50 + j) for j in range(50)]} for i in range(max(c, n // 20))], c))
+
+    llm_n = max(c, n // 4)
+    print(f"\nstub LLM ({args.llm_latency * 1000:.0f} ms ± {args.llm_jitter * 1000:.0f} ms), {llm_n} requests at concurrency {c}")
+    with stub_llm(args.llm_latency, args.llm_jitter):
+        result_cache.clear()
+        report("explain_llm_abi[50]", await load("/explain", [abi_body(50, 10_000 + i) for i in range(llm_n)], c))
+        report("stream_llm_selectors[50]", await load(
+            "/explain/stream", [selectors_body(50, 10_000 + i) for i in range(llm_n)], c))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+
+    def report(name: str, stats: Dict[str, float]) -> None:
+        results[name] = stats
+        print(f"  {name:<34} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+              f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput']:9.1f}/s  rss {stats['peak_rss_mb']:.0f} MB")
+
+    abi_sizes = (10, 200, 1000) if args.quick else (10, 50, 200, 1000, 3000)
+    selector_sizes = (10, 100) if args.quick else (10, 100, 1000)
+    budget = 0.2 if args.quick else 1.0
+
+    print("micro-benchmarks (single call, no cache)")
+    for size in abi_sizes:
+        abi = synthetic_abi(size, seed=1)
+        report(f"abi_summary[{size}]", micro(lambda: agents._abi_summary(abi, ADDRESS, "1"), budget))
+    for size in selector_sizes:
+        candidates = selector_candidates(size, seed=1)
+        report(f"selector_summary[{size}]", micro(lambda: agents._selector_summary(candidates), budget))
+
+    # One event loop for all end-to-end scenarios, as in a uvicorn worker;
+    # llm_gate's semaphore binds to the loop it first waits on.
+    asyncio.run(end_to_end(args, report))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float) -> int:
+    base = baseline.get("results", {})
+    regressions = 0
+    print(f"\ncompared with baseline from {baseline.get('meta', {}).get('date', '?')} (tolerance {tolerance:.0%})")
+    for name, stats in results.items():
+        if name not in base:
+            continue
+        changes = []
+        for metric in METRICS[:4]:
+            old, new = base[name].get(metric), stats[metric]
+            if not old:
+                continue
+            delta = (new - old) / old
+            worse = delta < -tolerance if metric == "throughput" else delta > tolerance
+            regressions += worse
+            changes.append(f"{metric} {delta:+.0%}{' !!' if worse else ''}")
+        print(f"  {name:<34} " + "  ".join(changes))
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller corpus and fewer requests")
+    parser.add_argument("--requests", type=int, default=None, help="requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LM mean latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="stub LM latency jitter in seconds")
+    parser.add_argument("--save", metavar="FILE", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    if args.requests is None:
+        args.requests = 200 if args.quick else 1000
+
+    results = run(args)
+    if args.save:
+        meta = {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return compare(results, json.load(f), args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,57 @@
+"""
+Benchmark: re-explaining an upgraded contract (abi_store) vs. explaining the
+new ABI from scratch.
+
+A synthetic contract gets an upgrade that adds, changes and removes a few
+functions. The full path sends the whole new interface to the LLM; the
+incremental path sends the previous explanation plus the diff. Tokens use
+prompt.estimate_tokens; the previous explanation is assumed to be
+PREVIOUS_TOKENS long (a typical LLM answer). Also times the diff. Run from
+the backend directory:
+
+    python benchmarks/bench_upgrade.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from abi_store import diff  # noqa: E402
+from corpus import synthetic_abi  # noqa: E402
+from prompt import abi_prompt, changes_prompt, estimate_tokens  # noqa: E402
+
+PREVIOUS_TOKENS = 400
+
+
+def upgrade(abi, added, changed, removed):
+    """abi with `removed` functions dropped, `changed` made payable and `added` new ones."""
+    functions = [i for i, e in enumerate(abi) if e.get("type") == "function"]
+    drop = set(functions[:removed])
+    out = [dict(e) for i, e in enumerate(abi) if i not in drop]
+    for e in [e for e in out if e.get("type") == "function"][:changed]:
+        e["stateMutability"] = "payable"
+    out += [{"type": "function", "name": f"upgradeFeature{i}", "stateMutability": "nonpayable",
+             "inputs": [{"name": "value", "type": "uint256"}], "outputs": []} for i in range(added)]
+    return out
+
+
+def main():
+    print(f"LLM input tokens after an upgrade (previous explanation ~{PREVIOUS_TOKENS} tokens)")
+    print(f"  {'':<24} {'full':>7} {'delta':>7} {'change':>7}  diff")
+    for size in (50, 200, 1000, 3000):
+        old = synthetic_abi(size, seed=1)
+        for added, changed, removed in ((1, 0, 0), (3, 2, 1)):
+            new = upgrade(old, added, changed, removed)
+            changes = diff(old, new)
+            full = estimate_tokens(abi_prompt(new))
+            delta = PREVIOUS_TOKENS + estimate_tokens(changes_prompt(changes))
+            ms = min(timeit.repeat(lambda: diff(old, new), number=3, repeat=3)) / 3 * 1e3
+            label = f"abi[{size}] +{added} ~{changed} -{removed}"
+            print(f"  {label:<24} {full:7d} {delta:7d} {(delta - full) / full:+7.0%}  {ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
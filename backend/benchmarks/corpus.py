@@ -0,0 +1,145 @@
+"""
+Synthetic contract corpus for the benchmark suite.
+
+ABIs are shaped like solc output (inputs with names and internalType, events
+with indexed params, custom errors, constructor) and built from realistic
+building blocks: an ERC-20 core, ERC-721, Ownable/Pausable, DEX and lending
+functions, and for large sizes a diamond (EIP-2535) whose facets add
+get/set/execute-style functions until the requested entry count is reached.
+Everything is seeded, so a given (size, seed) always yields the same ABI.
+"""
+
+import random
+from typing import Dict, List
+
+ERC20 = [
+    ("name", [], ["string"], "view"),
+    ("symbol", [], ["string"], "view"),
+    ("decimals", [], ["uint8"], "view"),
+    ("totalSupply", [], ["uint256"], "view"),
+    ("balanceOf", [("account", "address")], ["uint256"], "view"),
+    ("transfer", [("to", "address"), ("amount", "uint256")], ["bool"], "nonpayable"),
+    ("allowance", [("owner", "address"), ("spender", "address")], ["uint256"], "view"),
+    ("approve", [("spender", "address"), ("amount", "uint256")], ["bool"], "nonpayable"),
+    ("transferFrom", [("from", "address"), ("to", "address"), ("amount", "uint256")], ["bool"], "nonpayable"),
+]
+ERC721 = [
+    ("ownerOf", [("tokenId", "uint256")], ["address"], "view"),
+    ("tokenURI", [("tokenId", "uint256")], ["string"], "view"),
+    ("safeTransferFrom", [("from", "address"), ("to", "address"), ("tokenId", "uint256")], [], "nonpayable"),
+    ("setApprovalForAll", [("operator", "address"), ("approved", "bool")], [], "nonpayable"),
+    ("isApprovedForAll", [("owner", "address"), ("operator", "address")], ["bool"], "view"),
+    ("getApproved", [("tokenId", "uint256")], ["address"], "view"),
+]
+ADMIN = [
+    ("owner", [], ["address"], "view"),
+    ("transferOwnership", [("newOwner", "address")], [], "nonpayable"),
+    ("renounceOwnership", [], [], "nonpayable"),
+    ("pause", [], [], "nonpayable"),
+    ("unpause", [], [], "nonpayable"),
+    ("paused", [], ["bool"], "view"),
+    ("mint", [("to", "address"), ("amount", "uint256")], [], "nonpayable"),
+    ("burn", [("amount", "uint256")], [], "nonpayable"),
+]
+DEFI = [
+    ("swapExactTokensForTokens", [("amountIn", "uint256"), ("amountOutMin", "uint256"), ("path", "address[]"), ("to", "address"), ("deadline", "uint256")], ["uint256[]"], "nonpayable"),
+    ("addLiquidity", [("tokenA", "address"), ("tokenB", "address"), ("amountA", "uint256"), ("amountB", "uint256")], ["uint256"], "nonpayable"),
+    ("deposit", [("assets", "uint256"), ("receiver", "address")], ["uint256"], "nonpayable"),
+    ("borrow", [("asset", "address"), ("amount", "uint256")], [], "nonpayable"),
+    ("repay", [("asset", "address"), ("amount", "uint256")], ["uint256"], "nonpayable"),
+    ("stake", [("amount", "uint256")], [], "nonpayable"),
+]
+DIAMOND = [
+    ("diamondCut", [("cut", "tuple[]"), ("init", "address"), ("data", "bytes")], [], "nonpayable"),
+    ("facets", [], ["tuple[]"], "view"),
+    ("facetAddress", [("selector", "bytes4")], ["address"], "view"),
+    ("facetAddresses", [], ["address[]"], "view"),
+    ("facetFunctionSelectors", [("facet", "address")], ["bytes4[]"], "view"),
+    ("supportsInterface", [("interfaceId", "bytes4")], ["bool"], "view"),
+]
+
+_VERBS = ("get", "set", "update", "claim", "execute", "compute", "sync", "harvest", "rebalance", "withdraw", "register", "settle")
+_NOUNS = ("Reward", "Fee", "Pool", "Vault", "Order", "Position", "Config", "Oracle", "Price", "Nonce", "Epoch", "Market", "Route", "Quota", "Strategy", "Delegate")
+_TYPES = ("uint256", "address", "bool", "bytes32", "uint128", "int24", "bytes", "string", "address[]", "uint256[]")
+_EVENTS = ("Transfer", "Approval", "OwnershipTransferred", "Paused", "Deposit", "Withdraw", "Swap", "Sync", "RewardPaid", "ConfigUpdated")
+
+
+def _params(pairs):
+    return [{"name": n, "type": t, "internalType": t} for n, t in pairs]
+
+
+def _function(name, inputs, outputs, mutability):
+    return {
+        "type": "function",
+        "name": name,
+        "inputs": _params(inputs),
+        "outputs": _params([("", t) for t in outputs]),
+        "stateMutability": mutability,
+    }
+
+
+def _event(name, rng):
+    n = rng.randrange(1, 4)
+    return {
+        "type": "event",
+        "name": name,
+        "anonymous": False,
+        "inputs": [{"name": f"arg{i}", "type": rng.choice(_TYPES[:4]), "indexed": i < 2} for i in range(n)],
+    }
+
+
+def _facet_function(i, rng):
+    name = f"{rng.choice(_VERBS)}{rng.choice(_NOUNS)}{rng.choice(_NOUNS)}{i}"
+    inputs = [(f"p{j}", rng.choice(_TYPES)) for j in range(rng.randrange(0, 4))]
+    outputs = [rng.choice(_TYPES)] if name.startswith(("get", "compute")) else []
+    mutability = "view" if outputs else rng.choice(("nonpayable", "nonpayable", "payable"))
+    return _function(name, inputs, outputs, mutability)
+
+
+def synthetic_abi(size: int, seed: int = 0) -> List[dict]:
+    """An ABI with exactly `size` entries; larger sizes turn into a diamond."""
+    rng = random.Random(seed * 1_000_003 + size)
+    blocks = [ERC20]
+    if size > 20:
+        blocks.append(rng.choice((ERC721, DEFI)))
+        blocks.append(ADMIN)
+    if size > 200:
+        blocks += [DEFI, DIAMOND]
+    abi = [{"type": "constructor", "inputs": _params([("initialOwner", "address")]), "stateMutability": "nonpayable"}]
+    seen = set()
+    for block in blocks:
+        for spec in block:
+            if spec[0] not in seen:
+                seen.add(spec[0])
+                abi.append(_function(*spec))
+    for name in rng.sample(_EVENTS, min(len(_EVENTS), max(1, size // 10))):
+        abi.append(_event(name, rng))
+    i = 0
+    while len(abi) < size:
+        r = rng.random()
+        if r < 0.85:
+            abi.append(_facet_function(i, rng))
+        elif r < 0.95:
+            abi.append(_event(f"{rng.choice(_NOUNS)}{rng.choice(_VERBS).title()}d{i}", rng))
+        else:
+            abi.append({"type": "error", "name": f"{rng.choice(_NOUNS)}Invalid{i}", "inputs": _params([("value", "uint256")])})
+        i += 1
+    return abi[:size]
+
+
+def selector_candidates(size: int, seed: int = 0, unknown: float = 0.3) -> Dict[str, List[str]]:
+    """A 4-byte selector -> candidate signatures map, as /explain gets for unverified code."""
+    rng = random.Random(seed * 7_000_003 + size)
+    names = [f"{n}({','.join(t for _, t in i)})" for n, i, _, _ in ERC20 + ADMIN + DEFI]
+    out: Dict[str, List[str]] = {}
+    while len(out) < size:
+        selector = f"0x{rng.getrandbits(32):08x}"
+        r = rng.random()
+        if r < unknown:
+            out[selector] = []
+        elif r < unknown + 0.4 and names:
+            out[selector] = [rng.choice(names)]
+        else:
+            out[selector] = [f"{rng.choice(_VERBS)}{rng.choice(_NOUNS)}{len(out)}({rng.choice(_TYPES)})"
+                             for _ in range(rng.randrange(1, 4))]
+    return out
@@ -0,0 +1,54 @@
+"""
+Offline stand-in for the OpenAI model, for benchmarks.
+
+StubLM answers every prompt in DSPy's chat format after a configurable
+delay (mean latency plus uniform jitter) and reports token usage estimated
+from the prompt length, so the LLM stage, its concurrency limits and the
+/metrics token counters all behave as with a real provider. No network.
+"""
+
+import os
+import random
+import time
+from types import SimpleNamespace
+
+import dspy
+
+import llm
+
+_ANSWER = (
+    "[[ ## reasoning ## ]]\nBenchmark stub.\n\n"
+    "[[ ## explanation ## ]]\n{text}\n\n"
+    "[[ ## completed ## ]]"
+)
+
+
+class StubLM(dspy.BaseLM):
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, text: str = "Stub explanation for benchmarking."):
+        super().__init__(model="stub/benchmark")
+        self.latency = latency
+        self.jitter = jitter
+        self.text = text
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        prompt_chars = len(prompt or "") + sum(len(str(m.get("content", ""))) for m in messages or ())
+        content = _ANSWER.format(text=self.text)
+        message = SimpleNamespace(content=content, tool_calls=None, reasoning_content=None)
+        choice = SimpleNamespace(message=message, finish_reason="stop", logprobs=None)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4,
+        }
+        return SimpleNamespace(choices=[choice], usage=usage, model=self.model, _hidden_params={})
+
+
+def install(latency: float = 0.5, jitter: float = 0.0) -> StubLM:
+    """Make the LLM stage available and route it to a StubLM."""
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-stub")
+    lm = StubLM(latency, jitter)
+    llm.set_lm(lm)
+    return lm
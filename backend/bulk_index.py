@@ -0,0 +1,566 @@
+"""
+Offline bulk explainer: pre-explain large sets of contracts without the HTTP
+service.
+
+Input is JSONL, or Parquet with pyarrow installed. One record per contract:
+
+    {"chainId": "1", "address": "0x...", "abi": [...]}
+    {"chainId": "1", "address": "0x...", "candidates": {"0xa9059cbb": ["transfer(address,uint256)"]}}
+
+"abi" and "candidates" may also be JSON strings, as block explorers return
+them. Output is JSONL in input order, one line per record:
+
+    {"chainId": "1", "address": "0x...", "mode": "abi", "summary": ..., "source": "fallback"}
+    {"chainId": "1", "address": "0x...", "error": "..."}
+
+LLM calls are bounded like the service's (ROMA_LLM_DEADLINE, the circuit
+breaker). A record whose LLM call failed or ran late gets the fallback with
+"provisional": true and is not cached. The checkpoint still counts it as
+done; --retry-provisional explains just those records again and rewrites
+their lines in place:
+
+    python main.py index contracts.jsonl -o explained.jsonl --retry-provisional
+
+Records are read lazily and handed to a process pool in chunks. At most
+--window chunks are in flight, so memory stays bounded whatever the input
+size. Workers use the same result cache as the service, so with
+ROMA_CACHE_DB set, clones are explained once per run and across runs.
+
+Every --checkpoint-every records the output is fsynced and the input
+position is written to OUTPUT.checkpoint.json. Rerunning the same command
+after a crash truncates the output to the last checkpoint and resumes from
+there; at most one checkpoint interval is redone. Rerunning a finished
+run is a no-op. --restart ignores the checkpoint.
+
+    python main.py index contracts.jsonl -o explained.jsonl
+    python backend/bulk_index.py contracts.parquet -o explained.jsonl --workers 16 --no-llm
+
+`classify` re-scores contracts with the contract-type rules only (rules.py),
+in batches through the NumPy classifier, in one process:
+
+    python main.py classify contracts.jsonl -o types.jsonl
+    {"chainId": "1", "address": "0x...", "mode": "abi", "contractType": "Staking Contract", "features": ["owner", "stake"]}
+
+Records that already carry "mode" and "features" (like its own output) are
+not analyzed again, so after a rule change the previous output is re-scored
+at array speed. Unlike the service there is no registry lookup and no
+similarity fallback: contracts no rule matches get the mode's default type.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional, Parquet input only
+    pq = None
+
+CHECKPOINT_VERSION = 1
+CLASSIFY_BATCH = 65_536
+
+# A record as read: a raw JSONL line, or a Parquet row as a dict.
+Record = Any
+
+
+def _loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_line(obj: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+# ---- worker side ---------------------------------------------------------
+
+def _init_worker(use_llm: bool) -> None:
+    # Ctrl-C is handled by the parent, which lets running chunks finish and
+    # checkpoints. Analyzer log lines go to stderr, away from the output.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.stdout = sys.stderr
+    if not use_llm:
+        os.environ.pop("OPENAI_API_KEY", None)
+    import agents  # noqa: F401  (load once, not on the first record)
+
+
+def _explain_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """(output object, whether the LLM wrote the summary)."""
+    from agents import run_roma_for_abi, run_roma_for_selectors
+    from cache import explain_cache_key, result_cache
+    from ingest import slim_abi
+
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    chain_id = record.get("chainId", record.get("chain_id"))
+    chain_id = None if chain_id is None else str(chain_id)
+    address = record.get("address")
+    out: Dict[str, Any] = {"chainId": chain_id, "address": address}
+
+    abi, candidates = record.get("abi"), record.get("candidates")
+    if isinstance(abi, str):
+        abi = _loads(abi)
+    if isinstance(candidates, str):
+        candidates = _loads(candidates)
+    if abi:
+        if not isinstance(abi, list):
+            raise ValueError("abi is not a list")
+        abi = slim_abi(abi)
+        key = explain_cache_key("abi", abi=abi, address=address, chain_id=chain_id)
+        result = result_cache.get(key)
+        if result is None:
+            result = run_roma_for_abi(abi, address, chain_id)
+            if not result.get("provisional"):
+                result_cache.set(key, result)
+        out["mode"] = "abi"
+    elif candidates:
+        if not isinstance(candidates, dict):
+            raise ValueError("candidates is not an object")
+        key = explain_cache_key("selectors", candidates=candidates)
+        result = result_cache.get(key)
+        if result is None:
+            result = run_roma_for_selectors(candidates)
+            if not result.get("provisional"):
+                result_cache.set(key, result)
+        out["mode"] = "selectors"
+    else:
+        raise ValueError("record has neither abi nor candidates")
+    out.update(result)
+    return out, result.get("source") == "roma"
+
+
+def _process_chunk(records: List[Record]) -> Tuple[bytes, int, int]:
+    """Explain a chunk; returns (output lines, errors, LLM summaries)."""
+    lines: List[bytes] = []
+    errors = llm_calls = 0
+    for record in records:
+        try:
+            if isinstance(record, bytes):
+                record = _loads(record)
+            out, used_llm = _explain_record(record)
+            llm_calls += used_llm
+        except Exception as e:
+            errors += 1
+            out = {"error": f"{type(e).__name__}: {e}"}
+            if isinstance(record, dict):
+                out = {"chainId": record.get("chainId", record.get("chain_id")), "address": record.get("address"), **out}
+        lines.append(_dumps_line(out))
+    return b"".join(lines), errors, llm_calls
+
+
+def _is_provisional(line: bytes) -> bool:
+    return b'"provisional"' in line and bool(_loads(line).get("provisional"))
+
+
+def _retry_chunk(pairs: List[Tuple[bytes, Record]]) -> Tuple[bytes, int, int]:
+    """Explain again the records whose output line is provisional; returns (lines, retried, still provisional)."""
+    lines: List[bytes] = []
+    retried = still = 0
+    for line, record in pairs:
+        if _is_provisional(line):
+            line = _process_chunk([record])[0]
+            retried += 1
+            still += _is_provisional(line)
+        lines.append(line)
+    return b"".join(lines), retried, still
+
+
+# ---- input ---------------------------------------------------------------
+
+def _jsonl_records(path: str, start: int) -> Iterator[Tuple[int, Record]]:
+    """(byte offset after the record, raw line), from byte offset start."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            position += len(line)
+            if line.strip():
+                yield position, line
+
+
+def _parquet_records(path: str, start: int, batch_size: int = 4096) -> Iterator[Tuple[int, Record]]:
+    """(rows read so far, row), from row start; whole row groups before start are skipped."""
+    if pq is None:
+        raise SystemExit("Parquet input needs pyarrow (pip install pyarrow)")
+    pf = pq.ParquetFile(path)
+    row = 0
+    for group in range(pf.num_row_groups):
+        rows = pf.metadata.row_group(group).num_rows
+        if row + rows <= start:
+            row += rows
+            continue
+        for batch in pf.iter_batches(row_groups=[group], batch_size=batch_size):
+            for record in batch.to_pylist():
+                row += 1
+                if row > start:
+                    yield row, record
+
+
+def _input(path: str, fmt: str) -> Tuple[Any, Optional[int]]:
+    """(reader function, total size in positions for progress)."""
+    if fmt == "parquet":
+        total = pq.ParquetFile(path).metadata.num_rows if pq is not None else None
+        return _parquet_records, total
+    return _jsonl_records, os.path.getsize(path)
+
+
+def _chunks(records: Iterator[Tuple[int, Record]], size: int) -> Iterator[Tuple[List[Record], int]]:
+    chunk: List[Record] = []
+    position = 0
+    for position, record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk, position
+            chunk = []
+    if chunk:
+        yield chunk, position
+
+
+# ---- checkpoints ---------------------------------------------------------
+
+def _checkpoint_path(output: str) -> str:
+    return output + ".checkpoint.json"
+
+
+def _load_checkpoint(output: str, input_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_checkpoint_path(output), encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("version") != CHECKPOINT_VERSION or state.get("input") != os.path.abspath(input_path):
+        raise SystemExit(
+            f"{_checkpoint_path(output)} belongs to another run ({state.get('input')}); "
+            "use --restart to start over"
+        )
+    return state
+
+
+def _save_checkpoint(output: str, state: Dict[str, Any]) -> None:
+    path = _checkpoint_path(output)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**state, "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---- progress ------------------------------------------------------------
+
+class Progress:
+    def __init__(self, total: Optional[int], unit: str, interval: float = 1.0):
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.started = self._last = time.perf_counter()
+        self.tty = sys.stderr.isatty()
+
+    def update(self, state: Dict[str, Any], done_this_run: int, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self._last < (self.interval if self.tty else 10 * self.interval):
+            return
+        self._last = now
+        elapsed = now - self.started
+        rate = done_this_run / elapsed if elapsed else 0.0
+        text = f"{state['records']:,} records  {rate:,.0f}/s  {state['errors']:,} errors"
+        if "llm" in state:
+            text += f"  {state['llm']:,} LLM"
+        if self.total:
+            text += f"  {min(1.0, state['position'] / self.total):.1%} of input ({self.unit})"
+        text += f"  {elapsed:,.0f}s"
+        end = "\n" if final or not self.tty else ""
+        sys.stderr.write(("\r" if self.tty else "") + text + end)
+        sys.stderr.flush()
+
+
+# ---- driver --------------------------------------------------------------
+
+def run(
+    input_path: str,
+    output: str,
+    fmt: str = "jsonl",
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    window: Optional[int] = None,
+    checkpoint_every: int = 10_000,
+    restart: bool = False,
+    use_llm: bool = True,
+) -> Dict[str, Any]:
+    workers = workers or os.cpu_count() or 2
+    window = window or workers * 4
+    reader, total = _input(input_path, fmt)
+
+    state = None if restart else _load_checkpoint(output, input_path)
+    if state is None:
+        state = {"version": CHECKPOINT_VERSION, "input": os.path.abspath(input_path), "format": fmt,
+                 "position": 0, "records": 0, "errors": 0, "llm": 0, "output_bytes": 0}
+        out = open(output, "wb")
+    else:
+        print(f"↻ Resuming at record {state['records']:,} ({fmt} position {state['position']:,})", file=sys.stderr)
+        out = open(output, "r+b")
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+
+    progress = Progress(total, "bytes" if fmt == "jsonl" else "rows")
+    done_this_run = 0
+    since_checkpoint = 0
+
+    def checkpoint() -> None:
+        out.flush()
+        os.fsync(out.fileno())
+        state["output_bytes"] = out.tell()
+        _save_checkpoint(output, state)
+
+    def write(item: Tuple["Future[Tuple[bytes, int, int]]", int, int]) -> None:
+        nonlocal done_this_run, since_checkpoint
+        future, position, n = item
+        lines, errors, llm_calls = future.result()
+        out.write(lines)
+        state["position"] = position
+        state["records"] += n
+        state["errors"] += errors
+        state["llm"] += llm_calls
+        done_this_run += n
+        since_checkpoint += n
+        if since_checkpoint >= checkpoint_every:
+            checkpoint()
+            since_checkpoint = 0
+        progress.update(state, done_this_run)
+
+    # spawn: workers must not inherit the parent's threads or SQLite handles.
+    context = multiprocessing.get_context("spawn")
+    pending: Deque[Tuple[Future, int, int]] = deque()
+    try:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(use_llm,)) as pool:
+            try:
+                for chunk, position in _chunks(reader(input_path, state["position"]), chunk_size):
+                    pending.append((pool.submit(_process_chunk, chunk), position, len(chunk)))
+                    while len(pending) >= window:
+                        write(pending.popleft())
+                while pending:
+                    write(pending.popleft())
+            except BaseException:
+                for future, _, _ in pending:
+                    future.cancel()
+                raise
+    except KeyboardInterrupt:
+        checkpoint()
+        progress.update(state, done_this_run, final=True)
+        print(f"⏸️  Interrupted; rerun the same command to resume from record {state['records']:,}", file=sys.stderr)
+        raise
+    finally:
+        if not out.closed and state["output_bytes"] != out.tell():
+            # Write what finished so a crash loses as little as possible.
+            checkpoint()
+        out.close()
+    progress.update(state, done_this_run, final=True)
+    return state
+
+
+def retry_provisional(
+    input_path: str,
+    output: str,
+    fmt: str = "jsonl",
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    window: Optional[int] = None,
+    use_llm: bool = True,
+) -> Dict[str, int]:
+    """
+    Explain again the checkpointed records whose output is provisional.
+    The output is rewritten to a temporary file and swapped in at the end,
+    so an interrupted retry leaves it as it was.
+    """
+    state = _load_checkpoint(output, input_path)
+    if state is None:
+        raise SystemExit(f"no checkpoint for {output}; run the index first")
+    workers = workers or os.cpu_count() or 2
+    window = window or workers * 4
+    reader, _ = _input(input_path, fmt)
+    counts = {"records": 0, "retried": 0, "provisional": 0}
+    tmp = output + ".retry.tmp"
+
+    def pairs() -> Iterator[Tuple[int, Tuple[bytes, Record]]]:
+        with open(output, "rb") as lines:
+            records = reader(input_path, 0)
+            for _ in range(state["records"]):
+                position, record = next(records)
+                yield position, (lines.readline(), record)
+
+    def write(item: Tuple[Any, int]) -> None:
+        result, n = item
+        lines, retried, still = result.result() if isinstance(result, Future) else (result, 0, 0)
+        out.write(lines)
+        counts["records"] += n
+        counts["retried"] += retried
+        counts["provisional"] += still
+
+    context = multiprocessing.get_context("spawn")
+    pending: Deque[Tuple[Any, int]] = deque()
+    with open(tmp, "wb") as out, \
+            ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(use_llm,)) as pool:
+        try:
+            for chunk, _ in _chunks(pairs(), chunk_size):
+                if any(_is_provisional(line) for line, _ in chunk):
+                    pending.append((pool.submit(_retry_chunk, chunk), len(chunk)))
+                else:
+                    pending.append((b"".join(line for line, _ in chunk), len(chunk)))
+                while len(pending) >= window:
+                    write(pending.popleft())
+            while pending:
+                write(pending.popleft())
+        except BaseException:
+            for future, _ in pending:
+                if isinstance(future, Future):
+                    future.cancel()
+            out.close()
+            os.remove(tmp)
+            raise
+        out.flush()
+        os.fsync(out.fileno())
+        state["output_bytes"] = out.tell()
+    os.replace(tmp, output)
+    _save_checkpoint(output, state)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="index", description="Explain a JSONL or Parquet file of contracts offline.",
+        epilog="See the bulk_index module docstring for the record format.",
+    )
+    parser.add_argument("input", help="JSONL or Parquet file of {chainId, address, abi | candidates} records")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file for the explanations")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="input format (default: from the file extension)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="records per task")
+    parser.add_argument("--window", type=int, default=None, help="max chunks in flight (default: 4 per worker)")
+    parser.add_argument("--checkpoint-every", type=int, default=10_000, help="records between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--no-llm", action="store_true", help="rule-based explanations only")
+    parser.add_argument("--retry-provisional", action="store_true",
+                        help="explain again the already written records whose result is provisional")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.input.endswith((".parquet", ".pq")) else "jsonl")
+    if args.retry_provisional:
+        try:
+            counts = retry_provisional(args.input, args.output, fmt, args.workers, args.chunk_size, args.window,
+                                       not args.no_llm)
+        except KeyboardInterrupt:
+            return 130
+        print(f"✅ {counts['retried']:,} of {counts['records']:,} records explained again "
+              f"({counts['provisional']:,} still provisional)", file=sys.stderr)
+        return 0
+    try:
+        state = run(args.input, args.output, fmt, args.workers, args.chunk_size, args.window,
+                    args.checkpoint_every, args.restart, not args.no_llm)
+    except KeyboardInterrupt:
+        return 130
+    print(f"✅ {state['records']:,} records written to {args.output} ({state['errors']:,} errors)", file=sys.stderr)
+    return 0
+
+
+# ---- rule-only re-scoring ------------------------------------------------
+
+def _record_features(record: Dict[str, Any], feature_bits: Dict[str, int]) -> Tuple[Dict[str, Any], str, int]:
+    """(output object, mode, feature bitset) of a record, from its features if it has them."""
+    from features import extract_abi_features, extract_signature_features, unique_signatures
+    from ingest import slim_abi
+
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    chain_id = record.get("chainId", record.get("chain_id"))
+    out = {"chainId": None if chain_id is None else str(chain_id), "address": record.get("address")}
+
+    mode, names = record.get("mode"), record.get("features")
+    if mode in ("abi", "selectors") and isinstance(names, list):
+        return out, mode, sum(feature_bits[name] for name in names)
+    abi, candidates = record.get("abi"), record.get("candidates")
+    if isinstance(abi, str):
+        abi = _loads(abi)
+    if isinstance(candidates, str):
+        candidates = _loads(candidates)
+    if abi:
+        if not isinstance(abi, list):
+            raise ValueError("abi is not a list")
+        return out, "abi", extract_abi_features(slim_abi(abi)).flags
+    if candidates:
+        if not isinstance(candidates, dict):
+            raise ValueError("candidates is not an object")
+        return out, "selectors", extract_signature_features(unique_signatures(candidates))
+    raise ValueError("record has neither abi, candidates nor mode and features")
+
+
+def classify(input_path: str, output: str, fmt: str = "jsonl", batch_size: int = CLASSIFY_BATCH) -> Dict[str, int]:
+    """Write the rule-based contract type of every record; returns record and error counts."""
+    from features import FEATURE_NAMES, feature_list
+    from rules import type_rules
+
+    feature_bits = {name: 1 << i for i, name in enumerate(FEATURE_NAMES)}
+    reader, total = _input(input_path, fmt)
+    state = {"position": 0, "records": 0, "errors": 0}
+    progress = Progress(total, "bytes" if fmt == "jsonl" else "rows")
+    with open(output, "wb") as out:
+        for chunk, position in _chunks(reader(input_path, 0), batch_size):
+            lines: List[bytes] = []
+            rows: List[Tuple[int, Dict[str, Any], str, int]] = []  # (line index, out, mode, flags)
+            for record in chunk:
+                try:
+                    if isinstance(record, bytes):
+                        record = _loads(record)
+                    rows.append((len(lines), *_record_features(record, feature_bits)))
+                    lines.append(b"")
+                except Exception as e:
+                    state["errors"] += 1
+                    error = {"error": f"{type(e).__name__}: {e}"}
+                    if isinstance(record, dict):
+                        error = {"chainId": record.get("chainId", record.get("chain_id")), "address": record.get("address"), **error}
+                    lines.append(_dumps_line(error))
+            if rows:
+                types = type_rules.contract_types([r[3] for r in rows], [r[2] for r in rows])
+                for (i, obj, mode, flags), kind in zip(rows, types.tolist()):
+                    lines[i] = _dumps_line({**obj, "mode": mode, "contractType": kind, "features": feature_list(flags)})
+            out.write(b"".join(lines))
+            state["position"] = position
+            state["records"] += len(chunk)
+            progress.update(state, state["records"])
+    progress.update(state, state["records"], final=True)
+    return state
+
+
+def classify_main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="classify", description="Re-score a JSONL or Parquet file of contracts with the contract-type rules.",
+        epilog="See the bulk_index module docstring for the record formats.",
+    )
+    parser.add_argument("input", help="JSONL or Parquet file of {chainId, address, abi | candidates | mode + features} records")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file for the contract types")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=CLASSIFY_BATCH, help="records per vectorized batch")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.input.endswith((".parquet", ".pq")) else "jsonl")
+    state = classify(args.input, args.output, fmt, args.batch_size)
+    print(f"✅ {state['records']:,} records written to {args.output} ({state['errors']:,} errors)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
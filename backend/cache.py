@@ -0,0 +1,218 @@
+"""
+Content-addressed result cache for /explain.
+
+Results are keyed by a canonical hash of what was analyzed (the ABI or the
+selector-candidate map), not by contract address, so proxies and clones that
+share a byte-identical ABI share one entry. The hash is taken over the parsed
+JSON with sorted keys and no insignificant whitespace.
+
+Two tiers:
+- an in-memory LRU with a TTL (per worker)
+- an optional SQLite file that survives restarts and can be shared by the
+  workers on one host (set ROMA_CACHE_DB)
+
+Async callers use aget/aset: the memory tier is checked inline and the
+SQLite tier is read and written on a worker thread, so a busy database
+never stalls the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+from contract_registry import is_known_contract
+
+# Bump whenever analyzer output, the ABI the analyzers see or the LLM prompt
+# changes, or cached entries are known to be wrong, so stale entries (and
+# ETags, see encoding.etag_for) stop matching.
+CACHE_VERSION = "6"
+
+
+def canonical_json(obj: Any) -> bytes:
+    """Serialize obj with sorted keys and no whitespace."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def canonical_hash(obj: Any) -> str:
+    return hashlib.sha256(canonical_json(obj)).hexdigest()
+
+
+def explain_cache_key(
+    mode: str,
+    abi: Optional[List[dict]] = None,
+    candidates: Optional[Dict[str, List[str]]] = None,
+    address: Optional[str] = None,
+    chain_id: Optional[str] = None,
+) -> str:
+    """
+    Cache key for an /explain request.
+    The address only takes part when the registry knows it on that chain,
+    because that is the only case where it changes the result.
+    """
+    known = None
+    if mode == "abi" and address and is_known_contract(address, chain_id):
+        known = f"{chain_id}:{address.lower()}"
+    body = abi if mode == "abi" else candidates
+    return canonical_hash({"v": CACHE_VERSION, "mode": mode, "known": known, "body": body})
+
+
+def upgrade_cache_key(chain_id: str, address: str, abi_hash: str) -> str:
+    """
+    Cache key for an upgrade explanation merged into one contract's previous
+    explanation (agents.arun_roma_for_upgrade). Unlike explain_cache_key it
+    names the contract: the same ABI elsewhere has no such history.
+    """
+    return canonical_hash({"v": CACHE_VERSION, "mode": "upgrade", "contract": f"{chain_id}:{address.lower()}",
+                           "abi": abi_hash})
+
+
+class ResultCache:
+    """Bounded LRU with TTL, optionally backed by SQLite."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl: float = 600.0,
+        db_path: Optional[str] = None,
+        db_ttl: float = 7 * 24 * 3600.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self._lock = threading.Lock()
+        # SQLite has its own lock so memory lookups never wait on disk I/O.
+        self._db_lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            max_entries=int(os.getenv("ROMA_CACHE_SIZE", "2048")),
+            ttl=float(os.getenv("ROMA_CACHE_TTL", "600")),
+            db_path=os.getenv("ROMA_CACHE_DB") or None,
+            db_ttl=float(os.getenv("ROMA_CACHE_DB_TTL", str(7 * 24 * 3600))),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        return value if value is not None else self._get_disk(key)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get, with the SQLite tier read on a worker thread."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if self._db is None:
+            return self._get_disk(key)
+        return await asyncio.to_thread(self._get_disk, key)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        self._set_memory(key, value, now)
+        self._set_disk(key, value, now)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """set, with the SQLite write on a worker thread."""
+        now = time.time()
+        self._set_memory(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, value, now)
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires > now:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return dict(value)
+            del self._mem[key]
+            return None
+
+    def _get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """The SQLite tier, after a memory miss; counts the miss if it has nothing either."""
+        now = time.time()
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created FROM results WHERE key = ?", (key,)
+                ).fetchone()
+        with self._lock:
+            if row is not None and row[1] + self.db_ttl > now:
+                value = json.loads(row[0])
+                self._remember(key, value, now)
+                self.stats["disk_hits"] += 1
+                return dict(value)
+            self.stats["misses"] += 1
+            return None
+
+    def _set_memory(self, key: str, value: Dict[str, Any], now: float) -> None:
+        with self._lock:
+            self._remember(key, dict(value), now)
+            self.stats["sets"] += 1
+
+    def _set_disk(self, key: str, value: Dict[str, Any], now: float) -> None:
+        if self._db is None:
+            return
+        data = json.dumps(value)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                (key, data, now),
+            )
+
+    def _remember(self, key: str, value: Dict[str, Any], now: float) -> None:
+        self._mem[key] = (now + self.ttl, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM results")
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "disk": self._db is not None,
+            }
+
+
+result_cache = ResultCache.from_env()
@@ -1,9 +1,14 @@
 """
 Registry of well-known smart contracts with their metadata.
 This helps provide accurate contract type detection for popular protocols.
+
+Lookups are chain-aware. The hand-curated KNOWN_CONTRACTS below are always
+available; bulk label sets are compiled into a memory-mapped index with
+registry_index.py and loaded from ROMA_REGISTRY_INDEX.
 """
 
-from typing import Dict, Optional
+import os
+from typing import Dict, Optional, Tuple, Union
 
 KNOWN_CONTRACTS: Dict[str, Dict[str, str]] = {
     # OpenSea
@@ -98,14 +103,208 @@ KNOWN_CONTRACTS: Dict[str, Dict[str, str]] = {
     }
 }
 
-def get_contract_info(address: str) -> Optional[Dict[str, str]]:
+# Chains each curated entry is deployed on at the same address.
+# Entries not listed here are Ethereum mainnet only.
+KNOWN_CONTRACT_CHAINS: Dict[str, Tuple[str, ...]] = {
+    "0x00000000000000adc04c56bf30ac9d3c0aaf14dc": ("1", "10", "137", "8453", "42161"),
+    "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45": ("1", "10", "137", "42161"),
+    "0x1f98431c8ad98523631ae4a59f267346ea31f984": ("1", "10", "137", "42161"),
+    "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913": ("8453",),
+    "0x3c499c542cef5e3811e1192ce70d8cc03d5c3359": ("137",),
+}
+
+# Public function signatures of the curated entries (implementation ABIs for
+# proxies). similarity.py seeds its index from these so forks and near-clones
+# of well-known contracts can be recognized without an LLM call.
+_ERC20 = (
+    "name()", "symbol()", "decimals()", "totalSupply()", "balanceOf(address)",
+    "transfer(address,uint256)", "transferFrom(address,address,uint256)",
+    "approve(address,uint256)", "allowance(address,address)",
+)
+_ERC721 = (
+    "name()", "symbol()", "tokenURI(uint256)", "totalSupply()", "balanceOf(address)",
+    "ownerOf(uint256)", "approve(address,uint256)", "getApproved(uint256)",
+    "setApprovalForAll(address,bool)", "isApprovedForAll(address,address)",
+    "transferFrom(address,address,uint256)", "safeTransferFrom(address,address,uint256)",
+    "safeTransferFrom(address,address,uint256,bytes)", "supportsInterface(bytes4)",
+)
+_OWNABLE = ("owner()", "renounceOwnership()", "transferOwnership(address)")
+_USDC = _ERC20 + (
+    "increaseAllowance(address,uint256)", "decreaseAllowance(address,uint256)",
+    "mint(address,uint256)", "burn(uint256)", "configureMinter(address,uint256)",
+    "removeMinter(address)", "isMinter(address)", "minterAllowance(address)",
+    "blacklist(address)", "unBlacklist(address)", "isBlacklisted(address)",
+    "pause()", "unpause()", "paused()", "owner()", "transferOwnership(address)",
+    "permit(address,address,uint256,uint256,uint8,bytes32,bytes32)", "nonces(address)",
+    "DOMAIN_SEPARATOR()", "authorizationState(address,bytes32)",
+    "transferWithAuthorization(address,address,uint256,uint256,uint256,bytes32,uint8,bytes32,bytes32)",
+    "receiveWithAuthorization(address,address,uint256,uint256,uint256,bytes32,uint8,bytes32,bytes32)",
+    "cancelAuthorization(address,bytes32,uint8,bytes32,bytes32)",
+    "currency()", "masterMinter()", "pauser()", "blacklister()", "rescuer()",
+    "updatePauser(address)", "updateBlacklister(address)", "updateMasterMinter(address)",
+    "updateRescuer(address)", "rescueERC20(address,address,uint256)",
+)
+_OI = "(uint8,address,uint256,uint256,uint256)"
+_CI = "(uint8,address,uint256,uint256,uint256,address)"
+_ORDER_PARAMS = f"(address,address,{_OI}[],{_CI}[],uint8,uint256,uint256,bytes32,uint256,bytes32,uint256)"
+
+KNOWN_CONTRACT_SIGNATURES: Dict[str, Tuple[str, ...]] = {
+    "0x00000000000000adc04c56bf30ac9d3c0aaf14dc": (
+        "fulfillBasicOrder((address,uint256,uint256,address,address,address,uint256,uint256,uint8,uint256,uint256,bytes32,uint256,bytes32,bytes32,uint256,(uint256,address)[],bytes))",
+        f"fulfillOrder(({_ORDER_PARAMS},bytes),bytes32)",
+        f"validate(({_ORDER_PARAMS},bytes)[])", f"cancel({_ORDER_PARAMS}[])",
+        f"getOrderHash({_ORDER_PARAMS})", "getOrderStatus(bytes32)",
+        "getCounter(address)", "incrementCounter()", "information()", "name()",
+    ),
+    "0x7a250d5630b4cf539739df2c5dacb4c659f2488d": (
+        "WETH()", "factory()", "quote(uint256,uint256,uint256)",
+        "getAmountOut(uint256,uint256,uint256)", "getAmountIn(uint256,uint256,uint256)",
+        "getAmountsOut(uint256,address[])", "getAmountsIn(uint256,address[])",
+        "addLiquidity(address,address,uint256,uint256,uint256,uint256,address,uint256)",
+        "addLiquidityETH(address,uint256,uint256,uint256,address,uint256)",
+        "removeLiquidity(address,address,uint256,uint256,uint256,address,uint256)",
+        "removeLiquidityETH(address,uint256,uint256,uint256,address,uint256)",
+        "removeLiquidityWithPermit(address,address,uint256,uint256,uint256,address,uint256,bool,uint8,bytes32,bytes32)",
+        "removeLiquidityETHWithPermit(address,uint256,uint256,uint256,address,uint256,bool,uint8,bytes32,bytes32)",
+        "removeLiquidityETHSupportingFeeOnTransferTokens(address,uint256,uint256,uint256,address,uint256)",
+        "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)",
+        "swapTokensForExactTokens(uint256,uint256,address[],address,uint256)",
+        "swapExactETHForTokens(uint256,address[],address,uint256)",
+        "swapTokensForExactETH(uint256,uint256,address[],address,uint256)",
+        "swapExactTokensForETH(uint256,uint256,address[],address,uint256)",
+        "swapETHForExactTokens(uint256,address[],address,uint256)",
+        "swapExactTokensForTokensSupportingFeeOnTransferTokens(uint256,uint256,address[],address,uint256)",
+        "swapExactETHForTokensSupportingFeeOnTransferTokens(uint256,address[],address,uint256)",
+        "swapExactTokensForETHSupportingFeeOnTransferTokens(uint256,uint256,address[],address,uint256)",
+    ),
+    "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45": (
+        "exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))",
+        "exactInput((bytes,address,uint256,uint256))",
+        "exactOutputSingle((address,address,uint24,address,uint256,uint256,uint160))",
+        "exactOutput((bytes,address,uint256,uint256))",
+        "swapExactTokensForTokens(uint256,uint256,address[],address)",
+        "swapTokensForExactTokens(uint256,uint256,address[],address)",
+        "multicall(bytes[])", "multicall(uint256,bytes[])", "multicall(bytes32,bytes[])",
+        "unwrapWETH9(uint256,address)", "unwrapWETH9(uint256)", "refundETH()",
+        "sweepToken(address,uint256,address)", "sweepToken(address,uint256)",
+        "uniswapV3SwapCallback(int256,int256,bytes)", "WETH9()", "factory()",
+        "factoryV2()", "positionManager()", "approveMax(address)", "wrapETH(uint256)",
+        "pull(address,uint256)",
+    ),
+    "0x1f98431c8ad98523631ae4a59f267346ea31f984": (
+        "createPool(address,address,uint24)", "getPool(address,address,uint24)",
+        "owner()", "setOwner(address)", "enableFeeAmount(uint24,int24)",
+        "feeAmountTickSpacing(uint24)", "parameters()",
+    ),
+    "0x87870bca3f3fd6335c3f4ce8392d69350b4fa4e2": (
+        "supply(address,uint256,address,uint16)", "deposit(address,uint256,address,uint16)",
+        "supplyWithPermit(address,uint256,address,uint16,uint256,uint8,bytes32,bytes32)",
+        "withdraw(address,uint256,address)", "borrow(address,uint256,uint256,uint16,address)",
+        "repay(address,uint256,uint256,address)", "repayWithATokens(address,uint256,uint256)",
+        "repayWithPermit(address,uint256,uint256,address,uint256,uint8,bytes32,bytes32)",
+        "swapBorrowRateMode(address,uint256)", "rebalanceStableBorrowRate(address,address)",
+        "setUserUseReserveAsCollateral(address,bool)",
+        "liquidationCall(address,address,address,uint256,bool)",
+        "flashLoan(address,address[],uint256[],uint256[],address,bytes,uint16)",
+        "flashLoanSimple(address,address,uint256,bytes,uint16)",
+        "getUserAccountData(address)", "getReserveData(address)", "getReservesList()",
+        "getUserConfiguration(address)", "getConfiguration(address)",
+        "getReserveNormalizedIncome(address)", "getReserveNormalizedVariableDebt(address)",
+        "setUserEMode(uint8)", "getUserEMode(address)", "mintToTreasury(address[])",
+        "ADDRESSES_PROVIDER()", "FLASHLOAN_PREMIUM_TOTAL()", "MAX_NUMBER_RESERVES()",
+    ),
+    "0x00000000000c2e074ec69a0dfb2997ba6c7d2e1e": (
+        "owner(bytes32)", "resolver(bytes32)", "ttl(bytes32)", "recordExists(bytes32)",
+        "setOwner(bytes32,address)", "setResolver(bytes32,address)", "setTTL(bytes32,uint64)",
+        "setSubnodeOwner(bytes32,bytes32,address)", "setRecord(bytes32,address,address,uint64)",
+        "setSubnodeRecord(bytes32,bytes32,address,address,uint64)",
+        "setApprovalForAll(address,bool)", "isApprovedForAll(address,address)", "old()",
+    ),
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48": _USDC,
+    "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913": _USDC,
+    "0x3c499c542cef5e3811e1192ce70d8cc03d5c3359": _USDC,
+    "0xdac17f958d2ee523a2206206994597c13d831ec7": _ERC20 + (
+        "issue(uint256)", "redeem(uint256)", "addBlackList(address)", "removeBlackList(address)",
+        "destroyBlackFunds(address)", "getBlackListStatus(address)", "isBlackListed(address)",
+        "pause()", "unpause()", "paused()", "owner()", "transferOwnership(address)",
+        "deprecate(address)", "deprecated()", "upgradedAddress()", "setParams(uint256,uint256)",
+        "basisPointsRate()", "maximumFee()", "getOwner()", "_totalSupply()",
+    ),
+    "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2": _ERC20 + ("deposit()", "withdraw(uint256)"),
+    "0x514910771af9ca656af840dff83e8264ecf986ca": _ERC20 + (
+        "transferAndCall(address,uint256,bytes)", "increaseApproval(address,uint256)",
+        "decreaseApproval(address,uint256)",
+    ),
+    "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d": _ERC721 + _OWNABLE + (
+        "tokenByIndex(uint256)", "tokenOfOwnerByIndex(address,uint256)", "baseURI()",
+        "setBaseURI(string)", "mintApe(uint256)", "flipSaleState()", "saleIsActive()",
+        "reserveApes()", "withdraw()", "setProvenanceHash(string)", "BAYC_PROVENANCE()",
+        "MAX_APES()", "apePrice()", "maxApePurchase()", "setRevealTimestamp(uint256)",
+        "REVEAL_TIMESTAMP()", "setStartingIndex()", "startingIndex()", "startingIndexBlock()",
+        "emergencySetStartingIndexBlock()",
+    ),
+    "0xed5af388653567af2f388e6224dc7c4b3241c544": _ERC721 + _OWNABLE + (
+        "numberMinted(address)", "getOwnershipData(uint256)", "devMint(uint256)",
+        "allowlistMint()", "publicSaleMint(uint256)", "auctionMint(uint256)",
+        "seedAllowlist(address[],uint256[])", "setBaseURI(string)", "withdrawMoney()",
+        "setOwnersExplicit(uint256)", "getAuctionPrice(uint256)",
+    ),
+    "0xb47e3cd837ddf8e4c57f05d70ab865de6e193bbb": (
+        "name()", "symbol()", "decimals()", "totalSupply()", "balanceOf(address)",
+        "standard()", "imageHash()", "punkIndexToAddress(uint256)", "punksOfferedForSale(uint256)",
+        "punkBids(uint256)", "pendingWithdrawals(address)", "punksRemainingToAssign()",
+        "allPunksAssigned()", "setInitialOwner(address,uint256)",
+        "setInitialOwners(address[],uint256[])", "allInitialOwnersAssigned()",
+        "getPunk(uint256)", "transferPunk(address,uint256)", "punkNoLongerForSale(uint256)",
+        "offerPunkForSale(uint256,uint256)", "offerPunkForSaleToAddress(uint256,uint256,address)",
+        "buyPunk(uint256)", "withdraw()", "enterBidForPunk(uint256)",
+        "acceptBidForPunk(uint256,uint256)", "withdrawBidForPunk(uint256)",
+    ),
+}
+
+ChainId = Union[str, int, None]
+
+_index = None
+_index_path = os.getenv("ROMA_REGISTRY_INDEX")
+if _index_path:
+    try:
+        from registry_index import RegistryIndex
+        _index = RegistryIndex(_index_path)
+        print(f"✅ Contract registry index loaded: {_index.count} labels")
+    except Exception as e:
+        print(f"⚠️  Contract registry index not loaded: {e}")
+
+def _builtin(address: str, chain_id: ChainId) -> Optional[Dict[str, str]]:
+    info = KNOWN_CONTRACTS.get(address)
+    if info is None or chain_id is None:
+        return info
+    if str(chain_id) in KNOWN_CONTRACT_CHAINS.get(address, ("1",)):
+        return info
+    return None
+
+def get_contract_info(address: str, chain_id: ChainId = None) -> Optional[Dict[str, str]]:
     """
-    Look up a contract by its address (case-insensitive).
+    Look up a contract by its address (case-insensitive) on the given chain.
+    Without a chain id only the curated entries are searched, on any chain.
     Returns contract metadata if found, None otherwise.
     """
     normalized_address = address.lower()
-    return KNOWN_CONTRACTS.get(normalized_address)
+    info = _builtin(normalized_address, chain_id)
+    if info is None and _index is not None and chain_id is not None:
+        try:
+            info = _index.get(int(chain_id), normalized_address)
+        except (ValueError, OverflowError):
+            return None
+    return info
 
-def is_known_contract(address: str) -> bool:
+def is_known_contract(address: str, chain_id: ChainId = None) -> bool:
     """Check if a contract address is in our registry."""
-    return address.lower() in KNOWN_CONTRACTS
+    normalized_address = address.lower()
+    if _builtin(normalized_address, chain_id) is not None:
+        return True
+    if _index is not None and chain_id is not None:
+        try:
+            return _index.contains(int(chain_id), normalized_address)
+        except (ValueError, OverflowError):
+            return False
+    return False
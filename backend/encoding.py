@@ -0,0 +1,238 @@
+"""
+Response encoding for /explain: ETags, compression and MessagePack.
+
+- Every /explain response carries a strong ETag computed from the canonical
+  request (minus the unused metadata), the analysis version
+  (cache.CACHE_VERSION) and the representation (summary or structured
+  output, JSON or MessagePack). A matching If-None-Match gets a 304 before
+  any analysis runs. Provisional results (the fallback sent while the LLM
+  is still working) carry no ETag and are not stored.
+- Clients sending ``Accept: application/msgpack`` get MessagePack instead of
+  JSON, encoded with msgspec. A type the client gives q=0 is never sent, and
+  JSON wins when the client weights it higher.
+- CompressionMiddleware compresses complete (non-streamed) responses with
+  brotli when the client accepts it and the brotli package is installed,
+  otherwise with gzip. A compressed response's ETag gets a "-br" or "-gzip"
+  suffix, since its bytes differ; If-None-Match accepts either form, and a
+  304 carries the form the client sent back.
+  Streamed responses (NDJSON/SSE) pass through untouched so events are not
+  held back in a compressor.
+"""
+
+import gzip
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from cache import CACHE_VERSION, canonical_hash
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used instead
+    brotli = None
+
+try:
+    from msgspec import msgpack
+except ImportError:  # msgspec is in requirements.txt; JSON only without it
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MIN_COMPRESS_BYTES = int(os.getenv("ROMA_COMPRESS_MIN_BYTES", "512"))
+GZIP_LEVEL = int(os.getenv("ROMA_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("ROMA_BROTLI_QUALITY", "5"))
+_SUFFIXES = ("-br", "-gzip")
+_STREAMING_TYPES = (b"text/event-stream", b"application/x-ndjson")
+
+
+def _weights(header: str) -> Dict[str, float]:
+    """Accept-style header as {lowercased name: q}; q=0 entries are kept."""
+    weights: Dict[str, float] = {}
+    for part in header.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = max(q, weights.get(name, 0.0))
+    return weights
+
+
+def negotiate_format(request: Request) -> str:
+    """"msgpack" when asked for (and not weighted below JSON) and available, else "json"."""
+    if msgpack is None:
+        return "json"
+    weights = _weights(request.headers.get("accept", ""))
+    packed = max(weights.get(t, 0.0) for t in MSGPACK_TYPES)
+    if packed > 0 and packed >= weights.get("application/json", 0.0):
+        return "msgpack"
+    return "json"
+
+
+def etag_for(payload: Dict[str, Any], variant: str) -> str:
+    digest = canonical_hash({"v": CACHE_VERSION, "variant": variant, "request": payload})
+    return f'"{digest[:32]}"'
+
+
+def _opaque_strong(tag: str) -> str:
+    """tag without the weak prefix, suffix kept."""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _opaque(tag: str) -> str:
+    tag = _opaque_strong(tag)
+    for suffix in _SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match check with the weak comparison RFC 9110 prescribes."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(tag) == etag for tag in header.split(","))
+
+
+def _headers(etag: Optional[str]) -> Dict[str, str]:
+    if etag is None:
+        return {"Vary": "Accept, Accept-Encoding", "Cache-Control": "no-store"}
+    return {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_headers(etag))
+
+
+def render(result: Dict[str, Any], fmt: str, etag: Optional[str]) -> Response:
+    """etag None (provisional results) sends Cache-Control: no-store instead."""
+    if fmt == "msgpack":
+        return Response(msgpack.encode(result), media_type=MSGPACK_TYPES[0], headers=_headers(etag))
+    if orjson is not None:
+        body = orjson.dumps(result)
+    else:
+        import json
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode()
+    return Response(body, media_type="application/json", headers=_headers(etag))
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    weights = _weights(header)
+    wildcard = weights.get("*", 0.0)
+    if brotli is not None and weights.get("br", 0.0) > 0:
+        return "br"
+    if weights.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress single-message responses; see the module docstring."""
+
+    def __init__(self, app: Callable, minimum_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        if encoding is None and not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def wrapped_send(message: Dict[str, Any]) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if message["status"] == 304 or encoding is None:
+                    passthrough = True
+                    if message["status"] == 304:
+                        message = {**message, "headers": self._revalidated_headers(message["headers"], if_none_match)}
+                    await send(message)
+                    return
+                start = message
+                return
+            # First body message: compress only if it is the whole body.
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._eligible(start, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            compressed = compress(body, encoding)
+            out = [(k, v) for k, v in start["headers"] if k.lower() not in (b"content-length", b"etag")]
+            out += self._etag_headers(start["headers"], encoding)
+            out += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ]
+            if not any(k.lower() == b"vary" for k, _ in out):
+                out.append((b"vary", b"Accept-Encoding"))
+            await send({**start, "headers": out})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, wrapped_send)
+
+    def _eligible(self, start: Dict[str, Any], body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] < 200 or start["status"] in (204, 304):
+            return False
+        for key, value in start["headers"]:
+            key = key.lower()
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type" and value.split(b";")[0].strip() in _STREAMING_TYPES:
+                return False
+        return True
+
+    @staticmethod
+    def _revalidated_headers(headers: List[Tuple[bytes, bytes]], if_none_match: str) -> List[Tuple[bytes, bytes]]:
+        """A 304's headers with the ETag in the (possibly suffixed) form that matched."""
+        out = []
+        for key, value in headers:
+            if key.lower() == b"etag":
+                etag = value.decode("latin-1")
+                for tag in if_none_match.split(","):
+                    if _opaque(tag) == etag:
+                        value = _opaque_strong(tag).encode("latin-1")
+                        break
+            out.append((key, value))
+        return out
+
+    @staticmethod
+    def _etag_headers(headers: List[Tuple[bytes, bytes]], encoding: str) -> List[Tuple[bytes, bytes]]:
+        for key, value in headers:
+            if key.lower() == b"etag" and value.endswith(b'"'):
+                suffix = b"-br" if encoding == "br" else b"-gzip"
+                return [(b"etag", value[:-1] + suffix + b'"')]
+        return []
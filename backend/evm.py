@@ -0,0 +1,289 @@
+"""
+Vectorized EVM bytecode analysis for unverified contracts.
+
+The bytecode is handled as a numpy uint8 array over the raw bytes, never as a
+hex string. Finding instruction boundaries is the only inherently sequential
+part: a byte is an opcode unless an earlier PUSH covers it. Only PUSH-like
+bytes can change the decoding, so the walk is done over those alone. Each
+one links to the next PUSH-like byte after its immediate, and pointer
+doubling marks the chain that starts at the first one. That is O(m log m)
+array work for m PUSH-like bytes, with no Python loop per instruction.
+
+On top of the instruction boundaries:
+- dispatcher selectors: ``PUSH4 sel EQ``, ``PUSH4 sel DUPn EQ`` and, for
+  selectors with leading zero bytes, ``DUP1 PUSH2/3 sel EQ PUSHn dest JUMPI``
+- EIP-1167 minimal proxies (with the implementation address)
+- EIP-1967 proxies, by the implementation/beacon/admin slot constants
+
+It also computes function selectors from ABI entries (Keccak-256 of the
+canonical signature).
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from Crypto.Hash import keccak as _keccak  # pycryptodome (requirements.txt)
+except ImportError:
+    _keccak = None
+
+PUSH1, PUSH2, PUSH3, PUSH4, PUSH32 = 0x60, 0x61, 0x62, 0x63, 0x7F
+DUP1, DUP16 = 0x80, 0x8F
+EQ = 0x14
+JUMPI = 0x57
+DELEGATECALL = 0xF4
+SELFDESTRUCT = 0xFF
+
+EIP1967_SLOTS = {
+    "implementation": bytes.fromhex("360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc"),
+    "beacon": bytes.fromhex("a3f0ad74e5423aebfd80d3ef4346578335a9a72aeaee59ff6cb3582b35133d50"),
+    "admin": bytes.fromhex("b53127684a568b3173ae13b9f8a6016e243e63b6e8ee1178d6a717850b5d6103"),
+}
+
+_EIP1167 = re.compile(
+    rb"\A\x36\x3d\x3d\x37\x3d\x3d\x3d\x36\x3d\x73(.{20})"
+    rb"\x5a\xf4\x3d\x82\x80\x3e\x90\x3d\x91\x60\x2b\x57\xfd\x5b\xf3",
+    re.S,
+)
+
+
+class BytecodeInfo(NamedTuple):
+    size: int
+    selectors: List[str]
+    proxy: Optional[Dict[str, Any]]
+    delegatecall: bool
+    selfdestruct: bool
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "selectors": self.selectors,
+            "proxy": self.proxy,
+            "delegatecall": self.delegatecall,
+            "selfdestruct": self.selfdestruct,
+        }
+
+
+def to_bytes(code: Union[str, bytes, bytearray, memoryview]) -> bytes:
+    """Accept raw bytes or a 0x-prefixed hex string; raises ValueError if malformed."""
+    if isinstance(code, str):
+        code = code.strip()
+        return bytes.fromhex(code[2:] if code[:2] in ("0x", "0X") else code)
+    return bytes(code)
+
+
+def strip_metadata(code: bytes) -> bytes:
+    """Drop the trailing CBOR metadata solc/vyper append, if present."""
+    if len(code) < 4:
+        return code
+    length = int.from_bytes(code[-2:], "big")
+    start = len(code) - 2 - length
+    if 0 < length < len(code) - 2 and 0xA1 <= code[start] <= 0xA5:
+        return code[:start]
+    return code
+
+
+def executed_pushes(ops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions of the PUSH instructions that are actually executed, and the
+    position just past each one's immediate (the next instruction).
+    """
+    n = len(ops)
+    is_push = (ops - np.uint8(PUSH1)) < 32
+    push_at = np.flatnonzero(is_push)
+    m = len(push_at)
+    if not m:
+        return push_at, push_at
+    ends = push_at + (ops.take(push_at) - (PUSH1 - 2))
+    # jump[i] is the next PUSH-like byte once push i and its immediate are
+    # skipped; m is the end sentinel. Bytes in between are plain opcodes.
+    before = np.empty(n + 34, dtype=np.intp)
+    before[0] = 0
+    np.cumsum(is_push, out=before[1:n + 1])
+    before[n + 1:] = m
+    jump = np.append(before.take(ends), m)
+    # After round r, reached holds the first 2**r chain members and jump
+    # skips 2**r members at once.
+    reached = np.zeros(1, dtype=np.intp)
+    while reached[-1] != m:
+        reached = np.concatenate((reached, jump.take(reached)))
+        jump = jump.take(jump)
+    real = np.zeros(m + 1, dtype=bool)
+    real[reached] = True
+    real = real[:m]
+    return push_at[real], ends[real]
+
+
+def is_instruction(at: np.ndarray, end: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """For each position, whether it starts an instruction (is not PUSH data)."""
+    if not len(at):
+        return np.ones(len(positions), dtype=bool)
+    prior = np.searchsorted(at, positions) - 1
+    return (prior < 0) | (end.take(np.maximum(prior, 0)) <= positions)
+
+
+def instruction_starts(ops: np.ndarray) -> np.ndarray:
+    """Boolean mask of the bytes that begin an instruction."""
+    at, end = executed_pushes(ops)
+    starts = np.ones(len(ops) + 33, dtype=bool)
+    first = at + 1
+    width = end - first
+    # Immediate byte positions of every executed push, without a Python loop.
+    offsets = np.cumsum(width) - width
+    starts[np.arange(width.sum()) + np.repeat(first - offsets, width)] = False
+    return starts[:len(ops)]
+
+
+def _immediates(padded: np.ndarray, at: np.ndarray, width: int) -> List[int]:
+    """Big-endian value of the width-byte immediate after each position."""
+    window = padded[at[:, None] + 1 + np.arange(width)].astype(np.uint64)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64) * np.uint64(8)
+    return (window << shifts).sum(axis=1).tolist()
+
+
+def dispatcher_selectors(ops: np.ndarray, at: np.ndarray, end: np.ndarray) -> List[str]:
+    """Selectors compared against calldata in the function dispatcher, in code order."""
+    # Zero padding: a PUSH truncated by the end of the code reads zeros, like
+    # the EVM does, and lookahead past the end sees STOP.
+    padded = np.concatenate((ops, np.zeros(40, dtype=np.uint8)))
+    op = padded.take(at)
+    nxt = padded.take(end)
+    # Every form compares right after the push, possibly via one DUPn.
+    keep = (op >= PUSH2) & (op <= PUSH4) & ((nxt == EQ) | ((nxt >= DUP1) & (nxt <= DUP16)))
+    pushes = at, end
+    at, end, op, nxt = at[keep], end[keep], op[keep], nxt[keep]
+    nxt2 = padded.take(end + 1)
+
+    full = (op == PUSH4) & ((nxt == EQ) | (nxt2 == EQ))
+    # Shorter pushes are too common to trust on their own, so they also need
+    # the dispatcher's branch: DUP1 PUSHn sel EQ PUSHm dest JUMPI.
+    prev = np.maximum(at - 1, 0)
+    target = (nxt2 >= PUSH1) & (nxt2 <= PUSH4)
+    branch = (
+        (op != PUSH4) & (at > 0) & (padded.take(prev) == DUP1) & (nxt == EQ) & target
+        & (padded.take(end + 2 + np.where(target, nxt2 - (PUSH1 - 1), 0)) == JUMPI)
+    )
+    if branch.any():
+        branch[branch] = is_instruction(*pushes, prev[branch])
+
+    found = []
+    for width, hits in ((4, full), (3, branch & (op == PUSH3)), (2, branch & (op == PUSH2))):
+        if hits.any():
+            found.extend(zip(at[hits].tolist(), _immediates(padded, at[hits], width)))
+    selectors: Dict[str, None] = {}
+    for _, value in sorted(found):
+        if value and value != 0xFFFFFFFF:
+            selectors.setdefault(f"0x{value:08x}", None)
+    return list(selectors)
+
+
+def detect_proxy(code: bytes, at: np.ndarray, end: np.ndarray) -> Optional[Dict[str, Any]]:
+    match = _EIP1167.match(code)
+    if match:
+        return {"kind": "eip1167", "implementation": "0x" + match.group(1).hex()}
+    pushes32 = set(at[(end - at) == 33].tolist())
+    slots = []
+    for name, slot in EIP1967_SLOTS.items():
+        pos = code.find(slot)
+        while pos > 0:
+            if pos - 1 in pushes32:
+                slots.append(name)
+                break
+            pos = code.find(slot, pos + 1)
+    if slots:
+        return {"kind": "eip1967", "slots": slots}
+    return None
+
+
+def analyze_bytecode(code: Union[str, bytes, bytearray, memoryview]) -> BytecodeInfo:
+    """Disassemble runtime bytecode and extract selectors and proxy information."""
+    raw = strip_metadata(to_bytes(code))
+    ops = np.frombuffer(raw, dtype=np.uint8)
+    at, end = executed_pushes(ops)
+    special = np.flatnonzero((ops == DELEGATECALL) | (ops == SELFDESTRUCT))
+    special = special[is_instruction(at, end, special)]
+    found = set(ops.take(special).tolist())
+    return BytecodeInfo(
+        size=len(raw),
+        selectors=dispatcher_selectors(ops, at, end),
+        proxy=detect_proxy(raw, at, end),
+        delegatecall=DELEGATECALL in found,
+        selfdestruct=SELFDESTRUCT in found,
+    )
+
+
+# Keccak-256 (the pre-standard SHA-3 padding Ethereum uses; hashlib.sha3_256
+# is not the same function). The pure-Python fallback is ~100x slower than
+# pycryptodome (~0.7 ms per hash), so it is only for environments without it.
+_RC = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+_ROT = (0, 1, 62, 28, 27, 36, 44, 6, 55, 20, 3, 10, 43, 25, 39, 41, 45, 15, 21, 8, 18, 2, 61, 56, 14)
+# Lane i = x + 5y moves to y + 5((2x + 3y) % 5) in the pi step.
+_PI = tuple((i // 5) + 5 * ((2 * (i % 5) + 3 * (i // 5)) % 5) for i in range(25))
+_MASK = (1 << 64) - 1
+
+
+def _keccak_f(a: List[int]) -> List[int]:
+    for rc in _RC:
+        c = [a[x] ^ a[x + 5] ^ a[x + 10] ^ a[x + 15] ^ a[x + 20] for x in range(5)]
+        d = [c[x - 1] ^ ((c[(x + 1) % 5] << 1 | c[(x + 1) % 5] >> 63) & _MASK) for x in range(5)]
+        b = [0] * 25
+        for i in range(25):
+            v, r = a[i] ^ d[i % 5], _ROT[i]
+            b[_PI[i]] = (v << r | v >> (64 - r)) & _MASK if r else v
+        a = [b[i] ^ (~b[i - i % 5 + (i + 1) % 5] & b[i - i % 5 + (i + 2) % 5]) for i in range(25)]
+        a[0] ^= rc
+    return a
+
+
+def keccak256(data: bytes) -> bytes:
+    if _keccak is not None:
+        return _keccak.new(digest_bits=256, data=data).digest()
+    rate = 136
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(bytes(-len(padded) % rate))
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for block in range(0, len(padded), rate):
+        for i in range(rate // 8):
+            state[i] ^= int.from_bytes(padded[block + 8 * i:block + 8 * i + 8], "little")
+        state = _keccak_f(state)
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+_TYPE_ALIASES = {"uint": "uint256", "int": "int256", "fixed": "fixed128x18", "ufixed": "ufixed128x18", "byte": "bytes1"}
+
+
+def _canonical_type(param: Dict[str, Any]) -> str:
+    kind = param.get("type", "")
+    if kind.startswith("tuple"):
+        inner = ",".join(_canonical_type(c) for c in param.get("components") or ())
+        return f"({inner}){kind[5:]}"
+    base, bracket, suffix = kind.partition("[")
+    return _TYPE_ALIASES.get(base, base) + bracket + suffix
+
+
+def canonical_signature(entry: Dict[str, Any]) -> str:
+    """name(type1,type2) for an ABI function entry, with tuples expanded."""
+    return f"{entry.get('name', '')}({','.join(_canonical_type(p) for p in entry.get('inputs') or ())})"
+
+
+@lru_cache(maxsize=65536)
+def signature_selector(signature: str) -> int:
+    """First four bytes of keccak256(signature), as an int."""
+    return int.from_bytes(keccak256(signature.encode())[:4], "big")
+
+
+def abi_selectors(abi: List[Dict[str, Any]]) -> List[int]:
+    """Selectors of the functions in an ABI."""
+    return [signature_selector(canonical_signature(x)) for x in abi if x.get("type") == "function"]
@@ -0,0 +1,177 @@
+"""
+Single-pass feature extraction for ABI and selector analysis.
+
+The ABI is walked exactly once to count entries and collect function names.
+Every keyword the analyzers care about is compiled once into a multi-keyword
+matcher that runs over the normalized names and yields a single integer
+bitset; contract-type and capability decisions are then table lookups on that
+bitset instead of one generator pass per keyword.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Feature bits. Plain ints rather than an IntFlag: bitwise ops on enum members
+# are an order of magnitude slower and this module sits on the hot path.
+OWNER = 1 << 0
+PAUSE = 1 << 1
+TRANSFER = 1 << 2
+APPROVE = 1 << 3
+MINT = 1 << 4
+BURN = 1 << 5
+BALANCE = 1 << 6
+UPGRADE = 1 << 7
+SWAP = 1 << 8
+LIQUIDITY = 1 << 9
+FULFILL = 1 << 10
+MATCH = 1 << 11
+DEPOSIT = 1 << 12
+BORROW = 1 << 13
+REPAY = 1 << 14
+STAKE = 1 << 15
+TOKEN_URI = 1 << 16
+OWNER_OF = 1 << 17
+FALLBACK = 1 << 18
+RECEIVE = 1 << 19
+ERC20_SIGNATURE = 1 << 20
+ERC721_SIGNATURE = 1 << 21
+
+FEATURE_NAMES: Tuple[str, ...] = (
+    "owner", "pause", "transfer", "approve", "mint", "burn", "balance",
+    "upgrade", "swap", "liquidity", "fulfill", "match", "deposit", "borrow",
+    "repay", "stake", "tokenURI", "ownerOf", "fallback", "receive",
+    "erc20Signature", "erc721Signature",
+)
+
+# Substrings matched against lowercased function names / signatures.
+NAME_KEYWORDS: Tuple[Tuple[str, int], ...] = (
+    ("owner", OWNER),
+    ("pause", PAUSE),
+    ("transfer", TRANSFER),
+    ("approve", APPROVE),
+    ("mint", MINT),
+    ("burn", BURN),
+    ("balance", BALANCE),
+    ("upgrade", UPGRADE),
+    ("swap", SWAP),
+    ("liquidity", LIQUIDITY),
+    ("fulfill", FULFILL),
+    ("match", MATCH),
+    ("deposit", DEPOSIT),
+    ("borrow", BORROW),
+    ("repay", REPAY),
+    ("stake", STAKE),
+    ("tokenuri", TOKEN_URI),
+    ("ownerof", OWNER_OF),
+)
+
+# Exact signatures that identify a token standard on the selector path.
+EXACT_SIGNATURES: Dict[str, int] = {
+    "transfer(address,uint256)": ERC20_SIGNATURE,
+    "approve(address,uint256)": ERC20_SIGNATURE,
+    "balanceOf(address)": ERC20_SIGNATURE,
+    "safeTransferFrom(address,address,uint256)": ERC721_SIGNATURE,
+    "ownerOf(uint256)": ERC721_SIGNATURE,
+}
+
+_READ_ONLY = frozenset(("view", "pure"))
+
+
+class KeywordMatcher:
+    """Precompiled multi-keyword matcher that ORs the masks of every hit.
+
+    Names are normalized (lowercased) and joined into one newline-separated
+    buffer so each keyword costs a single C-level substring search, no matter
+    how many entries the ABI has. No keyword contains a newline, so matches
+    never straddle two names. In CPython this beats an automaton walked one
+    character at a time in Python by roughly an order of magnitude.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        table: Dict[str, int] = {}
+        for word, mask in keywords:
+            table[word] = table.get(word, 0) | mask
+        self._table = tuple(table.items())
+
+    def scan(self, text: str) -> int:
+        """Return the OR of the masks of every keyword occurring in text."""
+        mask = 0
+        for word, bits in self._table:
+            if bits & ~mask and word in text:
+                mask |= bits
+        return mask
+
+    def scan_all(self, names: Iterable[str]) -> int:
+        """Scan many names at once; equivalent to OR-ing scan() per name."""
+        return self.scan("\n".join(names).lower())
+
+
+_NAME_MATCHER = KeywordMatcher(NAME_KEYWORDS)
+
+
+class AbiFeatures(NamedTuple):
+    flags: int
+    functions: int
+    reads: int
+    writes: int
+    events: int
+
+
+def extract_abi_features(abi: Sequence[dict]) -> AbiFeatures:
+    """Scan an ABI once, returning its feature bitset and entry counts."""
+    flags = 0
+    functions = reads = events = 0
+    names = []
+    add_name = names.append
+    read_only = _READ_ONLY
+    for entry in abi:
+        kind = entry.get("type")
+        if kind == "function":
+            functions += 1
+            if entry.get("stateMutability") in read_only:
+                reads += 1
+            name = entry.get("name")
+            if name:
+                add_name(name)
+        elif kind == "event":
+            events += 1
+        elif kind == "fallback":
+            flags |= FALLBACK
+        elif kind == "receive":
+            flags |= RECEIVE
+    flags |= _NAME_MATCHER.scan_all(names)
+    return AbiFeatures(flags, functions, reads, functions - reads, events)
+
+
+def extract_signature_features(signatures: Iterable[str]) -> int:
+    """Feature bitset for a list of candidate text signatures."""
+    if not isinstance(signatures, (list, tuple)):
+        signatures = list(signatures)
+    flags = _NAME_MATCHER.scan_all(signatures)
+    for sig in signatures:
+        flags |= EXACT_SIGNATURES.get(sig, 0)
+    return flags
+
+
+# A rule is (all_of, any_of, value): it matches when every all_of bit is set
+# and, if any_of is non-zero, at least one any_of bit is set.
+Rule = Tuple[int, int, object]
+
+
+def first_match(flags: int, rules: Sequence[Rule], default: object = None) -> object:
+    """Return the value of the first rule in priority order matched by flags."""
+    for all_of, any_of, value in rules:
+        if flags & all_of == all_of and (not any_of or flags & any_of):
+            return value
+    return default
+
+
+def feature_list(flags: int) -> List[str]:
+    """Names of the features set in flags, in bit order."""
+    return [name for i, name in enumerate(FEATURE_NAMES) if flags >> i & 1]
+
+
+def unique_signatures(candidates: Dict[str, List[str]], limit: Optional[int] = 12) -> List[str]:
+    """Flatten a selector -> candidates map into unique signatures, in order."""
+    flat = [c for cands in candidates.values() for c in cands]
+    uniq = list(dict.fromkeys(flat))
+    return uniq if limit is None else uniq[:limit]
@@ -0,0 +1,197 @@
+"""
+Request-body ingestion for the explain routes.
+
+The frontend forwards Sourcify's metadata.json with every request. It can be
+megabytes of embedded sources, and nothing in the service reads it. FastAPI's
+default handling json-parses the whole body and pydantic copies it, and the
+copy lives as long as the request (including the LLM call). Instead:
+
+- the body is read with a size limit (413 past it),
+- with msgspec installed, it is decoded against a schema of just the fields
+  the analyzers use. Unknown fields (internalType, devdoc, gas, ...) are
+  skipped in C without creating objects, and metadata is kept as a raw,
+  zero-copy slice of the body that is never decoded,
+- without msgspec it is decoded with orjson (or json), metadata is dropped
+  right away and the ABI is projected onto the same fields in Python.
+
+Either way pydantic then validates a body without metadata and with a slim
+ABI, and errors surface as FastAPI's usual 422 (RequestValidationError).
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+import metrics
+
+try:
+    import msgspec
+except ImportError:  # in requirements.txt; else decodes everything and slims afterwards
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+MAX_BODY_BYTES = int(os.getenv("ROMA_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+MAX_BATCH_BODY_BYTES = int(os.getenv("ROMA_MAX_BATCH_BODY_BYTES", str(64 * 1024 * 1024)))
+MAX_ABI_ENTRIES = int(os.getenv("ROMA_MAX_ABI_ENTRIES", "20000"))
+
+_ENTRY_FIELDS = ("type", "name", "stateMutability", "inputs", "outputs", "anonymous")
+_PARAM_FIELDS = ("name", "type", "components", "indexed")
+
+
+def _slim_param(param: Any) -> Any:
+    if not isinstance(param, dict):
+        return param
+    slim = {k: param[k] for k in _PARAM_FIELDS if k in param}
+    if isinstance(slim.get("components"), list):
+        slim["components"] = [_slim_param(c) for c in slim["components"]]
+    return slim
+
+
+def slim_abi(abi: Any) -> Any:
+    """
+    Keep only the ABI fields the analyzers read. Anything malformed is passed
+    through for validation to reject.
+    """
+    if not isinstance(abi, list):
+        return abi
+    out = []
+    for entry in abi:
+        if not isinstance(entry, dict):
+            out.append(entry)
+            continue
+        slim = {k: entry[k] for k in _ENTRY_FIELDS if k in entry}
+        for key in ("inputs", "outputs"):
+            if isinstance(slim.get(key), list):
+                slim[key] = [_slim_param(p) for p in slim[key]]
+        out.append(slim)
+    return out
+
+
+def _slim_body(data: Any) -> Any:
+    if isinstance(data, dict):
+        data.pop("metadata", None)
+        if "abi" in data:
+            data["abi"] = slim_abi(data["abi"])
+    return data
+
+
+if msgspec is not None:
+    _UNSET = msgspec.UNSET
+
+    class _Param(msgspec.Struct, omit_defaults=True):
+        name: Any = _UNSET
+        type: Any = _UNSET
+        components: Optional[List["_Param"]] = _UNSET
+        indexed: Any = _UNSET
+
+    class _Entry(msgspec.Struct, omit_defaults=True):
+        type: Any = _UNSET
+        name: Any = _UNSET
+        stateMutability: Any = _UNSET
+        inputs: Optional[List[_Param]] = _UNSET
+        outputs: Optional[List[_Param]] = _UNSET
+        anonymous: Any = _UNSET
+
+    class _Body(msgspec.Struct, omit_defaults=True):
+        mode: Any = _UNSET
+        address: Any = _UNSET
+        chainId: Any = _UNSET
+        abi: Optional[List[_Entry]] = _UNSET
+        metadata: msgspec.Raw = _UNSET
+        selectors: Any = _UNSET
+        candidates: Any = _UNSET
+        bytecode: Any = _UNSET
+        output: Any = _UNSET
+
+    class _Batch(msgspec.Struct):
+        items: List[_Body]
+
+    _decoders = {False: msgspec.json.Decoder(_Body), True: msgspec.json.Decoder(_Batch)}
+
+    def _body_dict(body: "_Body") -> Dict[str, Any]:
+        if body.metadata is not _UNSET:
+            metrics.skipped_bytes.inc(amount=len(body.metadata))
+            body.metadata = _UNSET
+        return msgspec.to_builtins(body)
+
+    def _decode(buf: bytes, batch: bool) -> Any:
+        """
+        Schema decode; None when the body does not fit the schema, so the
+        generic path decodes it and pydantic reports the problem.
+        """
+        try:
+            decoded = _decoders[batch].decode(buf)
+        except msgspec.ValidationError:
+            return None
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e))
+        if batch:
+            return {"items": [_body_dict(item) for item in decoded.items]}
+        return _body_dict(decoded)
+else:
+    def _decode(buf: bytes, batch: bool) -> Any:
+        return None
+
+
+def loads(buf: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(buf)
+    return json.loads(buf)
+
+
+def decode(buf: bytes, batch: bool = False) -> Any:
+    """An /explain (or /explain/batch) body without metadata and with slim ABIs."""
+    data = _decode(buf, batch)
+    if data is not None:
+        return data
+    data = loads(buf)
+    if batch and isinstance(data, dict) and isinstance(data.get("items"), list):
+        for item in data["items"]:
+            _slim_body(item)
+        return data
+    return _slim_body(data)
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(413, f"Request body larger than {limit} bytes")
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(413, f"Request body larger than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def read_json(request: Request, batch: bool = False) -> Any:
+    body = await read_body(request, MAX_BATCH_BODY_BYTES if batch else MAX_BODY_BYTES)
+    try:
+        return decode(body, batch)
+    except ValueError as e:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body", 0), "msg": "JSON decode error", "input": {}, "ctx": {"error": str(e)}}]
+        )
+
+
+def validate(model: type, data: Any) -> BaseModel:
+    """model_validate, with errors reported as FastAPI reports body errors."""
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+
+def body_schema(model: type) -> Dict[str, Any]:
+    """openapi_extra for routes that read their body through this module."""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
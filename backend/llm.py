@@ -0,0 +1,166 @@
+"""
+Lazy DSPy/OpenAI runtime.
+
+Importing dspy (and litellm underneath it) takes well over a second, so
+nothing here touches it at import time. The stack is loaded on the first LLM
+call, or earlier by warm_in_background() once the app is serving. Signatures
+and ChainOfThought predictors are built once and shared by every request.
+"""
+
+import os
+import threading
+import time
+from typing import Any, ContextManager, Dict, Optional
+
+MODEL = os.getenv("ROMA_LLM_MODEL", "openai/gpt-4o-mini")
+
+_lock = threading.Lock()
+_predictors: Dict[str, Any] = {}
+_dspy: Any = None
+_error: Optional[str] = None
+_loading = False
+_load_seconds: Optional[float] = None
+
+
+def configured() -> bool:
+    return bool(os.getenv("OPENAI_API_KEY"))
+
+
+def available() -> bool:
+    """True while the LLM stage may be used: configured and not known broken."""
+    return configured() and _error is None
+
+
+def is_warm() -> bool:
+    return bool(_predictors)
+
+
+def _load() -> None:
+    global _dspy, _load_seconds
+    started = time.perf_counter()
+    import dspy
+
+    class ContractExplainer(dspy.Signature):
+        """Explain a smart contract in simple, non-technical language."""
+        context = dspy.InputField(desc="Contract interface as compact Solidity-style declarations, grouped by kind")
+        explanation = dspy.OutputField(desc="Simple, friendly explanation with formatting")
+
+    class UnverifiedContractExplainer(dspy.Signature):
+        """Explain an unverified smart contract based on function signatures."""
+        functions = dspy.InputField(desc="Detected function signatures as Solidity-style declarations")
+        explanation = dspy.OutputField(desc="Simple explanation with security warnings")
+
+    class UpgradeExplainer(dspy.Signature):
+        """Explain what an upgrade changed in a smart contract, in simple, non-technical language."""
+        previous = dspy.InputField(desc="Explanation of the contract before the upgrade")
+        changes = dspy.InputField(desc="ABI entries added (+), changed (~) and removed (-), as Solidity-style declarations")
+        explanation = dspy.OutputField(desc="Short explanation of what changed and what it means for users")
+
+    predictors = {
+        "abi": dspy.ChainOfThought(ContractExplainer),
+        "selectors": dspy.ChainOfThought(UnverifiedContractExplainer),
+        "changes": dspy.ChainOfThought(UpgradeExplainer),
+    }
+    _dspy = dspy
+    _bind_lm(predictors, dspy.LM(MODEL, api_key=os.getenv("OPENAI_API_KEY")))
+    _predictors.update(predictors)
+    _load_seconds = time.perf_counter() - started
+
+
+def _bind_lm(predictors: Dict[str, Any], lm: Any) -> None:
+    # Bind the LM to our predictors rather than dspy.configure(), which may
+    # only ever be called from one thread and this may run on the warmup one.
+    # DSPy releases before Module.set_lm only have the global setting.
+    if all(hasattr(p, "set_lm") for p in predictors.values()):
+        for p in predictors.values():
+            p.set_lm(lm)
+    else:
+        _dspy.configure(lm=lm)
+
+
+def call_settings() -> ContextManager[Any]:
+    """
+    DSPy settings for one predictor call: token usage is attached to the
+    prediction, for /metrics. dspy.context, unlike dspy.configure, may be
+    entered from any thread or task.
+    """
+    return _dspy.context(track_usage=True)
+
+
+def set_lm(lm: Any) -> None:
+    """Swap the LM used by the shared predictors (e.g. a stub in benchmarks)."""
+    ensure_loaded()
+    _bind_lm(_predictors, lm)
+
+
+def ensure_loaded() -> bool:
+    """Load the LLM stack once; safe to call from any thread."""
+    global _error, _loading
+    if _predictors:
+        return True
+    if not available():
+        return False
+    with _lock:
+        if _predictors:
+            return True
+        if _error is not None:
+            return False
+        _loading = True
+        try:
+            _load()
+            print("✅ ROMA (DSPy + OpenAI) initialized successfully")
+        except Exception as e:
+            _error = str(e)
+            print(f"⚠️  ROMA not available: {e}, using fallback mode")
+        finally:
+            _loading = False
+    return bool(_predictors)
+
+
+def dspy_module() -> Any:
+    if not ensure_loaded():
+        raise RuntimeError(f"LLM stack unavailable: {_error or 'OPENAI_API_KEY not set'}")
+    return _dspy
+
+
+def predictor(name: str) -> Any:
+    """Shared ChainOfThought predictor: "abi", "selectors" or "changes"."""
+    if not ensure_loaded():
+        raise RuntimeError(f"LLM stack unavailable: {_error or 'OPENAI_API_KEY not set'}")
+    return _predictors[name]
+
+
+def usage(prediction: Any) -> Dict[str, int]:
+    """Tokens a prediction consumed, summed over LMs; {} when not reported."""
+    get = getattr(prediction, "get_lm_usage", None)
+    by_lm = get() if get is not None else None
+    if not by_lm:
+        return {}
+    totals = {"prompt_tokens": 0, "completion_tokens": 0}
+    for entry in by_lm.values():
+        for k in totals:
+            totals[k] += int(entry.get(k) or 0)
+    return totals
+
+
+def warm_in_background() -> Optional[threading.Thread]:
+    """Start loading the LLM stack on a daemon thread if it is configured."""
+    if not available() or _predictors:
+        return None
+    thread = threading.Thread(target=ensure_loaded, name="llm-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "configured": configured(),
+        "warm": is_warm(),
+        "loading": _loading,
+        "loadSeconds": round(_load_seconds, 3) if _load_seconds is not None else None,
+        "error": _error,
+    }
+
+
+if not configured():
+    print("⚠️  OPENAI_API_KEY not found, using fallback mode")
@@ -0,0 +1,310 @@
+"""
+Bounded, coalescing executor for the LLM stage.
+
+DSPy/OpenAI calls are blocking and take seconds. Running them from an async
+route on a small dedicated thread pool keeps them off Starlette's shared
+threadpool, and a semaphore caps how many run at once. Concurrent requests
+with the same key (the content hash of the ABI or selector set) attach to the
+call already in flight instead of starting another one.
+
+Requests do not wait for the LLM past ROMA_LLM_DEADLINE: within() hands the
+caller a DeadlineExceeded so it can answer with the fallback, while the call
+keeps running in the background (still bounded by ROMA_LLM_TIMEOUT) and its
+result is handed to a callback, typically to fill the result cache for the
+next request.
+
+A circuit breaker watches the outcomes of recent calls. While too many of
+them fail or their median latency is above ROMA_BREAKER_LATENCY, it is open
+and callers skip the LLM. After ROMA_BREAKER_COOLDOWN seconds one probe call
+is let through; its outcome closes the breaker or opens it again.
+"""
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+
+class DeadlineExceeded(Exception):
+    """The request's LLM deadline passed; the call goes on in the background."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        latency: float = 8.0,
+        cooldown: float = 30.0,
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency = latency
+        self.cooldown = cooldown
+        # (ok, seconds) of the most recent calls
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self.stats = {"opened": 0, "skipped": 0}
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            window=int(os.getenv("ROMA_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("ROMA_BREAKER_MIN_CALLS", "5")),
+            error_rate=float(os.getenv("ROMA_BREAKER_ERROR_RATE", "0.5")),
+            latency=float(os.getenv("ROMA_BREAKER_LATENCY", "8")),
+            cooldown=float(os.getenv("ROMA_BREAKER_COOLDOWN", "30")),
+        )
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        """Whether to call the LLM now. Half open, one probe per cooldown."""
+        with self._lock:
+            if self._opened_at is not None:
+                now = time.monotonic()
+                probing = self._probe_at is not None and now - self._probe_at < self.cooldown
+                if now - self._opened_at < self.cooldown or probing:
+                    self.stats["skipped"] += 1
+                    return False
+                self._probe_at = now
+            return True
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                if self._probe_at is None:
+                    return  # a call from before the breaker opened
+                self._probe_at = None
+                if ok and seconds <= self.latency:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            self._outcomes.append((ok, seconds))
+            if len(self._outcomes) >= self.min_calls and self._tripped():
+                self._opened_at = time.monotonic()
+                self.stats["opened"] += 1
+                print(f"⚠️  LLM circuit breaker open for {self.cooldown:.0f}s")
+
+    def _tripped(self) -> bool:
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        if failures / len(self._outcomes) > self.error_rate:
+            return True
+        return statistics.median(s for _, s in self._outcomes) > self.latency
+
+    def info(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            **self.stats,
+            "open": int(state != "closed"),
+            "state": state,
+            "window_calls": len(self._outcomes),
+        }
+
+
+class LLMGate:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        timeout: float = 20.0,
+        deadline: Optional[float] = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Calls that outlived their request's deadline; referenced until done.
+        self._background: Set[asyncio.Future] = set()
+        self.stats = {"calls": 0, "coalesced": 0, "timeouts": 0, "errors": 0, "deadline_misses": 0, "late_results": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMGate":
+        deadline = float(os.getenv("ROMA_LLM_DEADLINE", "8"))
+        return cls(
+            concurrency=int(os.getenv("ROMA_LLM_CONCURRENCY", "4")),
+            timeout=float(os.getenv("ROMA_LLM_TIMEOUT", "20")),
+            deadline=deadline if deadline > 0 else None,
+            breaker=CircuitBreaker.from_env(),
+        )
+
+    async def run(self, key: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) in the LLM pool, or join the in-flight call for key.
+        Raises asyncio.TimeoutError if the call exceeds the timeout.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded so one waiter disconnecting does not cancel the shared call.
+        return await asyncio.shield(task)
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        await self._sem.acquire()
+        self.stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        fut = loop.run_in_executor(self._executor, fn, *args)
+        # A timed-out call keeps running in its thread; hold the slot until it
+        # actually returns so hung calls still count against the limit.
+        fut.add_done_callback(lambda _: self._sem.release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.breaker.record(False, self.timeout)
+            raise
+        except Exception:
+            self.breaker.record(False, time.perf_counter() - started)
+            raise
+        self.breaker.record(True, time.perf_counter() - started)
+        return result
+
+    async def within(
+        self,
+        work: Awaitable[Any],
+        on_late: Optional[Callable[[Any], Optional[Awaitable[None]]]] = None,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """
+        Await work for at most deadline seconds (self.deadline if not given;
+        no limit when that is None). Past it raise DeadlineExceeded; work goes
+        on in the background and on_late(result) runs if it succeeds. If
+        on_late returns an awaitable, it runs in the background too.
+        """
+        task = asyncio.ensure_future(work)
+        deadline = self.deadline if deadline is None else deadline
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # the call itself timed out, not the request's deadline
+        self.stats["deadline_misses"] += 1
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(lambda t: self._late(t, on_late))
+        raise DeadlineExceeded(f"LLM still running after {deadline}s")
+
+    def _late(self, task: asyncio.Future, on_late: Optional[Callable[[Any], Optional[Awaitable[None]]]]) -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            print(f"⚠️  Background AI call failed: {exc!r}")
+            return
+        self.stats["late_results"] += 1
+        if on_late is not None:
+            try:
+                pending = on_late(task.result())
+            except Exception as e:
+                print(f"⚠️  Storing late AI result failed: {e!r}")
+                return
+            if pending is not None:
+                store = asyncio.ensure_future(pending)
+                self._background.add(store)
+                store.add_done_callback(self._background.discard)
+                store.add_done_callback(self._stored)
+
+    @staticmethod
+    def _stored(task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️  Storing late AI result failed: {task.exception()!r}")
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_late: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Blocking counterpart of run() and within() for callers outside the
+        event loop (the bulk indexer): fn(*args) runs in the LLM pool and the
+        caller waits at most the deadline (the timeout when there is none).
+        Past it raise DeadlineExceeded; on_late(result) runs in the pool if
+        the call succeeds later. Outcomes feed the circuit breaker.
+        """
+        self.stats["calls"] += 1
+        started = time.perf_counter()
+        fut = self._executor.submit(fn, *args)
+        fut.add_done_callback(lambda f: self._called(f, time.perf_counter() - started))
+        wait = self.timeout if self.deadline is None else min(self.deadline, self.timeout)
+        try:
+            return fut.result(timeout=wait)
+        except FutureTimeoutError:  # the builtin TimeoutError only from 3.11
+            if fut.done():
+                raise  # fn raised it, not the wait
+        self.stats["deadline_misses"] += 1
+        if on_late is not None:
+            fut.add_done_callback(lambda f: self._late_sync(f, on_late))
+        raise DeadlineExceeded(f"LLM still running after {wait}s")
+
+    def _called(self, fut: Future, seconds: float) -> None:
+        if fut.exception() is not None:
+            self.stats["errors"] += 1
+            self.breaker.record(False, seconds)
+        elif seconds > self.timeout:
+            self.stats["timeouts"] += 1
+            self.breaker.record(False, seconds)
+        else:
+            self.breaker.record(True, seconds)
+
+    def _late_sync(self, fut: Future, on_late: Callable[[Any], None]) -> None:
+        if fut.exception() is not None:
+            print(f"⚠️  Background AI call failed: {fut.exception()!r}")
+            return
+        self.stats["late_results"] += 1
+        try:
+            on_late(fut.result())
+        except Exception as e:
+            print(f"⚠️  Storing late AI result failed: {e!r}")
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot while the caller drives the LM itself."""
+        async with self._sem:
+            self.stats["calls"] += 1
+            yield
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None and not isinstance(exc, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "deadline": self.deadline or 0,
+            "inflight": len(self._inflight),
+            "background": len(self._background),
+            **{f"breaker_{k}": v for k, v in self.breaker.info().items()},
+        }
+
+
+llm_gate = LLMGate.from_env()
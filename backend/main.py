@@ -1,8 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from agents import run_roma_for_abi, run_roma_for_selectors
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, List, Dict, Optional
+import os
+import threading
+import time
+from abi_store import abi_store
+from agents import (
+    _proxy_note, astructured, arun_roma_for_abi, arun_roma_for_selectors,
+    arun_roma_versioned,
+)
+from batch import explain_batch
+from cache import explain_cache_key, result_cache
+import encoding
+import ingest
+from evm import analyze_bytecode
+from llm_gate import llm_gate
+import llm
+import metrics
+import profiler
+from selector_db import resolve_payload
+from similarity import similarity_index
+from streaming import encode_events, explain_events
 
 app = FastAPI(title="ROMA Contract Explainer Service")
 
@@ -13,24 +33,189 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(encoding.CompressionMiddleware)
+profiler.install_from_env(app)
+
+NO_CONTENT = "No content to analyze"
 
 class AbiPayload(BaseModel):
-    mode: str = Field("abi", pattern="^(abi|selectors)$")
+    mode: str = Field("abi", pattern="^(abi|selectors|bytecode)$")
     address: str
-    chainId: str
-    abi: Optional[List[dict]] = None
+    # Decimal EIP-155 chain id; at most uint64, like the registry index keys.
+    chainId: str = Field(..., pattern="^[0-9]{1,20}$")
+    abi: Optional[List[dict]] = Field(None, max_length=ingest.MAX_ABI_ENTRIES)
+    # Accepted for compatibility; ingest drops it without decoding it.
     metadata: Optional[dict] = None
     selectors: Optional[List[str]] = None
     candidates: Optional[Dict[str, List[str]]] = None
+    bytecode: Optional[str] = Field(None, pattern="^(0x)?([0-9a-fA-F]{2})*$")
+    # "structured": type, flags and counts as fields instead of a rendered
+    # summary; never calls the LLM.
+    output: str = Field("summary", pattern="^(summary|structured)$")
+
+class BatchPayload(BaseModel):
+    # Items are validated one by one so a bad item only fails its own slot.
+    items: List[dict] = Field(..., max_length=int(os.getenv("ROMA_BATCH_MAX_ITEMS", "1000")))
+
+@app.on_event("startup")
+def warm_llm():
+    # Load DSPy/OpenAI on a background thread so the worker starts serving
+    # fallback requests immediately; ROMA_LLM_WARM=0 defers it to first use.
+    if os.getenv("ROMA_LLM_WARM", "1") != "0":
+        llm.warm_in_background()
+
+@app.on_event("startup")
+def warm_similarity():
+    # Seeding hashes every registry signature; do it before the first
+    # lookup needs it, without delaying startup.
+    threading.Thread(target=similarity_index.ensure_loaded, name="similarity-warm", daemon=True).start()
 
 @app.get("/health")
 def health():
-    return {"ok": True, "service": "ROMA Contract Explainer"}
+    return {"ok": True, "service": "ROMA Contract Explainer", "llm": llm.status()}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {**result_cache.info(), "llm": llm_gate.info(), "similarity": similarity_index.info(),
+            "abiStore": abi_store.info()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    body = metrics.render({
+        "cache": result_cache.info(),
+        "llm_gate": llm_gate.info(),
+        "similarity": similarity_index.info(),
+        "abi_store": abi_store.info(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
-@app.post("/explain")
-def explain(p: AbiPayload):
+def _prepare(p: AbiPayload) -> Dict[str, Any]:
+    """
+    Reduce bytecode to its dispatcher selectors and resolve raw selectors
+    locally. Returns the extra response fields this produced.
+    """
+    extra: Dict[str, Any] = {}
+    if p.mode == "bytecode":
+        with metrics.stage("bytecode", "bytecode"):
+            info = analyze_bytecode(p.bytecode or "")
+        extra["bytecode"] = info.as_dict()
+        p.mode, p.selectors = "selectors", info.selectors
+    resolved = False
+    if p.mode == "selectors":
+        with metrics.stage("selector_db", "selectors"):
+            resolved = resolve_payload(p)
+    if resolved:
+        # Hand the candidates back so the caller can show them without its
+        # own 4byte lookups.
+        extra["candidates"] = p.candidates
+    return extra
+
+def _with_extra(result: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    if not extra:
+        return result
+    result = {**result, **extra}
+    proxy = extra.get("bytecode", {}).get("proxy")
+    if proxy and "summary" in result:
+        summary = result.get("summary")
+        note = _proxy_note(proxy)
+        result["summary"] = note if summary == NO_CONTENT else f"{note}\n\n{summary}"
+    return result
+
+async def _payload(request: Request) -> AbiPayload:
+    started = time.perf_counter()
+    p = ingest.validate(AbiPayload, await ingest.read_json(request))
+    metrics.stage_seconds.observe(time.perf_counter() - started, "ingest", p.mode)
+    return p
+
+@app.post("/explain", openapi_extra=ingest.body_schema(AbiPayload))
+async def explain(request: Request):
+    started = time.perf_counter()
+    p = await _payload(request)
+    mode = p.mode
+    fmt = encoding.negotiate_format(request)
+    etag = encoding.etag_for(p.model_dump(exclude={"metadata"}), f"{p.output}.{fmt}")
+    if encoding.is_not_modified(request, etag):
+        metrics.observe_request("explain", mode, "not_modified", time.perf_counter() - started)
+        return encoding.not_modified(etag)
+    extra = _prepare(p)
+    result = _with_extra(await _explain(p), extra)
+    metrics.observe_request("explain", mode, result.get("source", "none"), time.perf_counter() - started)
+    # A provisional answer is replaced once the LLM result is cached; no ETag
+    # so clients do not revalidate against it.
+    return encoding.render(result, fmt, None if result.get("provisional") else etag)
+
+async def _explain(p: AbiPayload):
+    if p.output == "structured":
+        return await astructured(p.mode, p.abi, p.candidates, p.address, p.chainId)
     if p.mode == "abi" and p.abi:
-        return run_roma_for_abi(p.abi, p.address)
+        if abi_store.tracks(p.address, p.chainId):
+            return await _explain_versioned(p)
+        with metrics.stage("cache_lookup", "abi"):
+            key = explain_cache_key("abi", abi=p.abi, address=p.address, chain_id=p.chainId)
+            cached = await result_cache.aget(key)
+        if cached is not None:
+            return cached
+        result = await arun_roma_for_abi(p.abi, p.address, key, chain_id=p.chainId)
+        if not result.get("provisional"):
+            with metrics.stage("cache_store", "abi"):
+                await result_cache.aset(key, result)
+        return result
     if p.mode == "selectors" and p.candidates:
-        return run_roma_for_selectors(p.candidates)
-    return {"summary": "No content to analyze"}
+        with metrics.stage("cache_lookup", "selectors"):
+            key = explain_cache_key("selectors", candidates=p.candidates)
+            cached = await result_cache.aget(key)
+        if cached is not None:
+            return cached
+        result = await arun_roma_for_selectors(p.candidates, key)
+        if not result.get("provisional"):
+            with metrics.stage("cache_store", "selectors"):
+                await result_cache.aset(key, result)
+        return result
+    return {"summary": NO_CONTENT}
+
+async def _explain_versioned(p: AbiPayload):
+    """ABI mode for a contract tracked in abi_store (agents.arun_roma_versioned)."""
+    with metrics.stage("cache_lookup", "abi"):
+        key = explain_cache_key("abi", abi=p.abi, address=p.address, chain_id=p.chainId)
+        cached = await result_cache.aget(key)
+    return await arun_roma_versioned(p.abi, p.address, p.chainId, key, cached)
+
+@app.post("/explain/stream", openapi_extra=ingest.body_schema(AbiPayload))
+async def explain_stream(request: Request):
+    p = await _payload(request)
+    extra = _prepare(p)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    return StreamingResponse(
+        encode_events(explain_events(p, extra), sse=sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/explain/batch", openapi_extra=ingest.body_schema(BatchPayload))
+async def explain_many(request: Request):
+    started = time.perf_counter()
+    b = ingest.validate(BatchPayload, await ingest.read_json(request, batch=True))
+    payloads = []
+    extras = []
+    modes = []
+    for item in b.items:
+        try:
+            p = AbiPayload.model_validate(item)
+        except ValidationError as e:
+            modes.append("invalid")
+            extras.append({})
+            payloads.append(e)
+            continue
+        modes.append(p.mode)
+        try:
+            extras.append(_prepare(p))
+            payloads.append(p)
+        except Exception as e:
+            # e.g. bytecode that does not decode: this slot fails, not the batch
+            extras.append({})
+            payloads.append(RuntimeError(f"analysis failed: {e}"))
+    results = await explain_batch(payloads)
+    for mode, r in zip(modes, results):
+        metrics.results_total.inc("batch", mode, r.get("source") or ("error" if "error" in r else "none"))
+    metrics.request_seconds.observe(time.perf_counter() - started, "batch", "mixed", "mixed")
+    return {"results": [_with_extra(r, extra) for r, extra in zip(results, extras)]}
@@ -0,0 +1,210 @@
+"""
+In-process metrics for the explain service, exposed in the Prometheus text
+format at GET /metrics.
+
+Kept dependency-free: a few counters and fixed-bucket histograms guarded by
+one lock each. Everything is per worker process; Prometheus sums across
+workers when scraping each one. Stage timings from a process-pool batch
+executor (ROMA_BATCH_EXECUTOR=process) stay in the child processes and are
+not reported.
+
+    roma_request_seconds{route,mode,source}    end-to-end latency
+    roma_results_total{route,mode,source}      explanations returned
+    roma_stage_seconds{stage,mode}             registry, features, similarity,
+                                               render, cache, llm, ...
+    roma_generic_verdicts_total{mode,verdict}  fallback judged generic or not
+    roma_llm_calls_total{mode,outcome}
+    roma_llm_tokens_total{mode,kind}           prompt / completion tokens
+    roma_llm_call_tokens{mode}                 tokens per call
+    roma_llm_cost_usd_total{mode}              estimated from ROMA_LLM_PRICE_*
+    roma_ingest_skipped_bytes_total            metadata dropped undecoded
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# USD per million tokens; defaults are gpt-4o-mini list prices.
+PRICE_INPUT = float(os.getenv("ROMA_LLM_PRICE_INPUT", "0.15"))
+PRICE_OUTPUT = float(os.getenv("ROMA_LLM_PRICE_OUTPUT", "0.60"))
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_label_str(self.labels, k)} {_num(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    def count(self, *labels: str) -> int:
+        row = self._values.get(labels)
+        return sum(row[:-1]) if row else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for labels, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), row):
+                cumulative += n
+                le = f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, labels)} {_num(row[-1])}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, labels)} {cumulative}")
+        return lines
+
+
+request_seconds = Histogram(
+    "roma_request_seconds", "End-to-end explain latency.", ("route", "mode", "source"))
+results_total = Counter(
+    "roma_results_total", "Explanations returned, per item for batches.", ("route", "mode", "source"))
+stage_seconds = Histogram(
+    "roma_stage_seconds", "Time spent in each analysis stage.", ("stage", "mode"))
+generic_verdicts = Counter(
+    "roma_generic_verdicts_total", "Rule-based summaries judged too generic (LLM candidates).", ("mode", "verdict"))
+llm_calls = Counter(
+    "roma_llm_calls_total", "LLM calls by outcome.", ("mode", "outcome"))
+llm_tokens = Counter(
+    "roma_llm_tokens_total", "LLM tokens reported by the provider.", ("mode", "kind"))
+llm_call_tokens = Histogram(
+    "roma_llm_call_tokens", "Prompt plus completion tokens per LLM call.", ("mode",), TOKEN_BUCKETS)
+llm_cost = Counter(
+    "roma_llm_cost_usd_total", "Estimated LLM spend in USD.", ("mode",))
+skipped_bytes = Counter(
+    "roma_ingest_skipped_bytes_total", "Request body bytes dropped without decoding (metadata).")
+
+_METRICS = (
+    request_seconds, results_total, stage_seconds, generic_verdicts,
+    llm_calls, llm_tokens, llm_call_tokens, llm_cost, skipped_bytes,
+)
+
+
+@contextmanager
+def stage(name: str, mode: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, name, mode)
+
+
+class StageTimer:
+    """Times consecutive stages of one function: each mark() closes a stage."""
+
+    __slots__ = ("mode", "_last")
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self._last = time.perf_counter()
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        stage_seconds.observe(now - self._last, name, self.mode)
+        self._last = now
+
+
+def observe_request(route: str, mode: str, source: str, seconds: float) -> None:
+    request_seconds.observe(seconds, route, mode, source)
+    results_total.inc(route, mode, source)
+
+
+def record_generic(mode: str, generic: bool) -> bool:
+    generic_verdicts.inc(mode, "generic" if generic else "specific")
+    return generic
+
+
+def llm_cost_usd(prompt_tokens: int, completion_tokens: int) -> float:
+    return (prompt_tokens * PRICE_INPUT + completion_tokens * PRICE_OUTPUT) / 1e6
+
+
+def record_llm_call(mode: str, seconds: float, outcome: str, usage: Optional[Dict[str, int]] = None) -> None:
+    stage_seconds.observe(seconds, "llm", mode)
+    llm_calls.inc(mode, outcome)
+    if not usage:
+        return
+    prompt = usage.get("prompt_tokens", 0)
+    completion = usage.get("completion_tokens", 0)
+    llm_tokens.inc(mode, "prompt", amount=prompt)
+    llm_tokens.inc(mode, "completion", amount=completion)
+    llm_call_tokens.observe(prompt + completion, mode)
+    llm_cost.inc(mode, amount=llm_cost_usd(prompt, completion))
+
+
+def _render_info(prefix: str, info: Dict[str, Any]) -> List[str]:
+    """Numeric fields of an info() dict as gauges (e.g. result_cache.info())."""
+    lines = []
+    for key, value in info.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"roma_{prefix}_{key}"
+        lines += [f"# TYPE {name} gauge", f"{name} {_num(value)}"]
+    return lines
+
+
+def render(info: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines += metric.render()
+    for prefix, values in (info or {}).items():
+        lines += _render_info(prefix, values)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+With ROMA_PROFILE_SLOW_MS set, a background thread samples the Python stacks
+of the request's thread and of the worker threads (LLM pool, batch pool,
+asyncio/anyio threads) every ROMA_PROFILE_INTERVAL_MS while requests are in
+flight. Requests that end up slower than the threshold get their samples
+written to ROMA_PROFILE_DIR as collapsed stacks, one "frame;frame;... count"
+line per stack, ready for flamegraph.pl or speedscope:
+
+    ROMA_PROFILE_SLOW_MS=500 uvicorn main:app
+    flamegraph.pl profiles/*.folded > slow.svg
+
+Samples are per thread, not per request: with concurrent requests a profile
+also shows work done for the others. Stacks start with the thread name.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+_WORKER_PREFIXES = ("llm", "batch", "asyncio", "AnyIO")
+# Worker threads parked in these modules are idle, not working for anyone.
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame: Any, thread_name: str) -> str:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class _Recording:
+    __slots__ = ("thread_id", "started", "stacks")
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+
+
+class Sampler:
+    """Samples thread stacks into every active recording."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: List[_Recording] = []
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> _Recording:
+        rec = _Recording(threading.get_ident())
+        with self._lock:
+            self._active.append(rec)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return rec
+
+    def stop(self, rec: _Recording) -> float:
+        with self._lock:
+            self._active.remove(rec)
+        return time.perf_counter() - rec.started
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            request_threads = {rec.thread_id for rec in active}
+            samples = []
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == me:
+                    continue
+                if ident not in request_threads:
+                    if not name.startswith(_WORKER_PREFIXES):
+                        continue
+                    if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                        continue
+                samples.append(collapse(frame, name))
+            for rec in active:
+                rec.stacks.update(samples)
+            time.sleep(self.interval)
+
+
+def write_collapsed(stacks: Dict[str, int], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+class SlowRequestProfiler:
+    """ASGI middleware; covers streamed bodies too, unlike @app.middleware."""
+
+    def __init__(self, app: Callable, slow_ms: float, out_dir: str = "profiles", interval_ms: float = 5.0):
+        self.app = app
+        self.slow = slow_ms / 1000
+        self.out_dir = out_dir
+        self.sampler = Sampler(interval_ms / 1000)
+        os.makedirs(out_dir, exist_ok=True)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/explain"):
+            await self.app(scope, receive, send)
+            return
+        rec = self.sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = self.sampler.stop(rec)
+            if elapsed >= self.slow and rec.stacks:
+                slug = scope["path"].strip("/").replace("/", "-")
+                path = os.path.join(self.out_dir, f"{int(time.time() * 1000)}-{slug}-{elapsed * 1000:.0f}ms.folded")
+                write_collapsed(rec.stacks, path)
+                print(f"🐢 {scope['path']} took {elapsed * 1000:.0f} ms, profile written to {path}")
+
+
+def install_from_env(app: Any) -> bool:
+    """Add SlowRequestProfiler to a Starlette/FastAPI app if ROMA_PROFILE_SLOW_MS is set."""
+    slow_ms = os.getenv("ROMA_PROFILE_SLOW_MS")
+    if not slow_ms:
+        return False
+    app.add_middleware(
+        SlowRequestProfiler,
+        slow_ms=float(slow_ms),
+        out_dir=os.getenv("ROMA_PROFILE_DIR", "profiles"),
+        interval_ms=float(os.getenv("ROMA_PROFILE_INTERVAL_MS", "5")),
+    )
+    return True
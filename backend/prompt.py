@@ -0,0 +1,266 @@
+"""
+Compact, token-budgeted rendering of a contract's interface for LLM prompts.
+
+The whole ABI is rendered as Solidity-style declarations, grouped by kind
+(state-changing functions, payable, read-only, events, errors), with
+identical lines collapsed:
+
+    contract interface: 42 ABI entries (30 functions, 9 events, 3 errors)
+    // state-changing
+    function transfer(address to, uint256 amount) returns (bool)
+    function upgradeTo(address newImplementation)
+    // read-only
+    function balanceOf(address account) view returns (uint256)
+    // events
+    event Transfer(address indexed from, address indexed to, uint256 value)
+    // 12 more omitted: 10 functions, 2 events
+
+When everything does not fit in ROMA_PROMPT_TOKENS, entries are kept by how
+much they tell about the contract: privileged and value-moving functions
+first, then other state-changing functions, then reads, events and errors.
+Kept entries stay in ABI order within their group. The selector path uses
+the same renderer on the resolved signatures.
+
+Token counts are a local estimate tuned for BPE tokenizers on code, with
+identifiers split at case changes. No tokenizer download is needed.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from features import unique_signatures
+
+TOKEN_BUDGET = int(os.getenv("ROMA_PROMPT_TOKENS", "1200"))
+
+_PIECES = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|\S")
+
+# Name fragments (lowercase) that say the most about what a contract can do
+# to its users. Plain substring tests; a regex alternation is several times
+# slower on large ABIs.
+_PRIVILEGED = (
+    "owner", "admin", "role", "govern", "upgrade", "implementation", "pause", "freeze",
+    "blacklist", "blocklist", "mint", "burn", "withdraw", "rescue", "sweep", "skim",
+    "emergency", "kill", "destroy", "migrate", "fee", "tax", "limit", "whitelist",
+    "allowlist", "oracle", "price",
+)
+_VALUE = (
+    "transfer", "approve", "permit", "swap", "deposit", "redeem", "borrow", "repay",
+    "liquidat", "stake", "claim", "flash", "bridge", "execute", "multicall", "delegate",
+    "order", "fulfill", "lock", "vest",
+)
+
+# (group, heading) in render order.
+_GROUPS = (
+    ("write", "// state-changing"),
+    ("payable", "// payable"),
+    ("special", "// constructor / fallback"),
+    ("read", "// read-only"),
+    ("event", "// events"),
+    ("error", "// errors"),
+    ("function", "// functions"),
+)
+_BASE_SCORE = {"write": 3.0, "payable": 3.5, "special": 2.0, "read": 1.0, "event": 0.6, "error": 0.2, "function": 2.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: one per identifier piece (split at case changes), number or symbol."""
+    return len(_PIECES.findall(text))
+
+
+def _privileged(name: str) -> bool:
+    return name.startswith("set") or any(k in name for k in _PRIVILEGED)
+
+
+def _type(param: Dict[str, Any]) -> str:
+    kind = param.get("type") or ""
+    if kind.startswith("tuple"):
+        return f"({', '.join(_type(c) for c in param.get('components') or ())}){kind[5:]}"
+    return kind
+
+
+def _params(params: Optional[Iterable[Any]], event: bool = False) -> str:
+    out = []
+    for p in params or ():
+        if not isinstance(p, dict):
+            continue
+        text = _type(p)
+        if event and p.get("indexed"):
+            text += " indexed"
+        if p.get("name"):
+            text += f" {p['name']}"
+        out.append(text)
+    return ", ".join(out)
+
+
+def _group(entry: Dict[str, Any]) -> str:
+    kind = entry.get("type", "function")
+    if kind in ("event", "error"):
+        return kind
+    if kind in ("constructor", "fallback", "receive"):
+        return "special"
+    mutability = entry.get("stateMutability")
+    if mutability in ("view", "pure"):
+        return "read"
+    if mutability == "payable":
+        return "payable"
+    return "write" if mutability == "nonpayable" else "function"
+
+
+def _line(entry: Dict[str, Any], group: str) -> str:
+    kind = entry.get("type", "function")
+    name = entry.get("name") or ""
+    if kind == "event":
+        return f"event {name}({_params(entry.get('inputs'), event=True)})"
+    if kind == "error":
+        return f"error {name}({_params(entry.get('inputs'))})"
+    if kind in ("constructor", "fallback", "receive"):
+        head = f"{kind}({_params(entry.get('inputs'))})"
+    else:
+        head = f"function {name}({_params(entry.get('inputs'))})"
+    mutability = entry.get("stateMutability")
+    if mutability in ("view", "pure", "payable"):
+        head += f" {mutability}"
+    returns = _params(entry.get("outputs"))
+    return f"{head} returns ({returns})" if returns else head
+
+
+def declaration(entry: Dict[str, Any]) -> str:
+    """One ABI entry as the Solidity-style line used in prompts."""
+    return _line(entry, _group(entry))
+
+
+def _score(name: str, group: str) -> float:
+    score = _BASE_SCORE[group]
+    name = name.lower()
+    if group in ("event", "error"):
+        return score + (0.3 if _privileged(name) else 0.0)
+    if _privileged(name):
+        score += 2.0 if group != "read" else 0.5
+    elif any(k in name for k in _VALUE):
+        score += 1.5 if group != "read" else 0.3
+    return score
+
+
+def _plural(n: int, word: str) -> str:
+    return f"{n} {word}" if n == 1 else f"{n} {word}s"
+
+
+def _counts(groups: Iterable[str]) -> str:
+    totals: Dict[str, int] = {}
+    for g in groups:
+        noun = g if g in ("event", "error") else "function"
+        totals[noun] = totals.get(noun, 0) + 1
+    return ", ".join(_plural(totals[n], n) for n in ("function", "event", "error") if n in totals)
+
+
+def render(items: Sequence[Tuple[str, str, str]], header: str, budget: Optional[int] = None) -> str:
+    """
+    items are (group, name, line) in source order. Duplicated lines are
+    dropped, the most informative lines that fit in the budget are kept, and
+    a trailer counts what was left out.
+    """
+    budget = TOKEN_BUDGET if budget is None else budget
+    seen = set()
+    unique: List[Tuple[str, str, str]] = []
+    for item in items:
+        if item[2] not in seen:
+            seen.add(item[2])
+            unique.append(item)
+
+    used = estimate_tokens(header) + 12  # the omission trailer, if any
+    ranked = sorted(range(len(unique)), key=lambda i: -_score(unique[i][1], unique[i][0]))
+    kept = set()
+    headings = set()
+    for i in ranked:
+        if budget - used < 8:
+            break  # not even a bare "function f()" line fits any more
+        group, _, line = unique[i]
+        cost = estimate_tokens(line) + 1
+        if group not in headings:
+            cost += 4
+        if used + cost > budget:
+            continue
+        used += cost
+        kept.add(i)
+        headings.add(group)
+
+    lines = [header]
+    for group, heading in _GROUPS:
+        members = [unique[i][2] for i in sorted(kept) if unique[i][0] == group]
+        if members:
+            lines.append(heading)
+            lines.extend(members)
+    omitted = [unique[i][0] for i in range(len(unique)) if i not in kept]
+    if omitted:
+        lines.append(f"// {len(omitted)} more omitted: {_counts(omitted)}")
+    return "\n".join(lines)
+
+
+def abi_prompt(abi: List[dict], budget: Optional[int] = None) -> str:
+    items = []
+    for entry in abi:
+        if isinstance(entry, dict):
+            group = _group(entry)
+            items.append((group, entry.get("name") or "", _line(entry, group)))
+    header = f"contract interface: {len(abi)} ABI {'entry' if len(abi) == 1 else 'entries'} ({_counts(g for g, _, _ in items)})"
+    return render(items, header, budget)
+
+
+def _split_types(params: str) -> List[str]:
+    """Top-level comma split, keeping tuple types like (uint256,address)[] whole."""
+    out, depth, start = [], 0, 0
+    for i, ch in enumerate(params):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            out.append(params[start:i])
+            start = i + 1
+    if params[start:]:
+        out.append(params[start:])
+    return out
+
+
+def _signature_entry(signature: str) -> Dict[str, Any]:
+    name, _, rest = signature.partition("(")
+    return {"type": "function", "name": name, "inputs": [{"type": t} for t in _split_types(rest[:-1])]}
+
+
+def selector_prompt(candidates: Dict[str, List[str]], budget: Optional[int] = None) -> str:
+    """Same rendering for resolved selectors; mutability is unknown there."""
+    signatures = unique_signatures(candidates, limit=None)
+    unresolved = sum(1 for c in candidates.values() if not c)
+    items = [("function", e["name"], _line(e, "function")) for e in map(_signature_entry, signatures)]
+    header = f"deployed code: {_plural(len(candidates), 'selector')}, {unresolved} unresolved; candidate signatures:"
+    return render(items, header, budget)
+
+
+def changes_prompt(changes: Dict[str, Any], budget: Optional[int] = None) -> str:
+    """
+    An upgrade's ABI diff (abi_store.diff) as declaration lines marked
+    + added, ~ changed and - removed, within the budget.
+    """
+    budget = TOKEN_BUDGET if budget is None else budget
+    counts = changes["counts"]  # the lists stop at MAX_DIFF_LINES
+    header = (
+        f"upgrade: {counts['added']} added, {counts['changed']} changed, "
+        f"{counts['removed']} removed, {changes['unchanged']} unchanged ABI entries"
+    )
+    lines = [header]
+    used = estimate_tokens(header) + 12  # the omission trailer, if any
+    shown = 0
+    for mark, kind in (("+", "added"), ("~", "changed"), ("-", "removed")):
+        for line in changes[kind]:
+            text = f"{mark} {line}"
+            cost = estimate_tokens(text) + 1
+            if used + cost > budget:
+                continue
+            used += cost
+            shown += 1
+            lines.append(text)
+    omitted = sum(counts.values()) - shown
+    if omitted:
+        lines.append(f"// {omitted} more changes omitted")
+    return "\n".join(lines)
@@ -0,0 +1,266 @@
+"""
+Compact, memory-mappable contract label index keyed by (chainId, address).
+
+Millions of labels as a dict of dicts would cost gigabytes per worker. The
+index is a single read-only file that every worker mmaps, so the OS page
+cache holds one copy for all of them.
+
+Layout (little-endian, sections 8-byte aligned):
+
+    header   magic "ROMAREG1", then uint64 fields: count, n_strings,
+             bloom_bits, bloom_k, dir_off, keys_off, values_off, str_off,
+             blob_off, bloom_off
+    dir      65537 uint32: start of each 16-bit address-prefix bucket
+    keys     count x 28 bytes: 20-byte address + uint64 big-endian chainId,
+             sorted; a lookup binary-searches only its prefix bucket
+    values   count x 3 uint32: string ids of name, type, description
+    strings  (n_strings + 1) uint64 offsets into the blob, then the UTF-8
+             blob; every distinct string is stored once
+    bloom    bloom_bits bits; a miss on an unknown address (the common case)
+             is rejected after a couple of bit tests, with no search
+
+Build an index from CSV or JSONL labels:
+
+    python registry_index.py build labels.jsonl registry.idx
+    python registry_index.py lookup registry.idx 1 0xa0b8...eb48
+
+Input records need chainId and address; name, type and description are
+optional. CSV files must have a header row with those column names.
+"""
+
+import argparse
+import csv
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"ROMAREG1"
+_HEADER = struct.Struct("<8s10Q")
+_BUCKET = struct.Struct("<II")
+_VALUE = struct.Struct("<3I")
+KEY_SIZE = 28
+_DIR_SIZE = (1 << 16) + 1
+_FIELDS = ("name", "type", "description")
+_PROBE = struct.Struct("<QQ")
+_MAX_PROBES = 4
+_MIX = 0x9E3779B97F4A7C15
+
+
+@lru_cache(maxsize=64)
+def _chain_suffix(chain_id: int) -> bytes:
+    try:
+        return int(chain_id).to_bytes(8, "big")
+    except OverflowError:
+        raise ValueError(f"chainId out of range: {chain_id!r}") from None
+
+
+def make_key(chain_id: int, address: str) -> bytes:
+    """28-byte sort key for (chainId, address); raises ValueError if malformed."""
+    raw = bytes.fromhex(address[2:] if len(address) == 42 else address)
+    if len(raw) != 20:
+        raise ValueError(f"not a 20-byte address: {address!r}")
+    return raw + _chain_suffix(chain_id)
+
+
+def _bloom_start(key: bytes, nbits: int) -> Tuple[int, int]:
+    # Addresses are hash outputs, and vanity mining only fixes a prefix, so the
+    # trailing 8 bytes are already uniform; fold the chain id in and derive the
+    # probe step from the other half.
+    tail, chain = _PROBE.unpack_from(key, 12)
+    h = tail ^ chain * _MIX
+    return h % nbits, (h >> 29) % nbits | 1
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def build_index(records: Iterable[Dict[str, str]], out_path: str, fp_rate: float = 0.01) -> int:
+    """Compile label records into an index file. Returns the number of keys."""
+    strings: Dict[str, int] = {}
+
+    def intern(s: Optional[str]) -> int:
+        s = s or ""
+        sid = strings.get(s)
+        if sid is None:
+            sid = strings[s] = len(strings)
+        return sid
+
+    entries: Dict[bytes, Tuple[int, int, int]] = {}
+    for rec in records:
+        try:
+            key = make_key(int(rec["chainId"]), rec["address"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        # Later records win, so a curated file can be appended to a bulk dump.
+        entries[key] = tuple(intern(rec.get(f)) for f in _FIELDS)
+
+    keys = sorted(entries)
+    count = len(keys)
+    # k is capped below the textbook optimum: every hit pays all k probes in
+    # Python, and the false-positive rate is kept by growing m a little.
+    k = max(1, min(_MAX_PROBES, round(-math.log2(fp_rate))))
+    nbits = int(-k * max(count, 1) / math.log(1 - fp_rate ** (1 / k)))
+    nbits = max(64, (nbits + 7) & ~7)
+
+    bloom = bytearray(nbits // 8)
+    for key in keys:
+        pos, step = _bloom_start(key, nbits)
+        for _ in range(k):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+            pos = (pos + step) % nbits
+
+    directory = np.zeros(_DIR_SIZE, dtype="<u4")
+    if count:
+        prefixes = np.frombuffer(b"".join(key[:2] for key in keys), dtype=">u2")
+        directory[1:] = np.cumsum(np.bincount(prefixes, minlength=_DIR_SIZE - 1))
+
+    blob = bytearray()
+    offsets = [0]
+    for s in strings:  # dicts keep insertion order, which is the id order
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+
+    dir_off = _align(_HEADER.size)
+    keys_off = _align(dir_off + directory.nbytes)
+    values_off = _align(keys_off + count * KEY_SIZE)
+    str_off = _align(values_off + count * 12)
+    blob_off = _align(str_off + len(offsets) * 8)
+    bloom_off = _align(blob_off + len(blob))
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, count, len(strings), nbits, k, dir_off,
+                             keys_off, values_off, str_off, blob_off, bloom_off))
+        f.seek(dir_off)
+        f.write(directory.tobytes())
+        f.seek(keys_off)
+        f.write(b"".join(keys))
+        f.seek(values_off)
+        f.write(np.array([entries[key] for key in keys], dtype="<u4").reshape(-1, 3).tobytes())
+        f.seek(str_off)
+        f.write(np.array(offsets, dtype="<u8").tobytes())
+        f.seek(blob_off)
+        f.write(blob)
+        f.seek(bloom_off)
+        f.write(bloom)
+    os.replace(tmp, out_path)
+    return count
+
+
+class RegistryIndex:
+    """Read-only view over an index file; safe to share across threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count, self.n_strings, self._nbits, self._k, self._dir_off,
+         self._keys_off, self._values_off, self._str_off, self._blob_off,
+         bloom_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a registry index")
+        self._bloom = memoryview(self._mm)[bloom_off:bloom_off + self._nbits // 8]
+        self._string = lru_cache(maxsize=4096)(self._read_string)
+
+    def _read_string(self, sid: int) -> str:
+        start, end = struct.unpack_from("<QQ", self._mm, self._str_off + sid * 8)
+        return self._mm[self._blob_off + start:self._blob_off + end].decode("utf-8")
+
+    def might_contain(self, key: bytes) -> bool:
+        bloom = self._bloom
+        nbits = self._nbits
+        pos, step = _bloom_start(key, nbits)
+        for _ in range(self._k):
+            if not bloom[pos >> 3] >> (pos & 7) & 1:
+                return False
+            pos = (pos + step) % nbits
+        return True
+
+    def _find(self, key: bytes) -> int:
+        if not self.count or not self.might_contain(key):
+            return -1
+        mm = self._mm
+        base = self._keys_off
+        lo, hi = _BUCKET.unpack_from(mm, self._dir_off + (key[0] << 8 | key[1]) * 4)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            at = base + mid * KEY_SIZE
+            if mm[at:at + KEY_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        at = base + lo * KEY_SIZE
+        if lo < self.count and mm[at:at + KEY_SIZE] == key:
+            return lo
+        return -1
+
+    def contains(self, chain_id: int, address: str) -> bool:
+        try:
+            return self._find(make_key(chain_id, address)) >= 0
+        except ValueError:
+            return False
+
+    def get(self, chain_id: int, address: str) -> Optional[Dict[str, str]]:
+        try:
+            i = self._find(make_key(chain_id, address))
+        except ValueError:
+            return None
+        if i < 0:
+            return None
+        name, kind, description = _VALUE.unpack_from(self._mm, self._values_off + i * 12)
+        string = self._string
+        return {"name": string(name), "type": string(kind), "description": string(description)}
+
+    def close(self) -> None:
+        self._bloom.release()
+        self._mm.close()
+
+
+def read_records(path: str) -> Iterator[Dict[str, str]]:
+    """Stream label records from a .csv or .jsonl file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="compile CSV/JSONL label files into an index")
+    build.add_argument("inputs", nargs="+", help="label files; the last argument is the output")
+    build.add_argument("--fp-rate", type=float, default=0.01, help="Bloom filter false-positive rate")
+    lookup = sub.add_parser("lookup", help="look up one address")
+    lookup.add_argument("index")
+    lookup.add_argument("chain_id", type=int)
+    lookup.add_argument("address")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        if len(args.inputs) < 2:
+            parser.error("build needs at least one input file and an output path")
+        *inputs, out = args.inputs
+        records = (rec for path in inputs for rec in read_records(path))
+        count = build_index(records, out, fp_rate=args.fp_rate)
+        print(f"wrote {count} labels to {out} ({os.path.getsize(out)} bytes)")
+        return 0
+
+    info = RegistryIndex(args.index).get(args.chain_id, args.address)
+    print(json.dumps(info, indent=2) if info else "not found")
+    return 0 if info else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,193 @@
+"""
+Contract-type rules for the ABI and selector paths, declared once and
+compiled two ways:
+
+- per mode, into the (all_of, any_of, (type, explanation)) tuples that
+  features.first_match walks for one contract. This is the /explain path:
+  a few int tests and no NumPy call overhead.
+- into int32 masks that NumPy tests against many contracts at once
+  (classify_flags / classify_matrix). Every rule is checked against every
+  row with a few array operations and the first match in priority order
+  wins. Bulk re-scoring (python main.py classify) goes through this.
+
+A rule applies to the modes it has an explanation for. The mode is a
+pseudo-feature bit after the real ones, so one feature matrix can mix ABI
+and selector contracts.
+"""
+
+from typing import Dict, Iterable, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from features import (
+    APPROVE, BALANCE, BORROW, DEPOSIT, ERC20_SIGNATURE, ERC721_SIGNATURE,
+    FALLBACK, FEATURE_NAMES, FULFILL, LIQUIDITY, MATCH, OWNER, OWNER_OF,
+    PAUSE, RECEIVE, REPAY, STAKE, SWAP, TOKEN_URI, TRANSFER, UPGRADE, Rule,
+)
+
+MODES: Tuple[str, ...] = ("abi", "selectors")
+MODE_BITS: Dict[str, int] = {mode: 1 << (len(FEATURE_NAMES) + i) for i, mode in enumerate(MODES)}
+# Columns of a feature matrix: the feature bits, then one per mode. The
+# NumPy path packs them into int32 bitsets.
+COLUMNS: Tuple[str, ...] = FEATURE_NAMES + tuple(f"mode:{mode}" for mode in MODES)
+
+
+class TypeRule(NamedTuple):
+    all_of: int
+    any_of: int
+    type: str
+    # explanation per mode the rule applies to
+    explanations: Dict[str, str]
+
+
+# Priority order: more specific DeFi/Web3 patterns first. Selector-only
+# rules test bits the ABI path never sets, and the other way round.
+TYPE_RULES: Tuple[TypeRule, ...] = (
+    TypeRule(ERC721_SIGNATURE, 0, "NFT Contract (ERC-721)", {
+        "selectors": "This appears to be an NFT contract - it manages unique digital items like art, collectibles, or game items. Each token has a unique ID.",
+    }),
+    TypeRule(ERC20_SIGNATURE, 0, "Token Contract (ERC-20)", {
+        "selectors": "This looks like a fungible token contract - it creates a digital currency or token where each unit is identical, like dollars or points.",
+    }),
+    TypeRule(0, FULFILL | MATCH, "NFT Marketplace or Trading Protocol", {
+        "abi": "This appears to be a marketplace contract that facilitates trading between buyers and sellers. It matches orders and handles the exchange of NFTs or tokens, similar to how eBay matches buyers with sellers but in a decentralized way.",
+    }),
+    TypeRule(SWAP | LIQUIDITY, 0, "DEX (Decentralized Exchange)", {
+        "abi": "This is a decentralized exchange contract that allows users to swap tokens and provide liquidity. Think of it as an automated currency exchange where users can trade one cryptocurrency for another without a middleman.",
+    }),
+    TypeRule(SWAP, 0, "DEX Router or Trading Contract", {
+        "abi": "This contract facilitates token swaps - trading one cryptocurrency for another. It's like a currency exchange service but fully automated and decentralized.",
+    }),
+    TypeRule(SWAP, 0, "Exchange or DEX Contract", {
+        "selectors": "This appears to be a decentralized exchange contract that allows users to swap between different tokens, like a currency exchange.",
+    }),
+    TypeRule(BORROW | REPAY | DEPOSIT, 0, "Lending/Borrowing Protocol", {
+        "abi": "This is a lending protocol where users can deposit crypto to earn interest or borrow against their deposits. Think of it as a decentralized bank where you can be both the lender and borrower.",
+    }),
+    TypeRule(STAKE, 0, "Staking Contract", {
+        "abi": "This contract allows users to stake (lock up) their tokens to earn rewards over time. It's similar to a savings account where you earn interest for keeping your money deposited.",
+        "selectors": "This looks like a staking contract where users can lock up their tokens to earn rewards, similar to a savings account with interest.",
+    }),
+    TypeRule(TOKEN_URI | OWNER_OF, 0, "NFT Contract (ERC-721)", {
+        "abi": "This is an NFT contract that manages unique digital items - each token is one-of-a-kind. Think of it like a certificate of authenticity for digital collectibles, art, or game items.",
+    }),
+    TypeRule(TRANSFER | APPROVE | BALANCE, 0, "Token Contract (ERC-20)", {
+        "abi": "This is a digital token contract, similar to a digital currency or asset. It allows users to own, send, and receive tokens. Think of it like a bank ledger that tracks who owns what.",
+    }),
+    TypeRule(UPGRADE, 0, "Proxy or Upgradeable Contract", {
+        "abi": "This is a proxy contract that can be upgraded. Think of it as a forwarding address - it points to another contract that contains the actual logic, allowing the developers to fix bugs or add features without changing the address.",
+    }),
+    TypeRule(0, FALLBACK | RECEIVE, "Wallet or Payment Contract", {
+        "abi": "This contract can receive cryptocurrency payments directly. It acts like a smart wallet that can hold and manage funds.",
+    }),
+    TypeRule(OWNER | PAUSE, 0, "Managed Contract", {
+        "abi": "This contract has an administrator who can control certain functions and even pause operations if needed. Think of it like a business with a manager who has special permissions.",
+        "selectors": "This is a contract with administrative controls, allowing an owner to manage operations and pause functionality if needed.",
+    }),
+    TypeRule(OWNER, 0, "Owned Contract", {
+        "abi": "This contract has an owner with special privileges. The owner can perform administrative actions that regular users cannot.",
+    }),
+)
+
+# (type, explanation) when no rule matches.
+DEFAULT_TYPES: Dict[str, Tuple[str, str]] = {
+    "abi": ("Smart Contract", ""),
+    "selectors": ("Custom Contract", "This is a custom smart contract with specialized functionality."),
+}
+
+Modes = Union[str, Sequence[str], np.ndarray]
+
+
+def mode_bits(modes: Modes, rows: int) -> np.ndarray:
+    """Mode bit per row: one mode for all rows, or a mode name per row."""
+    if isinstance(modes, str):
+        return np.full(rows, MODE_BITS[modes], np.int32)
+    modes = np.asarray(modes)
+    bits = np.zeros(len(modes), np.int32)
+    for mode, bit in MODE_BITS.items():
+        bits[modes == mode] = bit
+    if len(modes) != rows or not bits.all():
+        raise ValueError(f"modes must be {rows} of {', '.join(MODES)}")
+    return bits
+
+
+def feature_matrix(flags: Iterable[int], modes: Modes) -> np.ndarray:
+    """Boolean (contracts x COLUMNS) matrix from feature bitsets and modes."""
+    packed = np.fromiter(flags, np.int32)
+    packed |= mode_bits(modes, len(packed))
+    return (packed[:, None] >> np.arange(len(COLUMNS), dtype=np.int32) & 1).astype(bool)
+
+
+class CompiledRules:
+    """A rule table compiled for first_match (one row) and for NumPy (many rows)."""
+
+    def __init__(self, rules: Sequence[TypeRule], defaults: Dict[str, Tuple[str, str]]):
+        self.rules = tuple(rules)
+        self.defaults = defaults
+        self._by_mode: Dict[str, Tuple[Rule, ...]] = {
+            mode: tuple((r.all_of, r.any_of, (r.type, r.explanations[mode]))
+                        for r in self.rules if mode in r.explanations)
+            for mode in MODES
+        }
+        self._masks = tuple(
+            (np.int32(r.all_of), np.int32(r.any_of), np.int32(sum(MODE_BITS[m] for m in r.explanations)))
+            for r in self.rules
+        )
+        self._types = np.array([r.type for r in self.rules], object)
+
+    def for_mode(self, mode: str) -> Tuple[Rule, ...]:
+        """The rules that apply to mode, as first_match tuples valued (type, explanation)."""
+        return self._by_mode[mode]
+
+    def classify_flags(self, flags: Union[Sequence[int], np.ndarray], modes: Modes) -> np.ndarray:
+        """
+        Index into self.rules of the first rule each contract matches, or -1.
+        flags are feature bitsets (as from features.extract_*), modes one
+        mode for all of them or a mode per contract.
+        """
+        return self._first_match(np.asarray(flags, np.int32) | mode_bits(modes, len(flags)))
+
+    def classify_matrix(self, matrix: np.ndarray, modes: Modes = ()) -> np.ndarray:
+        """
+        classify_flags for a boolean (contracts x columns) matrix, columns in
+        COLUMNS order. Without the mode columns, modes gives the modes. Rows
+        are packed back into bitsets first: one AND per rule instead of one
+        per rule and feature.
+        """
+        weights = np.left_shift(1, np.arange(matrix.shape[1], dtype=np.int32))
+        packed = matrix.astype(np.int32) @ weights
+        if matrix.shape[1] < len(COLUMNS):
+            packed |= mode_bits(modes, len(packed))
+        return self._first_match(packed)
+
+    def _first_match(self, packed: np.ndarray) -> np.ndarray:
+        # One pass per rule over all rows, in priority order; rows that
+        # matched drop out. Faster than a (rows x rules) hit matrix, whose
+        # temporaries are as large as the rule count times the input.
+        out = np.full(len(packed), -1, np.int32)
+        pending = np.ones(len(packed), bool)
+        for i, (all_of, any_of, modes) in enumerate(self._masks):
+            hits = packed & all_of == all_of
+            if any_of:
+                hits &= packed & any_of != 0
+            hits &= packed & modes != 0
+            hits &= pending
+            out[hits] = i
+            pending &= ~hits
+        return out
+
+    def contract_types(self, flags: Union[Sequence[int], np.ndarray], modes: Modes) -> np.ndarray:
+        """Contract type name per contract, the mode's default where no rule matches."""
+        index = self.classify_flags(flags, modes)
+        out = self._types[np.maximum(index, 0)]
+        unmatched = index < 0
+        if unmatched.any():
+            if isinstance(modes, str):
+                out[unmatched] = self.defaults[modes][0]
+            else:
+                defaults = np.array([self.defaults[m][0] for m in modes], object)
+                out[unmatched] = defaults[unmatched]
+        return out
+
+
+type_rules = CompiledRules(TYPE_RULES, DEFAULT_TYPES)
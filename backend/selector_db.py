@@ -0,0 +1,259 @@
+"""
+Local 4-byte selector -> text signature database.
+
+Resolving selectors used to take one 4byte.directory request per selector
+from the frontend. The database is built offline from a signature dump and
+memory-mapped read-only, so every worker shares one copy:
+
+    header     magic "ROMASEL1", then uint64 fields: count, sel_off,
+               off_off, blob_off, blob_size
+    selectors  count uint32, sorted ascending, unique
+    offsets    (count + 1) uint64 into the blob
+    blob       UTF-8 signatures; a selector's candidates are the
+               newline-joined slice blob[offsets[i]:offsets[i + 1]]
+
+Bulk lookups are one numpy searchsorted call over the selector array.
+
+Build from any mix of:
+- CSV or whitespace-separated text lines: ``0xa9059cbb,transfer(address,uint256)``
+- JSONL with hex_signature/text_signature (4byte API) or selector/signature
+- a directory of files named by selector whose content is ``;``-separated
+  signatures (the ethereum-lists/4bytes layout)
+
+    python selector_db.py build signatures.csv 4bytes/signatures selectors.db
+    python selector_db.py lookup selectors.db 0xa9059cbb 0x095ea7b3
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"ROMASEL1"
+_HEADER = struct.Struct("<8s5Q")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _parse_selector(text: str) -> Optional[int]:
+    text = text.strip().lower()
+    if text.startswith("0x"):
+        text = text[2:]
+    if len(text) != 8:
+        return None
+    try:
+        return int(text, 16)
+    except ValueError:
+        return None
+
+
+def selectors_to_array(selectors: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse hex selectors into a uint32 array.
+    Returns (values, valid); invalid entries are 0 with valid False.
+    """
+    hexes = [s[2:] if s[:2] in ("0x", "0X") else s for s in selectors]
+    # One fromhex over the joined string, but only when every entry is 8
+    # characters: otherwise "0x1234" + "0x1234567890" would split into two
+    # wrong selectors.
+    if all(len(h) == 8 for h in hexes):
+        try:
+            raw = bytes.fromhex("".join(hexes))
+            if len(raw) == 4 * len(hexes):
+                return np.frombuffer(raw, dtype=">u4").astype(np.uint32), np.ones(len(hexes), dtype=bool)
+        except ValueError:
+            pass
+    parsed = [_parse_selector(s) for s in selectors]
+    valid = np.array([v is not None for v in parsed], dtype=bool)
+    return np.array([v or 0 for v in parsed], dtype=np.uint32), valid
+
+
+def read_signatures(path: str) -> Iterator[Tuple[int, str]]:
+    """Stream (selector, signature) pairs from a dump file or directory."""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            selector = _parse_selector(name)
+            if selector is None:
+                continue
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                for sig in f.read().split(";"):
+                    if sig.strip():
+                        yield selector, sig.strip()
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                rec = json.loads(line)
+                hex_sig = rec.get("hex_signature") or rec.get("selector") or ""
+                text_sig = rec.get("text_signature") or rec.get("signature") or ""
+            else:
+                parts = line.replace(",", " ", 1).split(None, 1)
+                if len(parts) != 2:
+                    continue
+                hex_sig, text_sig = parts
+            selector = _parse_selector(hex_sig)
+            if selector is not None and text_sig:
+                yield selector, text_sig.strip()
+
+
+def build_db(pairs: Iterable[Tuple[int, str]], out_path: str, max_per_selector: int = 8) -> int:
+    """Compile (selector, signature) pairs into a database. Returns the selector count."""
+    table: Dict[int, List[str]] = {}
+    for selector, sig in pairs:
+        if "\n" in sig:
+            continue
+        sigs = table.setdefault(selector, [])
+        if sig not in sigs and len(sigs) < max_per_selector:
+            sigs.append(sig)
+
+    selectors = np.array(sorted(table), dtype="<u4")
+    blob = bytearray()
+    offsets = np.zeros(len(selectors) + 1, dtype="<u8")
+    for i, selector in enumerate(selectors.tolist()):
+        blob += "\n".join(table[selector]).encode("utf-8")
+        offsets[i + 1] = len(blob)
+
+    sel_off = _align(_HEADER.size)
+    off_off = _align(sel_off + selectors.nbytes)
+    blob_off = _align(off_off + offsets.nbytes)
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(selectors), sel_off, off_off, blob_off, len(blob)))
+        f.seek(sel_off)
+        f.write(selectors.tobytes())
+        f.seek(off_off)
+        f.write(offsets.tobytes())
+        f.seek(blob_off)
+        f.write(blob)
+    os.replace(tmp, out_path)
+    return len(selectors)
+
+
+class SelectorDB:
+    """Read-only, memory-mapped selector database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, sel_off, off_off, self._blob_off, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a selector database")
+        self._selectors = np.frombuffer(self._mm, dtype="<u4", count=self.count, offset=sel_off)
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=self.count + 1, offset=off_off)
+
+    def lookup_many(self, selectors: Sequence[str], limit: int = 3) -> Dict[str, List[str]]:
+        """
+        Resolve hex selectors in one vectorized search.
+        Returns {selector: [signatures]} with an empty list for unknown ones.
+        """
+        values, valid = selectors_to_array(selectors)
+        out: Dict[str, List[str]] = {s: [] for s in selectors}
+        if not self.count or not len(values):
+            return out
+        idx = np.searchsorted(self._selectors, values)
+        np.minimum(idx, self.count - 1, out=idx)
+        hit = valid & (self._selectors[idx] == values)
+        starts = self._offsets[idx]
+        ends = self._offsets[idx + 1]
+        base = self._blob_off
+        mm = self._mm
+        for i in np.flatnonzero(hit).tolist():
+            sigs = mm[base + int(starts[i]):base + int(ends[i])].decode("utf-8").split("\n")
+            out[selectors[i]] = sigs[:limit]
+        return out
+
+    def lookup(self, selector: str, limit: int = 3) -> List[str]:
+        return self.lookup_many([selector], limit)[selector]
+
+    def close(self) -> None:
+        self._selectors = self._offsets = None
+        self._mm.close()
+
+
+def fill_candidates(
+    selectors: Optional[List[str]],
+    candidates: Optional[Dict[str, List[str]]],
+    db: Optional[SelectorDB],
+) -> Dict[str, List[str]]:
+    """
+    Candidates from the client win; selectors it did not resolve (missing or
+    empty) are looked up locally. Order follows the selector list.
+    """
+    candidates = dict(candidates or {})
+    if db is None or not selectors:
+        return candidates
+    missing = [s for s in selectors if not candidates.get(s)]
+    if missing:
+        candidates.update(db.lookup_many(missing))
+    ordered = {s: candidates[s] for s in selectors if s in candidates}
+    ordered.update((s, c) for s, c in candidates.items() if s not in ordered)
+    return ordered
+
+
+def load_from_env() -> Optional[SelectorDB]:
+    path = os.getenv("ROMA_SELECTOR_DB")
+    if not path:
+        return None
+    try:
+        db = SelectorDB(path)
+        print(f"✅ Selector database loaded: {db.count} selectors")
+        return db
+    except Exception as e:
+        print(f"⚠️  Selector database not loaded: {e}")
+        return None
+
+
+selector_db = load_from_env()
+
+
+def resolve_payload(p: Any) -> bool:
+    """
+    Fill p.candidates for a selectors-mode payload whose raw selectors the
+    client did not resolve. Returns True when the local database was used.
+    """
+    if p.mode != "selectors" or not p.selectors or selector_db is None:
+        return False
+    if p.candidates and all(p.candidates.get(s) for s in p.selectors):
+        return False
+    p.candidates = fill_candidates(p.selectors, p.candidates, selector_db)
+    return True
+
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="compile signature dumps into a database")
+    build.add_argument("inputs", nargs="+", help="dump files/directories; the last argument is the output")
+    build.add_argument("--max-per-selector", type=int, default=8)
+    lookup = sub.add_parser("lookup", help="resolve selectors")
+    lookup.add_argument("db")
+    lookup.add_argument("selectors", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        if len(args.inputs) < 2:
+            parser.error("build needs at least one input and an output path")
+        *inputs, out = args.inputs
+        pairs = (pair for path in inputs for pair in read_signatures(path))
+        count = build_db(pairs, out, max_per_selector=args.max_per_selector)
+        print(f"wrote {count} selectors to {out} ({os.path.getsize(out)} bytes)")
+        return 0
+
+    print(json.dumps(SelectorDB(args.db).lookup_many(args.selectors), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
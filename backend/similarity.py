@@ -0,0 +1,201 @@
+"""
+Nearest-neighbor lookup over the selector sets of contracts we can already
+explain, so forks and near-clones are classified without an LLM call.
+
+A contract is reduced to the set of its 4-byte function selectors (computed
+from the ABI, or taken as-is in selectors/bytecode mode). Each set gets a
+MinHash signature; LSH banding turns that into a handful of dict lookups, and
+the few candidates that share a band are re-ranked by exact Jaccard
+similarity. Inserts are incremental.
+
+The index is seeded from KNOWN_CONTRACT_SIGNATURES in the registry.
+Contracts the LLM explains are added as they are produced, labelled with
+their address and the contract type the explanation states (never the
+explanation itself), and, with ROMA_SIMILARITY_PATH set, appended to a JSONL file that is loaded again on start. Seeding hashes
+every registry signature and the file can be large, so both happen on first
+use (or on the warm-up thread the service starts), not at import.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from contract_registry import KNOWN_CONTRACT_SIGNATURES, KNOWN_CONTRACTS
+from evm import abi_selectors, signature_selector
+
+# 16 bands of 4 rows: sets with Jaccard >= ~0.5 usually share a band.
+NUM_PERM = 64
+BANDS = 16
+# Smaller sets match too easily (every ERC-20 shares transfer/approve).
+MIN_SELECTORS = 4
+
+Tokens = FrozenSet[int]
+
+# Fixed seed: signatures must agree across workers and restarts.
+_rng = np.random.default_rng(0x524F4D41)
+_A = _rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+
+
+class Match(NamedTuple):
+    score: float
+    label: Dict[str, Any]
+
+
+def minhash(tokens: Iterable[int]) -> np.ndarray:
+    """MinHash signature using multiply-shift hashes of 32-bit selectors."""
+    x = np.fromiter(tokens, dtype=np.uint64)
+    hashed = (np.multiply.outer(_A, x) + _B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def abi_tokens(abi: List[dict]) -> Tokens:
+    return frozenset(abi_selectors(abi))
+
+
+def selector_tokens(selectors: Iterable[str]) -> Tokens:
+    out = set()
+    for s in selectors:
+        try:
+            out.add(int(s, 16))
+        except (TypeError, ValueError):
+            continue
+    return frozenset(out)
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of labelled selector sets; thread-safe."""
+
+    def __init__(self, min_score: float = 0.75, path: Optional[str] = None):
+        self.min_score = min_score
+        self.path = path
+        self._lock = threading.Lock()
+        self._sets: List[Tokens] = []
+        self._labels: List[Dict[str, Any]] = []
+        self._seen: Dict[Tokens, int] = {}
+        self._bands: List[Dict[bytes, List[int]]] = [{} for _ in range(BANDS)]
+        self.stats = {"queries": 0, "matches": 0, "inserts": 0}
+        # from_env indexes are filled by ensure_loaded(); plain ones start empty.
+        self._loaded = True
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SimilarityIndex":
+        index = cls(
+            min_score=float(os.getenv("ROMA_SIMILARITY_MIN", "0.75")),
+            path=os.getenv("ROMA_SIMILARITY_PATH") or None,
+        )
+        index._loaded = False
+        return index
+
+    def ensure_loaded(self) -> None:
+        """Seed from the registry and load ROMA_SIMILARITY_PATH, once; safe from any thread."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self.seed_registry()
+            if self.path and os.path.exists(self.path):
+                self.load(self.path)
+            self._loaded = True
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> List[bytes]:
+        return [row.tobytes() for row in signature.reshape(BANDS, -1)]
+
+    def add(self, tokens: Tokens, label: Dict[str, Any]) -> bool:
+        """Insert a labelled set. Returns False if too small or already present."""
+        self.ensure_loaded()
+        return self._add(tokens, label)
+
+    def _add(self, tokens: Tokens, label: Dict[str, Any]) -> bool:
+        if len(tokens) < MIN_SELECTORS or tokens in self._seen:
+            return False
+        keys = self._band_keys(minhash(tokens))
+        with self._lock:
+            if tokens in self._seen:
+                return False
+            i = len(self._sets)
+            self._sets.append(tokens)
+            self._labels.append(label)
+            self._seen[tokens] = i
+            for band, key in zip(self._bands, keys):
+                band.setdefault(key, []).append(i)
+            self.stats["inserts"] += 1
+        return True
+
+    def query(self, tokens: Tokens, k: int = 3) -> List[Match]:
+        """Up to k nearest labelled sets, best first, scored by exact Jaccard."""
+        if len(tokens) < MIN_SELECTORS:
+            return []
+        self.ensure_loaded()
+        with self._lock:
+            self.stats["queries"] += 1
+        exact = self._seen.get(tokens)
+        if exact is not None:
+            return [Match(1.0, self._labels[exact])]
+        candidates = set()
+        for band, key in zip(self._bands, self._band_keys(minhash(tokens))):
+            candidates.update(band.get(key, ()))
+        scored = []
+        for i in candidates:
+            other = self._sets[i]
+            scored.append(Match(len(tokens & other) / len(tokens | other), self._labels[i]))
+        scored.sort(key=lambda m: m.score, reverse=True)
+        return scored[:k]
+
+    def nearest(self, tokens: Tokens) -> Optional[Match]:
+        """Best match at or above min_score, if any."""
+        matches = self.query(tokens, k=1)
+        if matches and matches[0].score >= self.min_score:
+            with self._lock:
+                self.stats["matches"] += 1
+            return matches[0]
+        return None
+
+    def remember(self, tokens: Tokens, label: Dict[str, Any]) -> None:
+        """Insert a newly explained contract and persist it when a path is set."""
+        if not self.add(tokens, label) or not self.path:
+            return
+        line = json.dumps({"selectors": [f"0x{t:08x}" for t in sorted(tokens)], **label})
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def seed_registry(self) -> int:
+        count = 0
+        for address, signatures in KNOWN_CONTRACT_SIGNATURES.items():
+            info = KNOWN_CONTRACTS[address]
+            tokens = frozenset(signature_selector(s) for s in signatures)
+            count += self._add(tokens, {**info, "address": address, "origin": "registry"})
+        return count
+
+    def load(self, path: str) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                tokens = selector_tokens(rec.pop("selectors", ()))
+                if rec.get("origin") == "roma":
+                    # Files from before labels were trimmed carry the whole
+                    # LLM explanation; it is not reused for other contracts.
+                    rec.pop("description", None)
+                count += self._add(tokens, rec)
+        return count
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return len(self._sets)
+
+    def info(self) -> Dict[str, Any]:
+        # Reports without loading, so /metrics never triggers the seeding.
+        return {**self.stats, "entries": len(self._sets), "min_score": self.min_score, "loaded": self._loaded}
+
+
+similarity_index = SimilarityIndex.from_env()
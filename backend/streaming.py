@@ -0,0 +1,186 @@
+"""
+Streaming variant of /explain.
+
+Events are newline-delimited JSON, or Server-Sent Events when the client sends
+``Accept: text/event-stream``:
+
+    {"event": "summary", "summary": ..., "contractType": ..., "source": "fallback"}
+    {"event": "delta", "text": ...}     # zero or more, only when the LLM runs
+    {"event": "done", "source": "roma", "firstEventMs": ..., "elapsedMs": ...}
+
+The summary event is written as soon as the rule-based analysis finishes, so
+time-to-first-byte never depends on the LLM. If the LLM fails or times out
+after some deltas were sent, "done" carries source "fallback", an "error" and
+"provisional": true, and clients should keep the fallback summary. While
+llm_gate's circuit breaker is open the LLM is skipped and "done" carries
+"provisional": true as well. Provisional fallbacks are not cached.
+
+ABIs of contracts tracked by abi_store (an address and chainId outside the
+registry) are explained by agents.arun_roma_versioned instead of streamed:
+the LLM answer comes as one delta and "done" carries "changes" after an
+upgrade, as /explain does.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import llm
+import metrics
+from abi_store import abi_store
+from agents import (
+    _is_generic_abi_summary, _proxy_note, _is_generic_selector_summary,
+    _remember, _selector_report, _with_similar, aabi_report, arun_roma_versioned, astream_llm_abi,
+    astream_llm_selectors,
+)
+from cache import explain_cache_key, result_cache
+from llm_gate import llm_gate
+from similarity import abi_tokens, selector_tokens
+
+
+_END = object()
+
+
+async def _pump(chunks: AsyncIterator[str], queue: asyncio.Queue) -> None:
+    """
+    Drive the LM stream from a single task. DSPy's streamify holds anyio
+    cancel scopes across chunks, so each chunk cannot be awaited from a new
+    task (as wait_for would); the deadline is applied to the queue instead.
+    """
+    try:
+        async for chunk in chunks:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+    await queue.put(_END)
+
+
+async def explain_events(p: Any, extra: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    extra holds fields produced while preparing the payload (bytecode
+    analysis, locally resolved candidates); they ride on the summary event.
+    """
+    started = time.perf_counter()
+    extra = extra or {}
+    proxy = extra.get("bytecode", {}).get("proxy")
+    mode = "bytecode" if "bytecode" in extra else p.mode
+
+    def ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    def done(fields: Dict[str, Any]) -> Dict[str, Any]:
+        metrics.observe_request("stream", mode, fields["source"] or "none", time.perf_counter() - started)
+        return {"event": "done", **fields}
+
+    if p.mode == "abi" and p.abi:
+        with metrics.stage("cache_lookup", "abi"):
+            key = explain_cache_key("abi", abi=p.abi, address=p.address, chain_id=p.chainId)
+            cached = await result_cache.aget(key)
+        report = await aabi_report(p.abi, p.address, p.chainId)
+        generic = _is_generic_abi_summary(report["summary"])
+        stream = lambda: astream_llm_abi(p.abi)  # noqa: E731
+        tokens = lambda: abi_tokens(p.abi)  # noqa: E731
+    elif p.mode == "selectors" and p.candidates:
+        with metrics.stage("cache_lookup", "selectors"):
+            key = explain_cache_key("selectors", candidates=p.candidates)
+            cached = await result_cache.aget(key)
+        report = _selector_report(p.candidates)
+        generic = _is_generic_selector_summary(report["summary"])
+        stream = lambda: astream_llm_selectors(p.candidates)  # noqa: E731
+        tokens = lambda: selector_tokens(p.candidates)  # noqa: E731
+    else:
+        summary = _proxy_note(proxy) if proxy else "No content to analyze"
+        yield {"event": "summary", "summary": summary, "contractType": None, "source": "fallback", **extra}
+        yield done({"source": "fallback", "firstEventMs": ms(), "elapsedMs": ms()})
+        return
+
+    # The proxy note only decorates what is sent; cached results stay plain.
+    lead = f"{_proxy_note(proxy)}\n\n" if proxy else ""
+
+    if p.mode == "abi" and abi_store.tracks(p.address, p.chainId):
+        # Versioned contracts go through the same flow as /explain, so the
+        # stream records versions and never shows another contract's
+        # upgrade text. The LLM answer, if any, arrives as a single delta.
+        fallback_result = _with_similar(report)
+        yield {"event": "summary", "contractType": report["contractType"], **fallback_result, **extra,
+               "source": "fallback", "summary": lead + fallback_result["summary"]}
+        first = ms()
+        result = await arun_roma_versioned(p.abi, p.address, p.chainId, key, cached, fallback_result)
+        if result["source"] == "roma":
+            yield {"event": "delta", "text": result["summary"]}
+        fields = {k: result[k] for k in ("provisional", "error", "changes") if k in result}
+        yield done({"source": result["source"], "cached": cached is not None and result is cached, **fields,
+                    "firstEventMs": first, "elapsedMs": ms()})
+        return
+
+    if cached is not None:
+        yield {"event": "summary", "contractType": report["contractType"], **cached, **extra,
+               "summary": lead + cached["summary"]}
+        first = ms()
+        yield done({"source": cached.get("source"), "cached": True, "firstEventMs": first, "elapsedMs": ms()})
+        return
+
+    fallback_result = {**_with_similar(report), "source": "fallback"}
+    yield {"event": "summary", "contractType": report["contractType"], **fallback_result, **extra,
+           "summary": lead + fallback_result["summary"]}
+    first = ms()
+
+    if not (generic and llm.available()):
+        await result_cache.aset(key, fallback_result)
+        yield done({"source": "fallback", "firstEventMs": first, "elapsedMs": ms()})
+        return
+    if not llm_gate.breaker.allow():
+        # Not cached: the LLM gets another chance once the breaker closes.
+        yield done({"source": "fallback", "provisional": True, "firstEventMs": first, "elapsedMs": ms()})
+        return
+
+    parts = []
+    error = None
+    llm_started = None
+    try:
+        async with llm_gate.slot():
+            llm_started = ms()
+            deadline = asyncio.get_running_loop().time() + llm_gate.timeout
+            queue: asyncio.Queue = asyncio.Queue()
+            pump = asyncio.create_task(_pump(stream(), queue))
+            try:
+                while True:
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    chunk = await asyncio.wait_for(queue.get(), max(remaining, 0))
+                    if chunk is _END:
+                        break
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    if chunk:
+                        parts.append(chunk)
+                        yield {"event": "delta", "text": chunk}
+            finally:
+                pump.cancel()
+    except asyncio.TimeoutError:
+        error = "LLM timed out"
+    except Exception as e:
+        error = f"LLM failed: {e}"
+    if llm_started is not None:
+        llm_gate.breaker.record(error is None and bool(parts), (ms() - llm_started) / 1000)
+
+    if error is None and parts:
+        result = {"summary": "".join(parts), "source": "roma"}
+        await result_cache.aset(key, result)
+        # ABI selectors are keccak hashes; keep that off the event loop.
+        address = p.address if p.mode == "abi" else None
+        await asyncio.to_thread(lambda: _remember(tokens(), result["summary"], address))
+        yield done({"source": "roma", "firstEventMs": first, "llmMs": round(ms() - llm_started, 2), "elapsedMs": ms()})
+    else:
+        print(f"⚠️  AI stream failed: {error or 'empty response'}, using fallback anyway")
+        yield done({"source": "fallback", "provisional": True, "error": error or "empty response",
+                    "firstEventMs": first, "elapsedMs": ms()})
+
+
+async def encode_events(events: AsyncIterator[Dict[str, Any]], sse: bool = False) -> AsyncIterator[bytes]:
+    async for event in events:
+        data = json.dumps(event, ensure_ascii=False)
+        if sse:
+            yield f"event: {event['event']}\ndata: {data}\n\n".encode()
+        else:
+            yield (data + "\n").encode()
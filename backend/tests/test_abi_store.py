@@ -0,0 +1,96 @@
+import json
+import uuid
+
+import agents
+import llm
+from abi_store import MAX_DIFF_LINES, AbiStore, abi_hash, diff, is_empty, is_small
+from cache import CACHE_VERSION
+
+
+def fn(name, mutability="view", outputs=()):
+    return {"type": "function", "name": name, "inputs": [], "outputs": [{"type": t} for t in outputs],
+            "stateMutability": mutability}
+
+
+def test_diff_counts_added_removed_and_changed():
+    old = [fn("a"), fn("b"), fn("c")]
+    new = [fn("a"), fn("b", "nonpayable"), fn("d")]
+    changes = diff(json.dumps(old).encode(), new)
+    assert changes["counts"] == {"added": 1, "removed": 1, "changed": 1}
+    assert changes["unchanged"] == 1 and not changes["truncated"]
+    assert [line for line in changes["added"] if "d()" in line]
+    assert not is_empty(changes) and not is_small(changes)
+    assert is_small(diff(old, old + [fn("e")]))
+
+
+def test_diff_lists_are_capped_but_counts_are_exact():
+    new = [fn(f"f{i}") for i in range(MAX_DIFF_LINES + 5)]
+    changes = diff([], new)
+    assert len(changes["added"]) == MAX_DIFF_LINES
+    assert changes["counts"]["added"] == MAX_DIFF_LINES + 5 and changes["truncated"]
+
+
+def test_reordered_abi_is_the_same_version():
+    store = AbiStore()
+    abi = [fn("a"), fn("b")]
+    first = store.record("1", "0xAbC", abi_hash(abi), abi, {"summary": "s", "source": "roma"})
+    reordered = abi[::-1]
+    assert abi_hash(reordered) != first.abi_hash
+    again = store.record("1", "0xabc", abi_hash(reordered), reordered, None, first)
+    assert again.version == 1 and again.diff is None
+    assert again.result == first.result and again.abi_hash == abi_hash(reordered)
+
+
+def test_abi_hash_does_not_depend_on_the_cache_version(monkeypatch):
+    import cache
+
+    abi = [fn("a")]
+    before = abi_hash(abi)
+    monkeypatch.setattr(cache, "CACHE_VERSION", CACHE_VERSION + "-next")
+    assert abi_hash(abi) == before
+
+
+def test_upgrade_text_stays_with_its_contract(client, monkeypatch):
+    def explain(name, **inputs):
+        if name == "changes":
+            return "Adds pause()."
+        return "**Contract Type**: Vault\n\nA vault."
+
+    monkeypatch.setattr(llm, "available", lambda: True)
+    monkeypatch.setattr(agents, "_is_generic_abi_summary", lambda summary: True)
+    monkeypatch.setattr(agents, "_llm_explain", explain)
+    tag = uuid.uuid4().hex
+    v1 = [fn(f"{name}{tag}") for name in ("a", "b", "c", "d")]
+    v2 = v1 + [fn(f"pause{tag}", "nonpayable")]
+    upgraded, other = "0x" + uuid.uuid4().hex[:40], "0x" + uuid.uuid4().hex[:40]
+
+    def explain_abi(address, abi):
+        r = client("POST", "/explain", json={"mode": "abi", "address": address, "chainId": "1", "abi": abi})
+        assert r.status_code == 200
+        return r.json()
+
+    assert explain_abi(upgraded, v1)["source"] == "roma"
+    merged = explain_abi(upgraded, v2)
+    assert agents.UPGRADE_HEADING in merged["summary"] and merged["changes"]["version"] == 2
+    assert merged["changes"]["counts"]["added"] == 1
+
+    fresh = explain_abi(other, v2)
+    assert agents.UPGRADE_HEADING not in fresh["summary"] and "changes" not in fresh
+    # The upgraded contract keeps its own text.
+    assert explain_abi(upgraded, v2)["summary"] == merged["summary"]
+
+
+def test_tracked_stream_records_versions(client, monkeypatch):
+    monkeypatch.setattr(llm, "available", lambda: False)
+    tag = uuid.uuid4().hex
+    v1 = [fn(f"{name}{tag}") for name in ("a", "b", "c")]
+    address = "0x" + uuid.uuid4().hex[:40]
+
+    def stream(abi):
+        r = client("POST", "/explain/stream", json={"mode": "abi", "address": address, "chainId": "1", "abi": abi})
+        assert r.status_code == 200
+        return [json.loads(line) for line in r.text.splitlines() if line]
+
+    assert "changes" not in stream(v1)[-1]
+    done = stream(v1 + [fn(f"e{tag}")])[-1]
+    assert done["event"] == "done" and done["changes"]["version"] == 2
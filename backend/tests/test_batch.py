@@ -0,0 +1,54 @@
+import uuid
+
+import main
+
+TOKEN_ABI = [
+    {"type": "function", "name": "transfer", "stateMutability": "nonpayable",
+     "inputs": [{"name": "to", "type": "address"}, {"name": "amount", "type": "uint256"}],
+     "outputs": [{"name": "", "type": "bool"}]},
+    {"type": "function", "name": "approve", "stateMutability": "nonpayable",
+     "inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}],
+     "outputs": [{"name": "", "type": "bool"}]},
+    {"type": "function", "name": "balanceOf", "stateMutability": "view",
+     "inputs": [{"name": "owner", "type": "address"}], "outputs": [{"name": "", "type": "uint256"}]},
+]
+
+
+def _address() -> str:
+    return "0x" + uuid.uuid4().hex + "00000000"
+
+
+def test_failing_item_only_fails_its_slot(client, monkeypatch):
+    def broken(code):
+        raise ValueError("cannot decode bytecode")
+
+    monkeypatch.setattr(main, "analyze_bytecode", broken)
+    r = client("POST", "/explain/batch", json={"items": [
+        {"mode": "bytecode", "address": _address(), "chainId": "1", "bytecode": "0x6080"},
+        {"mode": "abi", "address": _address(), "chainId": "1", "abi": TOKEN_ABI},
+        {"mode": "nope", "address": _address(), "chainId": "1"},
+    ]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert "cannot decode bytecode" in results[0]["error"]
+    assert "Token Contract" in results[1]["summary"]
+    assert "error" in results[2]
+
+
+def test_items_match_explain(client):
+    address = _address()
+    item = {"mode": "abi", "address": address, "chainId": "1", "abi": TOKEN_ABI, "output": "structured"}
+    batch = client("POST", "/explain/batch", json={"items": [item]}).json()["results"][0]
+    assert batch == client("POST", "/explain", json=item).json()
+    assert "summary" not in batch
+
+
+def test_items_are_versioned(client):
+    address = _address()
+    first = {"mode": "abi", "address": address, "chainId": "1", "abi": TOKEN_ABI}
+    upgraded = {**first, "abi": TOKEN_ABI + [{"type": "function", "name": "pause", "stateMutability": "nonpayable",
+                                              "inputs": [], "outputs": []}]}
+    results = client("POST", "/explain/batch", json={"items": [first, upgraded]}).json()["results"]
+    assert "changes" not in results[0]
+    assert results[1]["changes"]["version"] == 2
+    assert results[1]["changes"]["counts"]["added"] == 1
@@ -0,0 +1,47 @@
+import json
+import uuid
+
+import agents
+import bulk_index
+import llm
+from cache import explain_cache_key, result_cache
+
+ABI = [{"type": "function", "name": "doThing", "inputs": [], "outputs": [], "stateMutability": "view"}]
+
+
+def test_fallback_after_llm_failure_is_not_cached(monkeypatch):
+    def broken(abi):
+        raise RuntimeError("upstream 503")
+
+    monkeypatch.setattr(llm, "available", lambda: True)
+    monkeypatch.setattr(agents, "_is_generic_abi_summary", lambda summary: True)
+    monkeypatch.setattr(agents, "_llm_explain_abi", broken)
+    address = "0x" + uuid.uuid4().hex
+    out, used_llm = bulk_index._explain_record({"chainId": "1", "address": address, "abi": ABI})
+    assert out["source"] == "fallback" and out["provisional"] and not used_llm
+    assert result_cache.get(explain_cache_key("abi", abi=ABI, address=address, chain_id="1")) is None
+
+    monkeypatch.setattr(agents, "_llm_explain_abi", lambda abi: "Explained.")
+    out, used_llm = bulk_index._explain_record({"chainId": "1", "address": address, "abi": ABI})
+    assert out == {"chainId": "1", "address": address, "mode": "abi", "summary": "Explained.", "source": "roma"}
+    assert used_llm
+
+
+def test_retry_provisional_rewrites_only_those_lines(tmp_path):
+    records = [{"chainId": "1", "address": f"0x{i:040x}", "abi": ABI} for i in range(3)]
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text("".join(json.dumps(r) + "\n" for r in records))
+    bulk_index.run(str(source), str(output), workers=1, chunk_size=2, use_llm=False)
+
+    # As if the LLM had failed for the second record.
+    lines = output.read_bytes().splitlines(keepends=True)
+    lines[1] = bulk_index._dumps_line({**json.loads(lines[1]), "provisional": True})
+    output.write_bytes(b"".join(lines))
+
+    counts = bulk_index.retry_provisional(str(source), str(output), workers=1, chunk_size=2, use_llm=False)
+    assert counts == {"records": 3, "retried": 1, "provisional": 0}
+    rewritten = output.read_bytes().splitlines(keepends=True)
+    assert rewritten[0] == lines[0] and rewritten[2] == lines[2]
+    assert "provisional" not in json.loads(rewritten[1])
+    checkpoint = json.loads((tmp_path / "out.jsonl.checkpoint.json").read_text())
+    assert checkpoint["output_bytes"] == output.stat().st_size and checkpoint["records"] == 3
@@ -0,0 +1,57 @@
+import uuid
+
+import msgspec
+import pytest
+
+from test_batch import TOKEN_ABI
+
+
+@pytest.fixture
+def item():
+    address = "0x" + uuid.uuid4().hex + "00000000"
+    return {"mode": "abi", "address": address, "chainId": "1", "abi": TOKEN_ABI}
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_etag_round_trips(client, item, encoding):
+    first = client("POST", "/explain", json=item, headers={"Accept-Encoding": encoding})
+    if first.headers.get("content-encoding") != encoding:
+        pytest.skip(f"{encoding} not available")
+    etag = first.headers["etag"]
+    assert etag.endswith(f'-{encoding}"')
+
+    again = client("POST", "/explain", json=item, headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    weak = client("POST", "/explain", json=item, headers={"If-None-Match": f"W/{etag}"})
+    assert weak.status_code == 304
+    assert weak.headers["etag"] == etag
+
+
+def test_plain_etag_validates_compressed_request(client, item):
+    plain = client("POST", "/explain", json=item)
+    etag = plain.headers["etag"]
+    assert "-gzip" not in etag
+
+    again = client("POST", "/explain", json=item, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+
+def test_msgpack_is_negotiated_and_q_zero_excludes_it(client, item):
+    packed = client("POST", "/explain", json=item, headers={"Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert msgspec.msgpack.decode(packed.content) == client("POST", "/explain", json=item).json()
+
+    for accept in ("application/msgpack;q=0, application/json", "application/json, application/msgpack;q=0.5"):
+        r = client("POST", "/explain", json=item, headers={"Accept": accept})
+        assert r.headers["content-type"].startswith("application/json"), accept
+
+
+def test_q_zero_excludes_an_encoding(client, item):
+    r = client("POST", "/explain", json=item, headers={"Accept-Encoding": "gzip;q=0, *"})
+    assert "content-encoding" not in r.headers
+    r = client("POST", "/explain", json=item, headers={"Accept-Encoding": "identity, gzip;q=0.5"})
+    assert r.headers["content-encoding"] == "gzip"
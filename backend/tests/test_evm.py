@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import evm
+from evm import analyze_bytecode, executed_pushes, instruction_starts, keccak256, signature_selector
+
+
+def naive_pushes(code):
+    """(push position, next instruction) by walking the code one instruction at a time."""
+    out, pc = [], 0
+    while pc < len(code):
+        op = code[pc]
+        if evm.PUSH1 <= op <= evm.PUSH32:
+            out.append((pc, pc + op - evm.PUSH1 + 2))
+            pc += op - evm.PUSH1 + 2
+        else:
+            pc += 1
+    return out
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_push_walk_matches_naive_decoder(seed):
+    rng = np.random.default_rng(seed)
+    # Dense in PUSH opcodes so immediates hide other pushes; ends mid-push.
+    code = rng.choice(np.arange(256, dtype=np.uint8), size=int(rng.integers(1, 3000)),
+                      p=np.where((np.arange(256) >= 0x60) & (np.arange(256) <= 0x7F), 0.6 / 32, 0.4 / 224))
+    at, end = executed_pushes(code)
+    assert list(zip(at.tolist(), end.tolist())) == naive_pushes(code.tolist())
+    starts = np.ones(len(code), dtype=bool)
+    for pc, nxt in naive_pushes(code.tolist()):
+        starts[pc + 1:nxt] = False
+    assert (instruction_starts(code) == starts).all()
+
+
+def test_keccak_vectors_and_pure_python_fallback(monkeypatch):
+    empty = "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert keccak256(b"").hex() == empty
+    assert signature_selector("transfer(address,uint256)") == 0xA9059CBB
+    # Around and across the 136-byte rate boundary.
+    inputs = [b"", b"a" * 135, b"a" * 136, b"x" * 300]
+    native = [keccak256(data) for data in inputs]
+    monkeypatch.setattr(evm, "_keccak", None)
+    assert [keccak256(data) for data in inputs] == native
+    assert native[0].hex() == empty
+
+
+def test_dispatcher_selectors_skip_push_data():
+    code = bytes.fromhex(
+        "60003560e01c"                     # selector = calldata[0:4] >> 224
+        "8063a9059cbb1461002057"           # DUP1 PUSH4 0xa9059cbb EQ PUSH2 dest JUMPI
+        "80620ea7b31461003057"             # DUP1 PUSH3 0x0ea7b3 EQ PUSH2 dest JUMPI
+        "7f63deadbeef14" + "00" * 26 +     # the PUSH4 ... EQ pattern inside PUSH32 data
+        "00"
+    )
+    info = analyze_bytecode(code)
+    assert info.selectors == ["0xa9059cbb", "0x000ea7b3"]
+    assert not info.delegatecall and info.proxy is None
+
+
+def test_minimal_proxy_and_hex_input():
+    impl = "bebebebebebebebebebebebebebebebebebebebe"
+    info = analyze_bytecode("0x363d3d373d3d3d363d73" + impl + "5af43d82803e903d91602b57fd5bf3")
+    assert info.proxy == {"kind": "eip1167", "implementation": "0x" + impl}
+    assert info.delegatecall
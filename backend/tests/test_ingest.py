@@ -0,0 +1,18 @@
+import json
+
+import ingest
+
+LEGACY_ENTRY = {"type": "function", "name": "totalSupply", "constant": True, "payable": False,
+                "inputs": [], "outputs": [{"name": "", "type": "uint256", "internalType": "uint256"}]}
+
+
+def test_decoders_agree_and_keep_legacy_entries_as_sent(monkeypatch):
+    body = json.dumps({"mode": "abi", "address": "0x0", "chainId": "1", "abi": [LEGACY_ENTRY],
+                       "metadata": {"sources": {"A.sol": {"content": "x" * 1000}}}}).encode()
+    fast = ingest.decode(body)
+    monkeypatch.setattr(ingest, "_decode", lambda buf, batch: None)
+    slow = ingest.decode(body)
+    assert fast == slow
+    assert "metadata" not in slow
+    assert slow["abi"] == [{"type": "function", "name": "totalSupply", "inputs": [],
+                            "outputs": [{"name": "", "type": "uint256"}]}]
@@ -0,0 +1,22 @@
+import uuid
+
+import agents
+import llm
+from cache import explain_cache_key, result_cache
+
+
+def test_llm_error_fallback_is_provisional_and_not_cached(client, monkeypatch):
+    def broken(abi):
+        raise RuntimeError("upstream 503")
+
+    monkeypatch.setattr(llm, "available", lambda: True)
+    monkeypatch.setattr(agents, "_is_generic_abi_summary", lambda summary: True)
+    monkeypatch.setattr(agents, "_llm_explain_abi", broken)
+    address = "0x" + uuid.uuid4().hex
+    # Cache keys are content hashes; a fresh ABI keeps other tests' entries out.
+    abi = [{"type": "function", "name": "f" + uuid.uuid4().hex, "inputs": [], "outputs": [], "stateMutability": "view"}]
+    r = client("POST", "/explain", json={"mode": "abi", "address": address, "chainId": "1", "abi": abi})
+    assert r.status_code == 200
+    assert r.json()["source"] == "fallback" and r.json()["provisional"]
+    assert "etag" not in r.headers and r.headers["cache-control"] == "no-store"
+    assert result_cache.get(explain_cache_key("abi", abi=abi, address=address, chain_id="1")) is None
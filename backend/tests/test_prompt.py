@@ -0,0 +1,31 @@
+from abi_store import MAX_DIFF_LINES, diff
+from prompt import abi_prompt, changes_prompt, estimate_tokens
+
+
+def fn(name):
+    return {"type": "function", "name": name, "inputs": [{"name": "to", "type": "address"}], "outputs": [],
+            "stateMutability": "nonpayable"}
+
+
+def test_changes_prompt_reports_full_counts_of_a_truncated_diff():
+    old = [fn("kept"), fn("gone")]
+    new = [fn("kept")] + [fn(f"added{i}") for i in range(MAX_DIFF_LINES + 20)]
+    changes = diff(old, new)
+    text = changes_prompt(changes, budget=200)
+    header = text.splitlines()[0]
+    assert header == f"upgrade: {MAX_DIFF_LINES + 20} added, 0 changed, 1 removed, 1 unchanged ABI entries"
+    shown = sum(line[:2] in ("+ ", "~ ", "- ") for line in text.splitlines())
+    assert text.splitlines()[-1] == f"// {MAX_DIFF_LINES + 21 - shown} more changes omitted"
+
+
+def test_changes_prompt_without_omissions_has_no_trailer():
+    text = changes_prompt(diff([fn("a")], [fn("a"), fn("b")]))
+    assert text.splitlines()[1].startswith("+ ") and "omitted" not in text
+
+
+def test_abi_prompt_stays_within_budget():
+    abi = [fn(f"transfer{i}") for i in range(500)]
+    text = abi_prompt(abi, budget=300)
+    assert estimate_tokens(text) <= 300
+    assert "omitted" in text.splitlines()[-1]
+    assert text.splitlines()[0].startswith("contract interface: 500 ABI entries")
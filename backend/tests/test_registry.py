@@ -0,0 +1,20 @@
+import contract_registry
+from registry_index import RegistryIndex, build_index
+
+ADDRESS = "0x" + "ab" * 20
+
+
+def test_out_of_range_chain_ids_are_not_found(tmp_path, monkeypatch):
+    path = str(tmp_path / "registry.idx")
+    build_index([{"chainId": "10", "address": ADDRESS, "name": "Label", "type": "Token"}], path)
+    monkeypatch.setattr(contract_registry, "_index", RegistryIndex(path))
+    assert contract_registry.get_contract_info(ADDRESS, "10")["name"] == "Label"
+    for chain_id in ("1" + "0" * 40, "-1", "18446744073709551616"):
+        assert contract_registry.get_contract_info(ADDRESS, chain_id) is None
+        assert not contract_registry.is_known_contract(ADDRESS, chain_id)
+
+
+def test_explain_rejects_malformed_chain_ids(client):
+    for chain_id in ("9" * 400, "0x1", "-1"):
+        r = client("POST", "/explain", json={"mode": "abi", "address": ADDRESS, "chainId": chain_id, "abi": []})
+        assert r.status_code == 422
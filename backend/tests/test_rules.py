@@ -0,0 +1,115 @@
+"""The rule table against the if/elif chains it replaced, on random contracts."""
+
+import random
+
+import numpy as np
+
+from agents import ABI_TYPE_RULES, SELECTOR_TYPE_RULES
+from features import extract_abi_features, extract_signature_features, first_match, unique_signatures
+from rules import MODES, feature_matrix, type_rules
+
+NAMES = (
+    "swapExactTokens", "addLiquidity", "fulfillOrder", "matchOrders", "deposit", "borrow", "repay",
+    "stake", "tokenURI", "ownerOf", "transfer", "approve", "balanceOf", "upgradeTo", "owner",
+    "pause", "mint", "burn", "getReserves", "name",
+)
+SIGNATURES = (
+    "transfer(address,uint256)", "approve(address,uint256)", "balanceOf(address)",
+    "safeTransferFrom(address,address,uint256)", "ownerOf(uint256)", "owner()", "pause()",
+    "mint(address,uint256)", "swap(uint256,uint256,address,bytes)", "stake(uint256)", "foo()",
+)
+
+
+def baseline_abi_type(abi):
+    fx = [x for x in abi if x.get("type") == "function"]
+
+    def has(word):
+        return any(word in x.get("name", "").lower() for x in fx)
+
+    if has("fulfill") or has("match"):
+        return "NFT Marketplace or Trading Protocol"
+    if has("swap") and has("liquidity"):
+        return "DEX (Decentralized Exchange)"
+    if has("swap"):
+        return "DEX Router or Trading Contract"
+    if has("borrow") and has("repay") and has("deposit"):
+        return "Lending/Borrowing Protocol"
+    if has("stake"):
+        return "Staking Contract"
+    if has("tokenuri") and has("ownerof"):
+        return "NFT Contract (ERC-721)"
+    if has("transfer") and has("approve") and has("balance"):
+        return "Token Contract (ERC-20)"
+    if has("upgrade"):
+        return "Proxy or Upgradeable Contract"
+    if any(x.get("type") in ("fallback", "receive") for x in abi):
+        return "Wallet or Payment Contract"
+    if has("owner") and has("pause"):
+        return "Managed Contract"
+    if has("owner"):
+        return "Owned Contract"
+    return "Smart Contract"
+
+
+def baseline_selector_type(uniq):
+    def has(word):
+        return any(word in s.lower() for s in uniq)
+
+    if any(s in ("safeTransferFrom(address,address,uint256)", "ownerOf(uint256)") for s in uniq):
+        return "NFT Contract (ERC-721)"
+    if any(s in ("transfer(address,uint256)", "approve(address,uint256)", "balanceOf(address)") for s in uniq):
+        return "Token Contract (ERC-20)"
+    if has("swap"):
+        return "Exchange or DEX Contract"
+    if has("stake"):
+        return "Staking Contract"
+    if has("owner") and has("pause"):
+        return "Managed Contract"
+    return "Custom Contract"
+
+
+def random_abi(rng):
+    abi = [{"type": "function", "name": name, "inputs": [], "outputs": [], "stateMutability": "nonpayable"}
+           for name in rng.sample(NAMES, rng.randint(0, 6))]
+    if rng.random() < 0.15:
+        abi.append({"type": rng.choice(("fallback", "receive")), "stateMutability": "payable"})
+    return abi
+
+
+def random_candidates(rng):
+    return {f"0x{i:08x}": [sig] for i, sig in enumerate(rng.sample(SIGNATURES, rng.randint(1, 5)))}
+
+
+def test_abi_rules_match_baseline():
+    rng = random.Random(1)
+    for _ in range(2000):
+        abi = random_abi(rng)
+        contract_type, _ = first_match(extract_abi_features(abi).flags, ABI_TYPE_RULES, type_rules.defaults["abi"])
+        assert contract_type == baseline_abi_type(abi), abi
+
+
+def test_selector_rules_match_baseline():
+    rng = random.Random(2)
+    for _ in range(2000):
+        uniq = unique_signatures(random_candidates(rng))
+        contract_type, _ = first_match(extract_signature_features(uniq), SELECTOR_TYPE_RULES,
+                                       type_rules.defaults["selectors"])
+        assert contract_type == baseline_selector_type(uniq), uniq
+
+
+def test_numpy_classifier_matches_first_match():
+    rng = random.Random(3)
+    flags, modes, expected = [], [], []
+    for _ in range(3000):
+        mode = rng.choice(MODES)
+        if mode == "abi":
+            f = extract_abi_features(random_abi(rng)).flags
+        else:
+            f = extract_signature_features(unique_signatures(random_candidates(rng)))
+        flags.append(f)
+        modes.append(mode)
+        rules = ABI_TYPE_RULES if mode == "abi" else SELECTOR_TYPE_RULES
+        expected.append(first_match(f, rules, type_rules.defaults[mode])[0])
+    assert type_rules.contract_types(flags, modes).tolist() == expected
+    index = type_rules.classify_matrix(feature_matrix(flags, np.array(modes)))
+    assert (index == type_rules.classify_flags(flags, modes)).all()
@@ -0,0 +1,20 @@
+from selector_db import selectors_to_array
+
+
+def test_parses_prefixed_and_bare_selectors():
+    values, valid = selectors_to_array(["0xa9059cbb", "095EA7B3", "0X70a08231"])
+    assert values.tolist() == [0xA9059CBB, 0x095EA7B3, 0x70A08231]
+    assert valid.all()
+
+
+def test_mixed_length_entries_are_invalid_not_resplit():
+    # Joined, these are 16 hex characters: two "selectors" of the wrong split.
+    values, valid = selectors_to_array(["0x1234", "0x123456789012"])
+    assert valid.tolist() == [False, False]
+    assert values.tolist() == [0, 0]
+
+
+def test_bad_entries_only_fail_themselves():
+    values, valid = selectors_to_array(["0xa9059cbb", "0xzzzzzzzz", " 0x095ea7b3 ", ""])
+    assert valid.tolist() == [True, False, True, False]
+    assert values.tolist() == [0xA9059CBB, 0, 0x095EA7B3, 0]
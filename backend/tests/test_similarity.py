@@ -0,0 +1,36 @@
+import agents
+from similarity import MIN_SELECTORS, SimilarityIndex, selector_tokens
+
+TOKENS = frozenset(range(0x1000, 0x1000 + max(MIN_SELECTORS, 8)))
+
+
+def test_near_clone_matches_and_exact_scores_one():
+    index = SimilarityIndex(min_score=0.75)
+    assert index.add(TOKENS, {"name": "Base", "type": "Vault"})
+    clone = TOKENS - {min(TOKENS)} | {0xFFFF}
+    match = index.nearest(clone)
+    assert match is not None and match.label["name"] == "Base" and 0.75 <= match.score < 1
+    assert index.query(TOKENS)[0].score == 1.0
+    assert index.nearest(frozenset(range(0x9000, 0x9010))) is None
+    assert index.info()["matches"] == 1
+
+
+def test_small_sets_are_not_indexed():
+    index = SimilarityIndex()
+    assert not index.add(frozenset(range(MIN_SELECTORS - 1)), {"name": "tiny"})
+    assert index.query(frozenset(range(MIN_SELECTORS - 1))) == []
+
+
+def test_remembered_llm_explanations_keep_only_a_short_label(monkeypatch):
+    index = SimilarityIndex()
+    monkeypatch.setattr(agents, "similarity_index", index)
+    agents._remember(TOKENS, "**Contract Type**: Yield Vault\n\nThis vault of 0xabc lets its owner ...", "0xabc")
+    (match,) = index.query(TOKENS)
+    assert match.label == {"name": None, "type": "Yield Vault", "address": "0xabc", "origin": "roma"}
+    contract_type, explanation, _ = agents._similar_type(TOKENS)
+    assert contract_type == "Yield Vault"
+    assert "0xabc lets its owner" not in explanation
+
+
+def test_selector_tokens_parses_hex():
+    assert selector_tokens(["0xa9059cbb", "a9059cbb"]) == frozenset({0xA9059CBB})
@@ -65,9 +65,16 @@ export async function POST(req: NextRequest) {
 
     const r = await fetchBytecode(chainId, address);
     if (r?.bytecode) {
-      const selectors = extractSelectors(r.bytecode);
-      const enriched = await enrichSelectors(selectors);
-      const roma = await callRoma({ mode: "selectors", address, chainId, selectors, candidates: enriched });
+      // ROMA disassembles the bytecode and resolves its selectors locally when
+      // it has a selector database; fall back to the byte scan and
+      // 4byte.directory lookups only for what it couldn't do.
+      let roma = await callRoma({ mode: "bytecode", address, chainId, bytecode: r.bytecode });
+      const selectors: string[] = roma?.bytecode?.selectors ?? extractSelectors(r.bytecode);
+      let enriched: Record<string, string[]> = roma?.candidates;
+      if (!enriched) {
+        enriched = await enrichSelectors(selectors);
+        if (roma) roma = await callRoma({ mode: "bytecode", address, chainId, bytecode: r.bytecode, candidates: enriched });
+      }
       const result = {
         source: "rpc",
         address,
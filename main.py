@@ -1,6 +1,32 @@
+"""
+Command-line entry point.
+
+    python main.py index INPUT -o OUTPUT [options]      bulk-explain contracts offline
+    python main.py classify INPUT -o OUTPUT [options]   re-score contract types with the rules only
+
+The service itself runs from backend/ (uvicorn main:app); see backend/README.md.
+"""
+
+import os
+import sys
+
+COMMANDS = {
+    "index": "Explain a JSONL or Parquet file of contracts offline (backend/bulk_index.py)",
+    "classify": "Re-score contract types of a JSONL or Parquet file with the rules only",
+}
+
+
 def main():
-    print("Hello from repl-nix-workspace!")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print("usage: python main.py <command> [options]\n\ncommands:")
+        for name, help in COMMANDS.items():
+            print(f"  {name:<8} {help}")
+        return 0 if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help") else 2
+    import bulk_index
+    entry = bulk_index.classify_main if sys.argv[1] == "classify" else bulk_index.main
+    return entry(sys.argv[2:])
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())